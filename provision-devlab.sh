@@ -22,6 +22,19 @@ SCRIPT_NAME="provision-devlab.sh"
 # Path to the Python brew helper utility module
 BREW_UTIL_SCRIPT="$(dirname "${BASH_SOURCE[0]}")/scripts/util/brew_helper.py"
 
+# Journal of completed steps shared with the Python helpers (see scripts/util/journal_helper.py).
+# XDG_STATE_HOME is only exported in phase 1, so fall back to the location phase 1 sets it to.
+export DEVLAB_JOURNAL="${DEVLAB_JOURNAL:-${XDG_STATE_HOME:-$HOME/sbrn/sys/local/state}/devlab/journal.jsonl}"
+typeset -gA JOURNAL_DONE
+
+# Phase timing history (see scripts/util/timing_helper.py): phases are buffered per run and
+# stored in $XDG_STATE_HOME/devlab/phase-history.db when the run ends
+TIMING_UTIL_SCRIPT="$(dirname "${BASH_SOURCE[0]}")/scripts/util/timing_helper.py"
+export DEVLAB_PHASE_HISTORY="${DEVLAB_PHASE_HISTORY:-${XDG_STATE_HOME:-$HOME/sbrn/sys/local/state}/devlab/phase-history.db}"
+TIMINGS_BUFFER="${TMPDIR:-/tmp}/devlab-timings-$$.tsv"
+RUN_OPTIONS="$*"
+RUN_STATUS="failed"
+
 # Colors for output (Maven-style)
 RED='\033[0;31m'
 GREEN='\033[0;32m'
@@ -100,6 +113,10 @@ function main() {
     
     # Main setup phases (7 phases)
     confirm_and_run_step "Setup Developer Laboratory Directory Structure" setup_dir_struct_hierarchy "1"
+    
+    # Runs after phase 1 so the helper resolves the same XDG directories (and cache) as later phases
+    install_planned_brew_packages
+    
     confirm_and_run_step "Setup Zsh Environment" setup_zsh_environment "2"
     confirm_and_run_step "Install Essential CLI Tools" install_essential_cli_tools "3"
     confirm_and_run_step "Install Development Tools" install_development_tools "4"
@@ -111,6 +128,13 @@ function main() {
     log_build_success
     printf "${DIM}[INFO]${NC} Total time: $(( SECONDS / 60 ))m $(( SECONDS % 60 ))s\n"
     printf "${DIM}[INFO]${NC} Finished at: $(date)\n"
+    RUN_STATUS="success"
+    record_phase_history
+    python3 "$TIMING_UTIL_SCRIPT" --report --runs 5
+    if [[ -n "$DEVLAB_TRACE" ]]; then
+        python3 "$(dirname "$BREW_UTIL_SCRIPT")/trace_helper.py" "$DEVLAB_TRACE" --top 10
+        printf "${DIM}[HINT]${NC} Full timeline: python3 scripts/util/trace_helper.py %s --chrome trace.json (open in ui.perfetto.dev)\n" "$DEVLAB_TRACE"
+    fi
     printf "${DIM}[INFO]${NC} Final Memory: $(vm_stat | grep "Pages free" | awk '{print $3}' | sed 's/\.//')K\n"
     printf "${BOLD}${GREEN}[INFO]${NC} Developer Environment Setup completed successfully!\n"
 
@@ -122,6 +146,23 @@ function main() {
     printf "${DIM}[HINT]${NC} Ensure your name and email are correct in the appropriate contexts.\n\n"
 }
 
+# Manifest phases whose groups the per-phase steps install with brew_install_group
+BREW_MANIFEST_PHASES=(3 4 5 6 7)
+
+# Unattended runs select every phase, so install all their Homebrew packages in one planned pass;
+# the per-goal installs then only confirm what is already present. The pass goes through
+# brew_install_phases, so it honours the same opt-outs (SKIP_CASK_APPS -> --skip-cask-apps).
+function install_planned_brew_packages() {
+    [[ "$AUTO_YES" == "true" ]] || return 0
+    local phases=("${BREW_MANIFEST_PHASES[@]}")
+    log_info "Installing the Homebrew packages of phases ${phases[*]} in one planned pass..."
+    [[ $SKIP_CASK_APPS == true ]] && log_info "Cask applications are excluded (SKIP_CASK_APPS=true)"
+    export DEVLAB_PHASE="${phases[1]}-${phases[-1]} Planned Homebrew Install"
+    local plan_start=$EPOCHREALTIME
+    brew_install_phases "${phases[@]}"
+    timing_mark phase "${phases[1]}-${phases[-1]}" "Planned Homebrew Install" "$plan_start" $?
+}
+
 function confirm_and_run_step() {
     local step_description="$1"
     local step_function="$2"
@@ -180,7 +221,11 @@ function confirm_and_run_step() {
     fi
     
     if [[ $REPLY =~ ^[Yy]$ ]]; then
+        # Tag helper subprocess timing spans (DEVLAB_TRACE) with the phase they ran in
+        export DEVLAB_PHASE="${phase_number} ${phase_desc}"
+        PHASE_STARTED_AT=$EPOCHREALTIME
         $step_function
+        timing_mark phase "$phase_number" "$step_description" "$PHASE_STARTED_AT" $?
         printf "${GREEN}[INFO]${NC} %s ${GREEN}SUCCESS${NC}\n" "$step_description"
     else
         printf "${BLUE}[INFO]${NC} %s ${YELLOW}SKIPPED${NC}\n" "$step_description"
@@ -228,7 +273,9 @@ function setup_prerequisites() {
     else
         log_success "Homebrew already installed"
     fi
-    python3 "$BREW_UTIL_SCRIPT" --update
+    if ! journal_skip "brew update $JOURNAL_TODAY"; then
+        python3 "$BREW_UTIL_SCRIPT" --update
+    fi
     
     generate_phase_summary "0" "Prerequisites Setup"
     
@@ -447,36 +494,20 @@ function install_essential_cli_tools() {
 function install_shell_productivity_tools() {
     log_goal "[3.1/3.3] Installing shell enhancement & productivity tools..."
     
-    local shell_tools=(
-        "coreutils" "tree" "fzf" "tmux" "screen" "htop" "bat" "fd" "tldr" 
-        "eza" "zoxide" "watch" "ncdu" "glances" "lsd" "autoenv" 
-        "atuin" "direnv" "broot" "figlet" "lolcat" "ranger" 
-        "as-tree" "agedu" "zsh-autosuggestions" "zsh-completions" 
-        "bash-completion" "fish" "starship"
-    )
-    
-    brew_install_batch "${shell_tools[@]}"
+    brew_install_group "shell_productivity"
 }
 
 
 function install_networking_security_tools() {
     log_goal "[3.2/3.3] Installing Networking, Security, & Transfer tools..."
     
-    local network_tools=(
-        "curl" "wget" "httpie" "netcat" "gnupg" "certbot" "telnet"
-    )
-    
-    brew_install_batch "${network_tools[@]}"
+    brew_install_group "networking_security"
 }
 
 function install_text_data_tools() {
     log_goal "[3.3/3.3] Installing basic text processing tools..."
     
-    local text_tools=(
-        "emacs" "nano" "grep" "colordiff" "base64" "base91" "ccat" "pygments"
-    )
-    
-    brew_install_batch "${text_tools[@]}"
+    brew_install_group "text_data"
 
     # Create ripgrep config directory and link configuration
     ln -sfn "$SBRN_HOME/sys/hrt/conf/ripgrep" "$XDG_CONFIG_HOME/ripgrep"
@@ -519,12 +550,7 @@ function install_development_tools() {
 function install_vcs_tools() {
     log_goal "[4.1/4.4] Installing VCS tools..."
     
-    local git_tools=(
-        "git" "git-extras" "git-lfs" "gh" "ghq" "diff-so-fancy" 
-        "delta" "tig" "lazygit" "git-gui" "gibo"
-    )
-    
-    brew_install_batch "${git_tools[@]}"
+    brew_install_group "vcs"
     
     ln -sfn "$SBRN_HOME/sys/hrt/conf/git" "$XDG_CONFIG_HOME/git"
 }
@@ -532,14 +558,7 @@ function install_vcs_tools() {
 function install_cloud_container_tools() {
     log_goal "[4.2/4.4] Installing cloud & containers tools..."
     
-    local cloud_tools=(
-        "docker" "docker-compose" "colima" "kubernetes-cli" "helm" 
-        "awscli" "dive" "dockviz" "k9s" "kubecolor" "kompose" "krew" 
-        "kube-ps1" "kubebuilder" "kustomize" "istioctl" "minikube" 
-        "terraform" "pulumi" "railway" "vercel-cli" "ctop"
-    )
-    
-    brew_install_batch "${cloud_tools[@]}"
+    brew_install_group "cloud_container"
     
     # Install Docker Compose v2 plugin after Docker is installed
     configure_docker_compose_v2
@@ -633,53 +652,31 @@ function configure_docker_compose_v2() {
 function install_graphics_ocr_libraries() {
     log_goal "[4.3/4.4] Installing graphics, images, and UI libraries..."
     
-    local graphics_tools=(
-        "librsvg" "gtk+3" "ghostscript" "graphviz" "guile" 
-        "pcre" "xerces-c" "pygobject3"
-    )
-    
-    brew_install_batch "${graphics_tools[@]}"
+    brew_install_group "graphics_ocr"
 }
 
 function install_code_editors_and_tools() {
     log_goal "[4.4/4.6] Installing development editors and code tools..."
     
-    local dev_editors=(
-        "vim" "neovim" "ripgrep" "ack"
-    )
-    
-    brew_install_batch "${dev_editors[@]}"
+    brew_install_group "code_editors"
 }
 
 function install_api_development_tools() {
     log_goal "[4.5/4.6] Installing API development and documentation tools..."
     
-    local api_tools=(
-        "jwt-cli" "newman" "openapi-generator" "hugo"
-    )
-    
-    brew_install_batch "${api_tools[@]}"
+    brew_install_group "api_development"
 }
 
 function install_backend_services() {
     log_goal "[4.6/4.6] Installing backend services and data stores..."
     
     # Database and caching services
-    local data_services=(
-        "postgresql@15" "redis" "etcd"
-    )
-    
     log_info "Installing database and caching services..."
-    brew_install_batch "${data_services[@]}"
+    brew_install_group "data_services"
     
     # Server and service tools
-    local server_tools=(
-        "nginx" "sftpgo" "operator-sdk" 
-        "logrotate" "rtmpdump"
-    )
-    
     log_info "Installing server and service tools..."
-    brew_install_batch "${server_tools[@]}"
+    brew_install_group "server_tools"
 }
 
 ################################################################################
@@ -705,22 +702,13 @@ function install_programming_languages() {
 function install_core_programming_languages() {
     log_goal "[5.1/5.3] Installing core programming languages and runtimes..."
     
-    local languages=(
-        "openjdk@17" "openjdk@21" "python@3.13" "perl" 
-        "node" "go" "rust"
-    )
-    
-    brew_install_batch "${languages[@]}"
+    brew_install_group "languages"
 }
 
 function install_runtime_environment_managers() {
     log_goal "[5.2/5.3] Installing runtime environment managers..."
     
-    local runtime_managers=(
-        "jenv" "uv" "nvm" "pipx"
-    )
-    
-    brew_install_batch "${runtime_managers[@]}"
+    brew_install_group "runtime_managers"
     
     # Configure runtime environment managers
     configure_jenv
@@ -779,10 +767,13 @@ function configure_nvm() {
     export NVM_DIR="$XDG_DATA_HOME/nvm"
     mkdir -p "$NVM_DIR"
     
-    # Source NVM from Homebrew installation
+    # Source NVM from Homebrew installation; later steps need nvm and node in this shell
     source "/opt/homebrew/opt/nvm/nvm.sh"
     log_success "NVM loaded from Homebrew installation"
     
+    # A journal hit only counts while a Node.js version is still installed
+    [[ -n "$(ls -A "$NVM_DIR/versions/node" 2>/dev/null)" ]] && journal_skip "nvm install --lts" && return 0
+    
     # Install latest LTS Node.js if no versions are installed
     # Check if any Node.js versions exist by looking at the versions directory
     if [[ ! -d "$NVM_DIR/versions/node" ]] || [[ -z "$(ls -A "$NVM_DIR/versions/node" 2>/dev/null)" ]]; then
@@ -794,6 +785,11 @@ function configure_nvm() {
     else
         log_success "Node.js versions already installed via NVM"
     fi
+    
+    # Only journal the step once a Node.js version is actually present
+    if [[ -n "$(ls -A "$NVM_DIR/versions/node" 2>/dev/null)" ]]; then
+        journal_record "nvm install --lts"
+    fi
 }
 
 function configure_uv() {
@@ -830,7 +826,13 @@ function configure_uv() {
     # Install a modern Python version if not available
     if command -v uv &>/dev/null; then
         log_info "Installing Python 3.13 via uv for optimal AI/ML compatibility..."
-        uv python install 3.13 2>/dev/null || log_info "Python 3.13 installation skipped (already exist)"
+        if ! { uv_python_present 3.13 && journal_skip "uv python install 3.13"; }; then
+            if uv python install 3.13 2>/dev/null; then
+                journal_record "uv python install 3.13"
+            else
+                log_info "Python 3.13 installation skipped (already exist)"
+            fi
+        fi
         log_success "uv Python management configured"
     fi
     
@@ -966,9 +968,7 @@ function create_ml_dev_environment() {
 function install_build_automation_tools() {
     log_goal "[5.3/5.3] Installing build automation tools..."
     
-    local build_tools=("maven" "gradle" "poetry" "yarn")
-    
-    brew_install_batch "${build_tools[@]}"
+    brew_install_group "build_automation"
 }
 
 ################################################################################
@@ -1000,11 +1000,7 @@ function install_ides_and_gui_productivity_tools() {
 function install_core_ides_editors() {
     log_goal "[6.1/6.5] Installing core IDEs and editors..."
     
-    local ides=(
-        "visual-studio-code" "intellij-idea-ce" "pycharm-ce" "cursor" "windsurf" "zed" "iterm2"
-    )
-    
-    brew_cask_install_batch "${ides[@]}"
+    brew_install_group "ides"
 
     # Windsurf might not be available via brew, provide manual installation info
     if [[ ! -d "/Applications/Windsurf.app" ]] && [[ ! -d "$HOME/Applications/Windsurf.app" ]]; then
@@ -1044,41 +1040,23 @@ function install_core_ides_editors() {
 function install_productivity_and_communication_apps() {
     log_goal "[6.2/6.5] Installing productivity, communication, and development support applications..."
     
-    # Productivity and communication applications
-    local productivity_apps=(
-        "notion" "obsidian" "figma" "slack" "github"
-    )
-    
-    # Development and API tools
-    local dev_support_apps=(
-        "postman" "insomnia" "dbeaver-community" "pgadmin4" "rapidapi"
-    )
-    
     log_info "Installing productivity and communication apps..."
-    brew_cask_install_batch "${productivity_apps[@]}"
+    brew_install_group "productivity_apps"
     
     log_info "Installing development support applications..."
-    brew_cask_install_batch "${dev_support_apps[@]}"
+    brew_install_group "dev_support_apps"
 }
 
 function install_automation_and_system_tools() {
     log_goal "[6.3/6.5] Installing automation, window management, and system tools..."
     
     # GUI automation and window management applications (casks)
-    local automation_gui_apps=(
-        "hammerspoon" "rectangle" "karabiner-elements" "alfred" "bartender"
-    )
-    
     log_info "Installing GUI automation and window management tools..."
-    brew_cask_install_batch "${automation_gui_apps[@]}"
+    brew_install_group "automation_gui_apps"
     
     # Command-line system management and notification tools (regular brew packages)
-    local system_cli_tools=(
-        "terminal-notifier" "mas" "duti" "trash"
-    )
-    
     log_info "Installing system management CLI tools..."
-    brew_install_batch "${system_cli_tools[@]}"
+    brew_install_group "system_cli_tools"
     
     # Handle brew-services (it's already available with Homebrew)
     if python3 "$BREW_UTIL_SCRIPT" --check-homebrew &>/dev/null; then
@@ -1132,19 +1110,24 @@ function setup_vscode_extensions() {
         return 0
     fi
     
-    # Check if VSCode is installed and available
-    if ! command -v code &>/dev/null; then
-        log_info "VSCode not found in PATH - skipping extensions setup"
+    # Cursor and Windsurf share VS Code's extension model; set up every editor whose CLI is available
+    local editors=()
+    local editor
+    for editor in code cursor windsurf; do
+        command -v "$editor" &>/dev/null && editors+=("$editor")
+    done
+    if (( ${#editors} == 0 )); then
+        log_info "No VSCode-compatible editor CLI (code, cursor, windsurf) found in PATH - skipping extensions setup"
         return 0
     fi
     
-    log_info "Installing VSCode extensions using Python utility..."
+    log_info "Installing extensions for ${editors[*]} using Python utility..."
     
-    # Use Python utility for extension management
+    # Use Python utility for extension management (editors are handled concurrently)
     python3 "$SBRN_HOME/sys/hrt/scripts/util/vscode_helper.py" \
         --install \
-        --extensions-file "$SBRN_HOME/sys/hrt/conf/vscode/extensions.txt" \
-        --backup-dir "$SBRN_HOME/sys/hrt/scripts"
+        --editors "${(j:,:)editors}" \
+        --extensions-file "$SBRN_HOME/sys/hrt/conf/vscode/extensions.txt"
 }
 
 function setup_iterm_profiles() {
@@ -1330,12 +1313,7 @@ function install_ai_development_tools() {
     
     # Note: pipx configuration is handled in configure_pipx()
     
-    local ai_tools=(
-        "ollama" "huggingface-cli" "duckdb" "datasette" 
-        "sqlite-utils" "uv" "pyenv"
-    )
-    
-    brew_install_batch "${ai_tools[@]}"
+    brew_install_group "ai_tools"
     
     install_special_ai_tools
 }
@@ -1515,7 +1493,12 @@ EOF
             
             for model in "${models[@]}"; do
                 log_info "Downloading model: $model"
-                OLLAMA_MODELS="$OLLAMA_MODELS" ollama pull "$model" || log_warning "Failed to download $model - continuing..."
+                ollama_model_present "$model" && journal_skip "ollama pull $model" && continue
+                if ollama pull "$model"; then
+                    journal_record "ollama pull $model"
+                else
+                    log_warning "Failed to download $model - continuing..."
+                fi
             done
             
             log_success "Ollama configured with essential models in XDG location: $OLLAMA_MODELS"
@@ -1736,15 +1719,125 @@ EOF
 # Utility Functions
 ################################################################################
 
+# Load the completed-step journal into JOURNAL_DONE using shell builtins only, so
+# checking a step never spawns a process. Lines look like
+#   {"key": "ollama pull llama3.2:3b", "status": "done", ...}
+# and later lines win. With --verify (DEVLAB_JOURNAL_VERIFY=1) nothing is loaded,
+# so every step is re-checked and re-recorded.
+function journal_load() {
+    strftime -s JOURNAL_TODAY %Y-%m-%d "$EPOCHSECONDS"
+    JOURNAL_DONE=()
+    [[ "$DEVLAB_JOURNAL_VERIFY" == "1" || ! -f "$DEVLAB_JOURNAL" ]] && return 0
+    
+    local line key
+    while IFS= read -r line; do
+        [[ "$line" == '{"key": "'* ]] || continue
+        key="${line#\{\"key\": \"}"
+        key="${key%%\", \"status\": *}"
+        if [[ "$line" == *'"status": "done"'* ]]; then
+            JOURNAL_DONE[$key]=1
+        else
+            unset "JOURNAL_DONE[$key]"
+        fi
+    done < "$DEVLAB_JOURNAL"
+    [[ ${#JOURNAL_DONE} -gt 0 ]] && log_info "Journal: ${#JOURNAL_DONE} completed steps will be skipped (use --verify to re-check)"
+    return 0
+}
+
+# Succeed (and say so) when a step with this key already completed in an earlier run
+function journal_skip() {
+    local key="$1"
+    [[ -n "${JOURNAL_DONE[$key]}" ]] || return 1
+    log_success "Already completed: $key (journal)"
+}
+
+# Record a completed step with the same line format the Python helpers write
+function journal_record() {
+    local key="$1"
+    mkdir -p "${DEVLAB_JOURNAL:h}"
+    printf '{"key": "%s", "status": "done", "ts": %d, "source": "%s"}\n' "$key" "$EPOCHSECONDS" "$SCRIPT_NAME" >> "$DEVLAB_JOURNAL"
+    JOURNAL_DONE[$key]=1
+}
+
+# Succeed when every package still has its Cellar rack (Caskroom entry with --cask), so a journal
+# hit is not trusted for packages removed outside purge-devlab.sh. Names without a rack of their
+# own (aliases, apps installed outside brew) fail here and fall through to the helper's full check.
+function brew_kegs_present() {
+    local room=Cellar
+    if [[ "$1" == "--cask" ]]; then
+        room=Caskroom
+        shift
+    fi
+    [[ -n "$HOMEBREW_PREFIX" ]] || return 1
+    local package
+    for package in "$@"; do
+        [[ -d "$HOMEBREW_PREFIX/$room/$package" ]] || return 1
+    done
+}
+
+# Succeed when an Ollama model's manifest is on disk, e.g. llama3.2:3b under
+# manifests/registry.ollama.ai/library/llama3.2/3b (an untagged name means :latest)
+function ollama_model_present() {
+    local model="$1" tag=latest
+    if [[ "$model" == *:* ]]; then
+        tag="${model##*:}"
+        model="${model%:*}"
+    fi
+    [[ "$model" == */* ]] || model="library/$model"
+    [[ -f "${OLLAMA_MODELS:-$HOME/.ollama/models}/manifests/registry.ollama.ai/$model/$tag" ]]
+}
+
+# Succeed when uv manages an installed CPython of this minor version (e.g. 3.13)
+function uv_python_present() {
+    uv python list --only-installed 2>/dev/null | grep -q "^cpython-${1//./\.}\."
+}
+
+# Start one long-lived brew helper server for the whole run so every brew_install* call
+# shares its installed-state, app index and brew metadata instead of rebuilding them.
+# The helper forwards to the server automatically while DEVLAB_BREW_SOCKET is exported.
+function start_brew_helper_server() {
+    local socket_path="${TMPDIR:-/tmp}/devlab-brew-$$.sock"
+    
+    python3 "$BREW_UTIL_SCRIPT" --serve "$socket_path" --parent-pid $$ &
+    BREW_HELPER_PID=$!
+    
+    # Wait briefly for the socket; fall back to per-call helper processes if it never appears
+    local attempts=0
+    while [[ ! -S "$socket_path" && $attempts -lt 50 ]]; do
+        sleep 0.1
+        attempts=$((attempts + 1))
+    done
+    
+    if [[ -S "$socket_path" ]]; then
+        export DEVLAB_BREW_SOCKET="$socket_path"
+    else
+        log_warning "Brew helper server did not start - using one helper process per call"
+    fi
+}
+
+# Stop the brew helper server (registered as an EXIT trap)
+function stop_brew_helper_server() {
+    if [[ -n "$DEVLAB_BREW_SOCKET" ]]; then
+        python3 "$BREW_UTIL_SCRIPT" --stop-server &>/dev/null
+        unset DEVLAB_BREW_SOCKET
+    fi
+    if [[ -n "$BREW_HELPER_PID" ]]; then
+        kill "$BREW_HELPER_PID" &>/dev/null
+        unset BREW_HELPER_PID
+    fi
+}
+
 # Helper function to install Homebrew packages using Python module
 function brew_install() {
     local package="$1"
+    brew_kegs_present "$package" && journal_skip "brew install $package" && return 0
     python3 "$BREW_UTIL_SCRIPT" --install-formulas "$package"
 }
 
 # Optimized batch function to install multiple Homebrew packages using Python module
 function brew_install_batch() {
     local packages=("$@")
+    brew_kegs_present "${packages[@]}" && journal_skip "brew install ${packages[*]}" && return 0
     python3 "$BREW_UTIL_SCRIPT" --install-formulas "${packages[@]}"
 }
 
@@ -1753,6 +1846,7 @@ function brew_cask_install() {
     local cask="$1"
     local description="${2:-$cask}"
     
+    brew_kegs_present --cask "$cask" && journal_skip "brew install --cask $cask" && return 0
     if [[ $SKIP_CASK_APPS == true ]]; then
         python3 "$BREW_UTIL_SCRIPT" --skip-cask-apps --install-casks "$cask"
     else
@@ -1764,6 +1858,7 @@ function brew_cask_install() {
 function brew_cask_install_batch() {
     local casks=("$@")
     
+    brew_kegs_present --cask "${casks[@]}" && journal_skip "brew install --cask ${casks[*]}" && return 0
     if [[ $SKIP_CASK_APPS == true ]]; then
         python3 "$BREW_UTIL_SCRIPT" --skip-cask-apps --install-casks "${casks[@]}"
     else
@@ -1771,6 +1866,24 @@ function brew_cask_install_batch() {
     fi
 }
 
+# Homebrew package manifest shared with purge-devlab.sh
+BREW_MANIFEST="$(dirname "${BASH_SOURCE[0]}")/conf/homebrew/devlab-packages.toml"
+
+# Install one or more manifest groups (formulas and casks) in a single planned pass
+# (the helper checks its manifest journal entry against the installed state itself)
+function brew_install_group() {
+    local cask_flags=()
+    [[ $SKIP_CASK_APPS == true ]] && cask_flags=(--skip-cask-apps)
+    python3 "$BREW_UTIL_SCRIPT" "${cask_flags[@]}" --manifest "$BREW_MANIFEST" --install-manifest --groups "$@"
+}
+
+# Install every manifest package of the given phases in a single planned pass
+function brew_install_phases() {
+    local cask_flags=()
+    [[ $SKIP_CASK_APPS == true ]] && cask_flags=(--skip-cask-apps)
+    python3 "$BREW_UTIL_SCRIPT" "${cask_flags[@]}" --manifest "$BREW_MANIFEST" --install-manifest --phases "$@"
+}
+
 # Helper function to generate phase summaries using Python utility
 function generate_phase_summary() {
     local phase_number="$1"
@@ -1785,6 +1898,28 @@ function generate_phase_summary() {
     
     # Call the original log_phase_summary with imported content
     log_phase_summary "$phase_number/7" "$phase_title" "${summary_lines[@]}"
+    
+    # Time from the start of the phase to its summary, i.e. without post-summary steps
+    timing_mark summary "$phase_number" "$phase_title" "${PHASE_STARTED_AT:-$EPOCHREALTIME}"
+}
+
+# Buffer one timing line (kind, phase, title, start, end, exit code); appending spawns no process
+function timing_mark() {
+    local kind="$1"
+    local phase="$2"
+    local title="$3"
+    local started="$4"
+    local exit_code="${5:-0}"
+    printf '%s\t%s\t%s\t%s\t%s\t%s\n' "$kind" "$phase" "$title" "$started" "$EPOCHREALTIME" "$exit_code" >> "$TIMINGS_BUFFER"
+}
+
+# Store this run's buffered timings in the phase history (at the end of main, or on exit)
+function record_phase_history() {
+    [[ -f "$TIMINGS_BUFFER" ]] || return 0
+    python3 "$TIMING_UTIL_SCRIPT" --ingest "$TIMINGS_BUFFER" --run-id "$DEVLAB_RUN_ID" --status "$RUN_STATUS" \
+        --options "$RUN_OPTIONS" --manifest "$BREW_MANIFEST" \
+        || log_warning "Could not record phase timings in $DEVLAB_PHASE_HISTORY"
+    rm -f "$TIMINGS_BUFFER"
 }
 
 ################################################################################
@@ -1806,6 +1941,30 @@ function parse_arguments() {
                 log_info "Auto-mode enabled: All confirmations will be automatically accepted"
                 shift
                 ;;
+            -p|--parallel-downloads)
+                # Picked up by brew_helper.py: prefetch missing packages concurrently before installing
+                export DEVLAB_BREW_PREFETCH_JOBS="${DEVLAB_BREW_PREFETCH_JOBS:-4}"
+                log_info "Parallel downloads enabled: $DEVLAB_BREW_PREFETCH_JOBS concurrent brew fetch jobs"
+                shift
+                ;;
+            -a|--artifact-store)
+                # Picked up by brew_helper.py: serve bottle/cask downloads from a shared content-addressed store
+                export DEVLAB_ARTIFACT_STORE="${2:?--artifact-store requires a directory}"
+                log_info "Artifact store enabled: $DEVLAB_ARTIFACT_STORE"
+                shift 2
+                ;;
+            --verify)
+                # Ignore the completed-step journal: re-check every step and record it again
+                export DEVLAB_JOURNAL_VERIFY=1
+                log_info "Verify mode enabled: steps completed in earlier runs will be re-checked"
+                shift
+                ;;
+            -t|--trace)
+                # Picked up by brew_helper.py and vscode_helper.py: record a timing span per subprocess
+                export DEVLAB_TRACE="${2:?--trace requires a file path}"
+                log_info "Subprocess timing trace enabled: $DEVLAB_TRACE"
+                shift 2
+                ;;
             -h|--help)
                 show_usage
                 exit 0
@@ -1831,6 +1990,10 @@ function show_usage() {
     echo "  -c, --enable-cask-apps   Enable GUI application installations (VSCode, IDEs, etc.)"
     echo "  -i, --enable-iterm-setup Enable iTerm2 profiles and color schemes setup"
     echo "  -y, --yes               Auto-accept all confirmations (non-interactive mode)"
+    echo "  -p, --parallel-downloads Prefetch missing Homebrew packages concurrently (DEVLAB_BREW_PREFETCH_JOBS, default 4)"
+    echo "  -a, --artifact-store DIR Reuse bottle/cask downloads from DIR and add new ones (DEVLAB_ARTIFACT_STORE)"
+    echo "  -t, --trace FILE        Record subprocess timing spans to FILE (DEVLAB_TRACE) and report the slowest"
+    echo "      --verify            Re-check steps the journal records as completed (DEVLAB_JOURNAL)"
     echo "  -h, --help              Show this help message and exit"
     echo ""
     echo "Examples:"
@@ -1849,8 +2012,11 @@ function show_usage() {
 # Parse command line arguments
 parse_arguments "$@"
 
-# Track build time
+# Track build time (zsh/datetime provides EPOCHSECONDS, EPOCHREALTIME and strftime)
 SECONDS=0
+zmodload zsh/datetime
+strftime -s DEVLAB_RUN_ID %Y%m%dT%H%M%S "$EPOCHSECONDS"
+DEVLAB_RUN_ID="$DEVLAB_RUN_ID-$$"
     
 # Check if running on macOS
 if [[ $(uname) != "Darwin" ]]; then
@@ -1878,4 +2044,11 @@ if [[ "$AUTO_YES" == "true" ]]; then
     printf "${BOLD}[INFO]${NC} Auto-mode enabled: Starting full developer environment setup...\n"
 fi
 
+# Share one brew helper process across all phases; traps are set at top level because
+# zsh runs an EXIT trap set inside a function when that function returns
+journal_load
+start_brew_helper_server
+trap 'record_phase_history; stop_brew_helper_server' EXIT
+trap 'RUN_STATUS=interrupted; stop_brew_helper_server; exit 130' INT TERM
+
 main
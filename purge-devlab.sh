@@ -24,6 +24,9 @@ SCRIPT_NAME="purge-devlab.sh"
 # Path to the Python brew helper utility module
 BREW_UTIL_SCRIPT="$(dirname "${BASH_SOURCE[0]}")/scripts/util/brew_helper.py"
 
+# Path to the provisioning journal utility; purged steps are forgotten so provisioning redoes them
+JOURNAL_UTIL_SCRIPT="$(dirname "${BASH_SOURCE[0]}")/scripts/util/journal_helper.py"
+
 # Colors for output (consistent with provision script)
 RED='\033[0;31m'
 GREEN='\033[0;32m'
@@ -201,13 +204,8 @@ function purge_ai_development() {
     log_info "Purging AI Development Environment (Phase 7)..."
     
     # Remove AI/ML tools installed via brew
-    local ai_tools=(
-        "ollama" "huggingface-cli" "duckdb" "datasette" 
-        "sqlite-utils"
-    )
-    
     log_info "Removing AI/ML CLI tools..."
-    brew_uninstall_batch "${ai_tools[@]}"
+    brew_uninstall_group "ai_tools"
     
     # Remove pipx-installed AI tools
     local pipx_ai_tools=("mlflow" "chromadb" "jupyterlab" "notebook")
@@ -265,6 +263,8 @@ function purge_ai_development() {
         fi
     done
     
+    safe_remove "python3 \"$JOURNAL_UTIL_SCRIPT\" --forget \"ollama pull\"" "Forget journaled Ollama model downloads"
+    
     # Stop Ollama service if running
     if pgrep -f ollama &>/dev/null; then
         safe_remove "pkill -f ollama" "Stop Ollama service"
@@ -283,21 +283,12 @@ function purge_ides_and_gui_tools() {
     log_info "Purging IDEs and GUI Productivity Tools (Phase 6)..."
     
     # GUI Applications (casks)
-    local gui_apps=(
-        "visual-studio-code" "intellij-idea-ce" "pycharm-ce" "cursor" "zed" "iterm2"
-        "notion" "obsidian" "figma" "slack" "github"
-        "postman" "insomnia" "dbeaver-community" "pgadmin4" "rapidapi"
-        "hammerspoon" "rectangle" "karabiner-elements" "alfred" "bartender"
-    )
-    
     log_info "Removing GUI applications..."
-    brew_cask_uninstall_batch "${gui_apps[@]}"
+    brew_cask_uninstall_group "ides" "productivity_apps" "dev_support_apps" "automation_gui_apps"
     
     # CLI tools related to GUI productivity
-    local gui_cli_tools=("terminal-notifier" "mas" "duti" "trash")
-    
     log_info "Removing GUI-related CLI tools..."
-    brew_uninstall_batch "${gui_cli_tools[@]}"
+    brew_uninstall_group "system_cli_tools"
     
     # Remove VSCode settings symlinks
     local vscode_user_dir="$HOME/Library/Application Support/Code/User"
@@ -334,26 +325,9 @@ function purge_ides_and_gui_tools() {
 function purge_programming_languages() {
     log_info "Purging Programming Languages & Runtimes (Phase 5)..."
     
-    # Core programming languages
-    local languages=(
-        "openjdk@17" "openjdk@21" "python@3.13" "perl" 
-        "node" "go" "rust"
-    )
-    
-    log_info "Removing core programming languages..."
-    brew_uninstall_batch "${languages[@]}"
-    
-    # Runtime environment managers
-    local runtime_managers=("jenv" "uv" "nvm" "pipx")
-    
-    log_info "Removing runtime environment managers..."
-    brew_uninstall_batch "${runtime_managers[@]}"
-    
-    # Build automation tools
-    local build_tools=("maven" "gradle" "poetry" "yarn")
-    
-    log_info "Removing build automation tools..."
-    brew_uninstall_batch "${build_tools[@]}"
+    # Core languages, runtime environment managers and build automation tools, planned together
+    log_info "Removing programming languages, runtime managers and build tools..."
+    brew_uninstall_group "languages" "runtime_managers" "build_automation"
     
     # Clean runtime-specific directories
     local runtime_dirs=(
@@ -374,60 +348,20 @@ function purge_programming_languages() {
         fi
     done
     
+    safe_remove "python3 \"$JOURNAL_UTIL_SCRIPT\" --forget \"nvm install\"" "Forget journaled Node.js installs"
+    safe_remove "python3 \"$JOURNAL_UTIL_SCRIPT\" --forget \"uv python install\"" "Forget journaled uv Python installs"
+    
     log_success "Programming Languages & Runtimes purged"
 }
 
 function purge_development_tools() {
     log_info "Purging Development Tools (Phase 4)..."
     
-    # VCS tools
-    local git_tools=(
-        "git-extras" "git-lfs" "gh" "ghq" "diff-so-fancy" 
-        "delta" "tig" "lazygit" "git-gui" "gibo"
-    )
-    
-    log_info "Removing VCS tools (keeping core git)..."
-    brew_uninstall_batch "${git_tools[@]}"
-    
-    # Cloud & container tools
-    local cloud_tools=(
-        "docker" "docker-compose" "colima" "kubernetes-cli" "helm" 
-        "awscli" "dive" "dockviz" "k9s" "kubecolor" "kompose" "krew" 
-        "kube-ps1" "kubebuilder" "kustomize" "istioctl" "minikube" 
-        "terraform" "pulumi" "railway" "vercel-cli" "ctop"
-    )
-    
-    log_info "Removing cloud & container tools..."
-    brew_uninstall_batch "${cloud_tools[@]}"
-    
-    # Graphics and libraries
-    local graphics_tools=(
-        "librsvg" "gtk+3" "ghostscript" "graphviz" "guile" 
-        "pcre" "xerces-c" "pygobject3"
-    )
-    
-    log_info "Removing graphics and UI libraries..."
-    brew_uninstall_batch "${graphics_tools[@]}"
-    
-    # Development editors
-    local dev_editors=("vim" "neovim" "ripgrep" "ack")
-    
-    log_info "Removing development editors..."
-    brew_uninstall_batch "${dev_editors[@]}"
-    
-    # API development tools
-    local api_tools=("jwt-cli" "newman" "openapi-generator" "hugo")
-    
-    log_info "Removing API development tools..."
-    brew_uninstall_batch "${api_tools[@]}"
-    
-    # Backend services
-    local data_services=("postgresql@15" "redis" "etcd")
-    local server_tools=("nginx" "sftpgo" "operator-sdk" "logrotate" "rtmpdump")
-    
-    log_info "Removing backend services..."
-    brew_uninstall_batch "${data_services[@]}"
-    brew_uninstall_batch "${server_tools[@]}"
+    # VCS, cloud & container, graphics libraries, editors, API tools and backend services,
+    # planned together so shared dependencies are resolved once
+    log_info "Removing development tools (keeping core git)..."
+    brew_uninstall_group "vcs" "cloud_container" "graphics_ocr" "code_editors" \
+        "api_development" "data_services" "server_tools"
     
     # Remove git configuration symlink (but preserve the original config files)
     if [[ -L "$XDG_CONFIG_HOME/git" ]]; then
@@ -440,29 +374,9 @@ function purge_development_tools() {
 function purge_cli_tools() {
     log_info "Purging Essential CLI Tools (Phase 3)..."
     
-    # Shell productivity tools
-    local shell_tools=(
-        "tree" "fzf" "tmux" "screen" "htop" "bat" "fd" "tldr" 
-        "eza" "zoxide" "watch" "ncdu" "glances" "lsd" "autoenv" 
-        "atuin" "direnv" "broot" "figlet" "lolcat" "ranger" 
-        "as-tree" "agedu" "zsh-autosuggestions" "zsh-completions" 
-        "bash-completion" "fish" "starship"
-    )
-    
-    log_info "Removing shell productivity tools (keeping coreutils)..."
-    brew_uninstall_batch "${shell_tools[@]}"
-    
-    # Networking and security tools
-    local network_tools=("curl" "wget" "httpie" "netcat" "gnupg" "certbot" "telnet")
-    
-    log_info "Removing networking & security tools..."
-    brew_uninstall_batch "${network_tools[@]}"
-    
-    # Text processing tools
-    local text_tools=("emacs" "nano" "grep" "colordiff" "base64" "base91" "ccat")
-    
-    log_info "Removing text processing tools..."
-    brew_uninstall_batch "${text_tools[@]}"
+    # Shell productivity, networking & security and text processing tools, planned together
+    log_info "Removing essential CLI tools (keeping coreutils)..."
+    brew_uninstall_group "shell_productivity" "networking_security" "text_data"
     
     # Remove ripgrep config symlink
     if [[ -L "$XDG_CONFIG_HOME/ripgrep" ]]; then
@@ -596,50 +510,22 @@ function safe_remove() {
     fi
 }
 
-function brew_uninstall() {
-    local package="$1"
-    
-    if [[ "$DRY_RUN" == "true" ]]; then
-        if brew list "$package" &>/dev/null; then
-            log_dry_run "Would uninstall brew package: $package"
-        fi
-    else
-        if brew list "$package" &>/dev/null; then
-            log_info "Uninstalling brew package: $package"
-            brew uninstall "$package" 2>/dev/null || log_warning "Failed to uninstall $package"
-        fi
-    fi
-}
-
-function brew_uninstall_batch() {
-    local packages=("$@")
-    
-    for package in "${packages[@]}"; do
-        brew_uninstall "$package"
-    done
-}
+# Homebrew package manifest shared with provision-devlab.sh
+BREW_MANIFEST="$(dirname "${BASH_SOURCE[0]}")/conf/homebrew/devlab-packages.toml"
 
-function brew_cask_uninstall() {
-    local cask="$1"
-    
-    if [[ "$DRY_RUN" == "true" ]]; then
-        if brew list --cask "$cask" &>/dev/null; then
-            log_dry_run "Would uninstall brew cask: $cask"
-        fi
-    else
-        if brew list --cask "$cask" &>/dev/null; then
-            log_info "Uninstalling brew cask: $cask"
-            brew uninstall --cask "$cask" 2>/dev/null || log_warning "Failed to uninstall cask $cask"
-        fi
-    fi
+# Uninstall the purgeable formulas of one or more manifest groups in one planned pass:
+# brew_helper.py removes only formulas no other installed formula still needs
+function brew_uninstall_group() {
+    local dry_run_flags=()
+    [[ "$DRY_RUN" == "true" ]] && dry_run_flags=(--dry-run)
+    python3 "$BREW_UTIL_SCRIPT" --manifest "$BREW_MANIFEST" --uninstall-manifest --kind formulas "${dry_run_flags[@]}" --groups "$@"
 }
 
-function brew_cask_uninstall_batch() {
-    local casks=("$@")
-    
-    for cask in "${casks[@]}"; do
-        brew_cask_uninstall "$cask"
-    done
+# Uninstall the purgeable casks of one or more manifest groups with one brew call
+function brew_cask_uninstall_group() {
+    local dry_run_flags=()
+    [[ "$DRY_RUN" == "true" ]] && dry_run_flags=(--dry-run)
+    python3 "$BREW_UTIL_SCRIPT" --manifest "$BREW_MANIFEST" --uninstall-manifest --kind casks "${dry_run_flags[@]}" --groups "$@"
 }
 
 ################################################################################
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Artifact Store Module for Developer Laboratory Setup
+
+This module provides a content-addressed store for downloaded artifacts
+(Homebrew bottles, cask installers, VS Code extension packages) so that
+provisioning several machines downloads each artifact once.
+
+Objects are stored by sha256 under <store>/objects/<aa>/<sha256> and tracked in
+<store>/index.json with their size, a display name, an optional lookup key
+(such as a VS Code extension's id@version) and the last time they were used.
+When the store grows past its size cap, the least recently used objects are
+evicted; a file larger than the cap itself is not stored. Stores can be
+exported to and imported from any directory, such as a shared network folder
+or a USB volume.
+
+Usage:
+    python3 scripts/util/artifact_helper.py --store ~/.cache/devlab/artifacts --stats
+    python3 scripts/util/artifact_helper.py --export /Volumes/USB/devlab-artifacts
+    python3 scripts/util/artifact_helper.py --import /Volumes/USB/devlab-artifacts --max-size 30G
+
+Author: Balamurugan Krishnamoorthy
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+
+def default_store_dir() -> str:
+    """Store location: $DEVLAB_ARTIFACT_STORE, else $XDG_CACHE_HOME/devlab/artifacts"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.environ.get('DEVLAB_ARTIFACT_STORE') or os.path.join(cache_home, 'devlab', 'artifacts')
+
+
+def parse_size(value: str) -> int:
+    """Parse a size such as 512M, 20G or 1048576 into bytes"""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    value = value.strip().upper().rstrip('B')
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def file_sha256(path: str) -> str:
+    """Compute the sha256 of a file in 1 MB chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """Size-capped, content-addressed artifact store with LRU eviction"""
+
+    # Default size cap in bytes (overridable with DEVLAB_ARTIFACT_STORE_MAX)
+    DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        """
+        Initialize ArtifactStore
+
+        Args:
+            root: Store directory (defaults to default_store_dir())
+            max_bytes: Size cap; least recently used objects are evicted beyond it
+        """
+        self.root = os.path.expanduser(root or default_store_dir())
+        if max_bytes is None:
+            env_max = os.environ.get('DEVLAB_ARTIFACT_STORE_MAX')
+            max_bytes = parse_size(env_max) if env_max else self.DEFAULT_MAX_BYTES
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(self.root, 'index.json')
+
+    def object_path(self, sha256: str) -> str:
+        """Path of the object with the given digest"""
+        return os.path.join(self.root, 'objects', sha256[:2], sha256)
+
+    @contextmanager
+    def _locked_index(self) -> Iterator[Dict[str, Dict]]:
+        """Hold the store lock and yield the index; changes are written back atomically"""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            index = self._read_index()
+            yield index
+            tmp_file = f"{self.index_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(index, f, indent=1, sort_keys=True)
+            os.replace(tmp_file, self.index_file)
+
+    def _read_index(self) -> Dict[str, Dict]:
+        """Read the index, returning an empty one if it is missing or unreadable"""
+        try:
+            with open(self.index_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def has(self, sha256: str) -> bool:
+        """Check whether an object is present"""
+        return bool(sha256) and os.path.isfile(self.object_path(sha256))
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Digest of the present object recorded under a lookup key, or None"""
+        for sha256, entry in self._read_index().items():
+            if entry.get('key') == key and self.has(sha256):
+                return sha256
+        return None
+
+    def put(self, path: str, sha256: Optional[str] = None, name: Optional[str] = None,
+            key: Optional[str] = None) -> Optional[str]:
+        """
+        Add a file to the store after verifying its digest
+
+        Args:
+            path: File to add
+            sha256: Expected digest (from package metadata); computed if omitted
+            name: Display name recorded in the index
+            key: Lookup key recorded in the index (see lookup())
+
+        Returns:
+            The object's sha256, or None if the file does not match the expected digest
+            or is larger than the store's size cap
+        """
+        if sha256 and self.has(sha256) and not key:
+            self.touch(sha256)
+            return sha256
+        if os.path.getsize(path) > self.max_bytes:
+            return None
+        actual = file_sha256(path)
+        if sha256 and actual != sha256.lower():
+            return None
+
+        target = self.object_path(actual)
+        if not os.path.isfile(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_file = f"{target}.{os.getpid()}.tmp"
+            shutil.copyfile(path, tmp_file)
+            os.replace(tmp_file, target)
+        with self._locked_index() as index:
+            index[actual] = {
+                'size': os.path.getsize(target),
+                'name': name or os.path.basename(path),
+                'last_used': time.time(),
+            }
+            if key:
+                index[actual]['key'] = key
+            self._evict(index, keep=actual)
+        return actual
+
+    def get(self, sha256: str, dest: str) -> bool:
+        """
+        Materialize an object at dest (hard link when possible, copy otherwise)
+
+        Args:
+            sha256: Object digest
+            dest: Destination path
+
+        Returns:
+            True if the object was present and placed at dest
+        """
+        source = self.object_path(sha256)
+        if not os.path.isfile(source):
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+        tmp_file = f"{dest}.{os.getpid()}.tmp"
+        try:
+            os.link(source, tmp_file)
+        except OSError:
+            shutil.copyfile(source, tmp_file)
+        os.replace(tmp_file, dest)
+        self.touch(sha256)
+        return True
+
+    def touch(self, sha256: str) -> None:
+        """Mark an object as recently used"""
+        with self._locked_index() as index:
+            if sha256 in index:
+                index[sha256]['last_used'] = time.time()
+
+    def _evict(self, index: Dict[str, Dict], keep: Optional[str] = None) -> List[str]:
+        """Remove least recently used objects, other than keep, until the store fits its size cap (lock held)"""
+        evicted = []
+        total = sum(entry['size'] for entry in index.values())
+        for sha256 in sorted(index, key=lambda k: index[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if sha256 == keep:
+                continue
+            try:
+                os.remove(self.object_path(sha256))
+            except OSError:
+                pass
+            total -= index.pop(sha256)['size']
+            evicted.append(sha256)
+        return evicted
+
+    def evict(self) -> List[str]:
+        """Enforce the size cap, returning the evicted digests"""
+        with self._locked_index() as index:
+            return self._evict(index)
+
+    def stats(self) -> Dict:
+        """Object count and total size"""
+        index = self._read_index()
+        return {'objects': len(index), 'bytes': sum(e['size'] for e in index.values()),
+                'max_bytes': self.max_bytes, 'root': self.root}
+
+    def export_to(self, directory: str) -> int:
+        """
+        Copy every object missing from another store directory (shared folder, USB volume)
+
+        Args:
+            directory: Destination store root
+
+        Returns:
+            Number of objects copied
+        """
+        other = ArtifactStore(directory, max_bytes=sys.maxsize)
+        return other._merge_from(self)
+
+    def import_from(self, directory: str) -> int:
+        """
+        Copy every object this store lacks from another store directory, verifying digests
+
+        Args:
+            directory: Source store root
+
+        Returns:
+            Number of objects imported
+        """
+        return self._merge_from(ArtifactStore(directory, max_bytes=sys.maxsize))
+
+    def _merge_from(self, source: 'ArtifactStore') -> int:
+        """Add the objects of another store that this one does not have"""
+        copied = 0
+        for sha256, entry in source._read_index().items():
+            if self.has(sha256) or not source.has(sha256):
+                continue
+            if self.put(source.object_path(sha256), sha256, entry.get('name'), entry.get('key')):
+                copied += 1
+        return copied
+
+
+def main():
+    """Main function for command-line usage"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage the Developer Laboratory artifact store')
+    parser.add_argument('--store', default=default_store_dir(),
+                        help='Store directory (default: $DEVLAB_ARTIFACT_STORE or $XDG_CACHE_HOME/devlab/artifacts)')
+    parser.add_argument('--max-size', type=parse_size,
+                        help='Size cap such as 20G (default: $DEVLAB_ARTIFACT_STORE_MAX or 20G)')
+    parser.add_argument('--stats', action='store_true', help='Show object count and size')
+    parser.add_argument('--export', metavar='DIR', help='Copy objects to another store directory')
+    parser.add_argument('--import', dest='import_dir', metavar='DIR', help='Copy objects from another store directory')
+    parser.add_argument('--add', nargs='+', metavar='FILE', help='Add files to the store')
+    parser.add_argument('--evict', action='store_true', help='Evict least recently used objects beyond the size cap')
+    args = parser.parse_args()
+
+    store = ArtifactStore(args.store, args.max_size)
+    if args.import_dir:
+        print(f"Imported {store.import_from(args.import_dir)} artifacts from {args.import_dir}")
+    if args.add:
+        for path in args.add:
+            sha256 = store.put(path)
+            if sha256:
+                print(f"{sha256}  {path}")
+            else:
+                print(f"Not stored (larger than the size cap): {path}", file=sys.stderr)
+    if args.export:
+        print(f"Exported {store.export_to(args.export)} artifacts to {args.export}")
+    if args.evict:
+        print(f"Evicted {len(store.evict())} artifacts")
+    if args.stats or not (args.import_dir or args.add or args.export or args.evict):
+        stats = store.stats()
+        print(f"{stats['root']}: {stats['objects']} artifacts, "
+              f"{stats['bytes'] / 1024 ** 2:.1f} MB of {stats['max_bytes'] / 1024 ** 3:.1f} GB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Homebrew Helper Benchmark for Developer Laboratory Setup
+
+This module benchmarks BrewUtil's batch install paths against a simulated `brew`
+executable, so regressions in the helper's hot paths can be measured on any
+machine (including Linux boxes without Homebrew).
+
+The fake brew keeps its state in a synthetic HOMEBREW_PREFIX (Cellar/Caskroom
+directories), sleeps a configurable latency per subcommand, logs every call, and
+can deterministically fail a fraction of the packages it is asked to install.
+
+Usage:
+    python3 scripts/util/brew_bench.py
+    python3 scripts/util/brew_bench.py --sizes 10 100 --latency install=0.05,info=0.2 --fail-rate 0.02
+    python3 scripts/util/brew_bench.py --save main
+    python3 scripts/util/brew_bench.py --compare main
+
+Author: Balamurugan Krishnamoorthy
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout, redirect_stderr
+from typing import Dict, List, Optional
+
+
+# Simulated brew executable; configured through DEVLAB_BENCH_* environment variables
+FAKE_BREW = r'''#!{python}
+import json, os, sys, time, zlib
+
+prefix = os.environ['HOMEBREW_PREFIX']
+args = sys.argv[1:]
+with open(os.environ['DEVLAB_BENCH_CALLS'], 'a') as f:
+    f.write(' '.join(args) + '\n')
+
+command = args[0] if args else ''
+latency = dict(item.split('=') for item in os.environ.get('DEVLAB_BENCH_LATENCY', '').split(',') if '=' in item)
+time.sleep(float(latency.get(command.lstrip('-'), 0)))
+
+cask = '--cask' in args
+names = [a for a in args[1:] if not a.startswith('-')]
+kind_dir = os.path.join(prefix, 'Caskroom' if cask else 'Cellar')
+
+def fails(name):
+    rate = float(os.environ.get('DEVLAB_BENCH_FAIL_RATE', '0'))
+    return (zlib.crc32(name.encode()) % 10000) / 10000 < rate
+
+if command == '--prefix':
+    print(prefix)
+elif command == 'list':
+    print('\n'.join(sorted(os.listdir(kind_dir))))
+elif command == 'info':
+    if not cask and any(fails(n) for n in names):
+        print('Error: No available formula', file=sys.stderr)
+        sys.exit(1)
+    casks = [{{'token': n, 'artifacts': [{{'app': [n + '.app']}}]}} for n in names] if cask else []
+    formulae = [] if cask else [{{'name': n, 'full_name': n, 'dependencies': []}} for n in names]
+    print(json.dumps({{'formulae': formulae, 'casks': casks}}))
+elif command == 'install':
+    bad = [n for n in names if fails(n)]
+    for name in bad:
+        print('Error: No available {{}} with the name "{{}}".'.format('cask' if cask else 'formula', name), file=sys.stderr)
+    if bad:
+        sys.exit(1)
+    for name in names:
+        os.makedirs(os.path.join(kind_dir, name, '1.0'), exist_ok=True)
+        if cask:
+            os.makedirs(os.path.join(os.environ['DEVLAB_BENCH_APPS'], name + '.app'), exist_ok=True)
+elif command == 'fetch':
+    sys.exit(1 if any(fails(n) for n in names) else 0)
+'''
+
+DEFAULT_LATENCY = 'list=0.05,info=0.1,install=0.02,fetch=0.05,update=0.5,prefix=0.01'
+
+
+def get_baseline_dir() -> str:
+    """Baselines live under $XDG_STATE_HOME/devlab/bench"""
+    state_home = os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+    return os.path.join(state_home, 'devlab', 'bench')
+
+
+def _peak_rss_kb() -> int:
+    """Peak resident set size of this process in KB (ru_maxrss is bytes on macOS, KB on Linux)"""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def prepare_workdir(workdir: str, kind: str, count: int, installed_ratio: float) -> List[str]:
+    """
+    Lay out the fake brew, a synthetic prefix with some packages already installed, and an app dir
+
+    Args:
+        workdir: Empty scratch directory
+        kind: 'formulas' or 'casks'
+        count: Number of packages requested
+        installed_ratio: Fraction of the packages that are already installed
+
+    Returns:
+        Package names to request
+    """
+    bin_dir = os.path.join(workdir, 'bin')
+    os.makedirs(bin_dir)
+    brew = os.path.join(bin_dir, 'brew')
+    with open(brew, 'w') as f:
+        f.write(FAKE_BREW.format(python=sys.executable))
+    os.chmod(brew, 0o755)
+
+    for sub in ('prefix/Cellar', 'prefix/Caskroom', 'Applications'):
+        os.makedirs(os.path.join(workdir, sub))
+    open(os.path.join(workdir, 'calls.log'), 'w').close()
+
+    singular = 'cask' if kind == 'casks' else 'formula'
+    names = [f"bench-{singular}-{i:04d}" for i in range(count)]
+    for name in names[:int(count * installed_ratio)]:
+        if kind == 'casks':
+            os.makedirs(os.path.join(workdir, 'prefix', 'Caskroom', name, '1.0'))
+            os.makedirs(os.path.join(workdir, 'Applications', name + '.app'))
+        else:
+            os.makedirs(os.path.join(workdir, 'prefix', 'Cellar', name, '1.0'))
+    return names
+
+
+def bench_env(workdir: str, latency: str, fail_rate: float) -> Dict[str, str]:
+    """Environment that points BrewUtil at the fake brew and synthetic prefix"""
+    env = dict(os.environ)
+    env.update({
+        'PATH': os.path.join(workdir, 'bin') + os.pathsep + env.get('PATH', ''),
+        'HOMEBREW_PREFIX': os.path.join(workdir, 'prefix'),
+        'XDG_CACHE_HOME': os.path.join(workdir, 'cache'),
+        # Keep the helper's completed-step journal out of the user's and away from earlier runs
+        'XDG_STATE_HOME': os.path.join(workdir, 'state'),
+        'DEVLAB_JOURNAL': os.path.join(workdir, 'state', 'journal.jsonl'),
+        'DEVLAB_BENCH_CALLS': os.path.join(workdir, 'calls.log'),
+        'DEVLAB_BENCH_APPS': os.path.join(workdir, 'Applications'),
+        'DEVLAB_BENCH_LATENCY': latency,
+        'DEVLAB_BENCH_FAIL_RATE': str(fail_rate),
+    })
+    env.pop('DEVLAB_BREW_SOCKET', None)
+    env.pop('DEVLAB_BREW_CACHE_FILE', None)
+    env.pop('DEVLAB_JOURNAL_VERIFY', None)
+    return env
+
+
+def run_worker(workdir: str, kind: str, names: List[str], prefetch_jobs: int) -> None:
+    """Run one batch install inside this process and write timing to result.json"""
+    from brew_helper import BrewUtil
+
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        brew_util = BrewUtil(app_dirs=[os.path.join(workdir, 'Applications')], prefetch_jobs=prefetch_jobs)
+        if kind == 'casks':
+            successful, failed = brew_util.install_casks_batch(names)
+        else:
+            successful, failed = brew_util.install_formulas_batch(names)
+    wall = time.perf_counter() - start
+
+    with open(os.path.join(workdir, 'result.json'), 'w') as f:
+        json.dump({'wall_seconds': wall, 'peak_rss_kb': _peak_rss_kb(),
+                   'successful': len(successful), 'failed': len(failed)}, f)
+
+
+def run_scenario(kind: str, count: int, args: argparse.Namespace) -> Dict:
+    """
+    Benchmark one (kind, size) scenario in a fresh helper process
+
+    Returns:
+        Result dict with wall time, peak RSS and subprocess counts
+    """
+    workdir = tempfile.mkdtemp(prefix='devlab-bench-')
+    try:
+        names = prepare_workdir(workdir, kind, count, args.installed_ratio)
+        names_file = os.path.join(workdir, 'packages.txt')
+        with open(names_file, 'w') as f:
+            f.write('\n'.join(names))
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', workdir, '--kinds', kind,
+             '--prefetch-jobs', str(args.prefetch_jobs)],
+            env=bench_env(workdir, args.latency, args.fail_rate), check=True,
+            stdout=None if args.verbose else subprocess.DEVNULL,
+            stderr=None if args.verbose else subprocess.DEVNULL,
+        )
+        with open(os.path.join(workdir, 'result.json')) as f:
+            result = json.load(f)
+        with open(os.path.join(workdir, 'calls.log')) as f:
+            calls = [line.split()[0] if line.split() else '' for line in f]
+        result['subprocesses'] = len(calls)
+        result['by_command'] = {c: calls.count(c) for c in sorted(set(calls))}
+        result.update(kind=kind, size=count)
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_results(results: List[Dict], baseline: Optional[Dict] = None, threshold: float = 0.25) -> bool:
+    """
+    Print a results table, flagging regressions against a baseline
+
+    Returns:
+        True if any scenario regressed
+    """
+    regressed = False
+    print(f"{'scenario':<16} {'wall':>9} {'rss':>9} {'procs':>6}  breakdown")
+    for result in results:
+        key = f"{result['kind']}/{result['size']}"
+        line = (f"{key:<16} {result['wall_seconds']:8.2f}s {result['peak_rss_kb'] / 1024:7.1f}MB "
+                f"{result['subprocesses']:6d}  {' '.join(f'{k}={v}' for k, v in result['by_command'].items())}")
+        old = (baseline or {}).get(key)
+        if old:
+            notes = []
+            wall_delta = result['wall_seconds'] / old['wall_seconds'] - 1 if old['wall_seconds'] else 0
+            notes.append(f"wall {wall_delta:+.0%}")
+            if wall_delta > threshold:
+                notes[-1] += ' REGRESSION'
+                regressed = True
+            if result['subprocesses'] > old['subprocesses']:
+                notes.append(f"procs {old['subprocesses']}->{result['subprocesses']} REGRESSION")
+                regressed = True
+            line += f"  [{', '.join(notes)}]"
+        print(line)
+    return regressed
+
+
+def main():
+    """Main function for command-line usage"""
+    parser = argparse.ArgumentParser(description='Benchmark BrewUtil batch installs against a simulated brew')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000],
+                        help='Package counts to benchmark')
+    parser.add_argument('--kinds', nargs='+', choices=['formulas', 'casks'], default=['formulas', 'casks'],
+                        help='Package kinds to benchmark')
+    parser.add_argument('--latency', default=DEFAULT_LATENCY,
+                        help='Per-subcommand latency in seconds, e.g. list=0.05,install=0.02')
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help='Fraction of packages whose install fails (deterministic per name)')
+    parser.add_argument('--installed-ratio', type=float, default=0.5,
+                        help='Fraction of packages already installed in the synthetic prefix')
+    parser.add_argument('--prefetch-jobs', type=int, default=0,
+                        help='Pass through to BrewUtil to benchmark the prefetch stage')
+    parser.add_argument('--save', metavar='NAME', help='Save results as a named baseline')
+    parser.add_argument('--compare', metavar='NAME', help='Compare against a named baseline (exit 1 on regression)')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed wall-time slowdown before flagging a regression')
+    parser.add_argument('--verbose', action='store_true', help='Show helper output')
+    parser.add_argument('--worker', metavar='WORKDIR', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        with open(os.path.join(args.worker, 'packages.txt')) as f:
+            names = f.read().split()
+        run_worker(args.worker, args.kinds[0], names, args.prefetch_jobs)
+        return
+
+    baseline = None
+    if args.compare:
+        baseline_file = os.path.join(get_baseline_dir(), f"{args.compare}.json")
+        try:
+            with open(baseline_file) as f:
+                baseline = json.load(f)['results']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Cannot read baseline {baseline_file}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    results = [run_scenario(kind, size, args) for kind in args.kinds for size in args.sizes]
+    regressed = print_results(results, baseline, args.threshold)
+
+    if args.save:
+        os.makedirs(get_baseline_dir(), exist_ok=True)
+        baseline_file = os.path.join(get_baseline_dir(), f"{args.save}.json")
+        with open(baseline_file, 'w') as f:
+            json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'latency': args.latency,
+                       'fail_rate': args.fail_rate,
+                       'results': {f"{r['kind']}/{r['size']}": r for r in results}}, f, indent=2)
+        print(f"Baseline saved to {baseline_file}")
+
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,10 +9,20 @@ are already installed.
 Author: Balamurugan Krishnamoorthy
 """
 
+import asyncio
+import json
+import re
 import subprocess
 import sys
 import os
-from typing import List, Set, Tuple
+import time
+import weakref
+from typing import Dict, List, Optional, Set, Tuple
+
+from artifact_helper import ArtifactStore
+from journal_helper import Journal, step_key
+from stream_helper import BREW_EVENT_PATTERNS, StreamResult, run_streaming
+from trace_helper import Tracer
 
 
 class Colors:
@@ -49,47 +59,244 @@ class Logger:
         print(f"{Colors.RED}[ERROR]{Colors.NC} {message}")
 
 
+# Default package manifest shared by provision-devlab.sh and purge-devlab.sh
+DEFAULT_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', 'conf', 'homebrew', 'devlab-packages.toml')
+
+# Default lockfile of the exact installed Homebrew state, written by --write-lockfile
+DEFAULT_LOCKFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', 'conf', 'homebrew', 'devlab-packages.lock.json')
+
+
+def _strip_toml_comment(line: str) -> str:
+    """Remove a trailing # comment that is not inside a quoted string"""
+    quote = None
+    for i, char in enumerate(line):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ('"', "'"):
+            quote = char
+        elif char == '#':
+            return line[:i]
+    return line
+
+
+def _parse_toml_subset(text: str) -> Dict:
+    """
+    Parse the TOML subset used by the package manifest
+    
+    Fallback for Python < 3.11 without tomli (e.g. the macOS system python3):
+    supports [dotted.tables], and key = string/number/boolean/array-of-strings
+    values, with arrays allowed to span multiple lines.
+    """
+    import ast
+    
+    data: Dict = {}
+    table = data
+    pending = ''
+    for raw_line in text.splitlines():
+        line = _strip_toml_comment(raw_line).strip()
+        if pending:
+            pending += ' ' + line
+            if pending.count('[') > pending.count(']'):
+                continue
+            line, pending = pending, ''
+        elif not line:
+            continue
+        elif line.startswith('['):
+            table = data
+            for part in line.strip('[]').split('.'):
+                table = table.setdefault(part.strip().strip('"'), {})
+            continue
+        
+        key, _, value = line.partition('=')
+        value = value.strip()
+        if value.count('[') > value.count(']'):
+            pending = line
+            continue
+        if value in ('true', 'false'):
+            table[key.strip().strip('"')] = value == 'true'
+        else:
+            table[key.strip().strip('"')] = ast.literal_eval(value)
+    return data
+
+
+class PackageManifest:
+    """Declarative list of Homebrew formulas and casks grouped by provisioning phase"""
+    
+    def __init__(self, path: str = DEFAULT_MANIFEST):
+        """
+        Load a package manifest
+        
+        Args:
+            path: Path to the TOML manifest
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            text = f.read().decode('utf-8')
+        try:
+            import tomllib
+            data = tomllib.loads(text)
+        except ImportError:
+            try:
+                import tomli
+                data = tomli.loads(text)
+            except ImportError:
+                data = _parse_toml_subset(text)
+        self.groups: Dict[str, Dict] = data.get('groups', {})
+    
+    def select_groups(self, phases: Optional[List[str]] = None, groups: Optional[List[str]] = None) -> List[str]:
+        """
+        Select group names by phase and/or name, in manifest order
+        
+        Args:
+            phases: Phase numbers to include (None for all)
+            groups: Group names to include (None for all)
+            
+        Returns:
+            Matching group names
+        """
+        unknown = [g for g in groups or [] if g not in self.groups]
+        if unknown:
+            raise KeyError(f"Unknown manifest groups: {' '.join(unknown)}")
+        phases = [str(p) for p in phases] if phases else None
+        return [
+            name for name, group in self.groups.items()
+            if (phases is None or str(group.get('phase')) in phases) and (groups is None or name in groups)
+        ]
+    
+    def packages(self, kind: str, phases: Optional[List[str]] = None, groups: Optional[List[str]] = None,
+                 purge: bool = False) -> List[str]:
+        """
+        List the packages of the selected groups, de-duplicated in manifest order
+        
+        Args:
+            kind: 'formulas' or 'casks'
+            phases: Phase numbers to include (None for all)
+            groups: Group names to include (None for all)
+            purge: If True, leave out each group's purge_keep packages
+            
+        Returns:
+            Package names
+        """
+        selected = []
+        for name in self.select_groups(phases, groups):
+            group = self.groups[name]
+            keep = set(group.get('purge_keep', [])) if purge else set()
+            for package in group.get(kind, []):
+                if package not in keep and package not in selected:
+                    selected.append(package)
+        return selected
+
+
 class BrewUtil:
     """Utility class for Homebrew package management"""
     
-    # Mapping of package names that install under different formula names
+    # Seed entries for the formula alias index, for names brew cannot tell us about before
+    # the formula is installed. Everything else (aliases, oldnames, tap-qualified names) is
+    # learned from opt/ and Cellar/ symlinks and from `brew info --json=v2` output.
     # Key: name used for installation, Value: actual formula name after installation
     PACKAGE_NAME_MAPPING = {
         'delta': 'git-delta',
-        # Add more mappings here as needed for other packages with naming inconsistencies
     }
     
-    def __init__(self, skip_cask_apps: bool = False):
+    # Tap whose formulas brew also accepts without the tap prefix
+    CORE_TAP = 'homebrew/core/'
+    
+    # Well-known Homebrew prefixes, probed before falling back to `brew --prefix`
+    DEFAULT_PREFIXES = ['/opt/homebrew', '/usr/local', '/home/linuxbrew/.linuxbrew']
+    
+    # Bump when the on-disk installed-state cache layout changes
+    CACHE_VERSION = 4
+    
+    # brew error messages that name the package responsible for a failed batch
+    BREW_ERROR_PATTERNS = [
+        re.compile(r'No (?:available )?(?:formula|formulae|cask|casks)(?: or casks)?(?: found)? (?:with the name|for) "?([^"\s]+?)"?\.?$', re.MULTILINE),
+        re.compile(r"Cask '([^']+)' (?:is unavailable|definition is invalid)"),
+        re.compile(r'^Error: ([^\s:]+): ', re.MULTILINE),
+    ]
+    
+    # Seconds a streamed brew command may stay silent before it is considered hung
+    # (source builds print nothing until they finish, so this is generous)
+    DEFAULT_INACTIVITY_TIMEOUT = 1800
+    
+    # Version changes each selective-upgrade policy accepts
+    UPGRADE_POLICIES = {
+        'major': {'major'},
+        'major-minor': {'major', 'minor'},
+        'all': {'major', 'minor', 'patch', 'revision', 'other'},
+    }
+    
+    def __init__(self, skip_cask_apps: bool = False, use_cache: bool = True, cache_file: Optional[str] = None,
+                 prefix: Optional[str] = None, app_dirs: Optional[List[str]] = None, prefetch_jobs: int = 0,
+                 artifact_store: Optional[ArtifactStore] = None):
         """
         Initialize BrewUtil
         
         Args:
             skip_cask_apps: If True, skip all cask app installations
+            use_cache: If True, reuse the on-disk installed-state cache across processes
+            cache_file: Path of the installed-state cache (defaults to $XDG_CACHE_HOME/devlab/brew-installed.json)
+            prefix: Homebrew prefix to inspect (defaults to HOMEBREW_PREFIX or auto-detection)
+            app_dirs: Application directories to index, in priority order (defaults to ~/Applications, /Applications)
+            prefetch_jobs: If > 0, `brew fetch` missing packages with this many parallel downloads before installing
+            artifact_store: If set, seed HOMEBREW_CACHE from this store before installs and add new downloads after
         """
         self.skip_cask_apps = skip_cask_apps
+        self.use_cache = use_cache
+        self.cache_file = cache_file or os.environ.get('DEVLAB_BREW_CACHE_FILE') or os.path.join(
+            os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'devlab', 'brew-installed.json'
+        )
         self._installed_formulas: Set[str] = set()
         self._installed_casks: Set[str] = set()
+        self._formula_details: Dict[str, Dict] = {}
+        self._cask_details: Dict[str, Dict] = {}
         self._formulas_loaded = False
         self._casks_loaded = False
+        self._brew_prefix: Optional[str] = prefix
+        self.app_dirs = app_dirs or [os.path.expanduser('~/Applications'), '/Applications']
+        self._app_index: Optional[Dict[str, str]] = None
+        self._app_index_stamp: Optional[Tuple] = None
+        self._cask_app_names: Dict[str, List[str]] = {}
+        self.prefetch_jobs = prefetch_jobs
+        self._formula_metadata: Dict[str, Dict] = {}
+        self._installed_dependencies: Optional[Dict[str, List[str]]] = None
+        self._formula_aliases: Dict[str, str] = dict(self.PACKAGE_NAME_MAPPING)
+        self._aliases_loaded = False
+        self._cask_sha256: Dict[str, str] = {}
+        self.artifact_store = artifact_store
+        self.inactivity_timeout = float(os.environ.get('DEVLAB_BREW_INACTIVITY_TIMEOUT') or self.DEFAULT_INACTIVITY_TIMEOUT)
+        self.tracer = Tracer(source='brew_helper')
+        self.journal = Journal(source='brew_helper')
     
-    def _run_command(self, command: List[str], capture_output: bool = True) -> subprocess.CompletedProcess:
+    def _run_command(self, command: List[str], capture_output: bool = True):
         """
         Run a shell command and return the result
         
+        Captured commands are short queries and keep a fixed timeout; commands
+        whose output goes to the terminal (installs, updates) are streamed with
+        an inactivity timeout instead, so long but healthy runs are never killed.
+        
         Args:
             command: List of command parts
             capture_output: Whether to capture stdout/stderr
             
         Returns:
-            CompletedProcess result
+            CompletedProcess result, or StreamResult when output is not captured
         """
+        if not capture_output:
+            return self._stream_command(command)
         try:
-            result = subprocess.run(
-                command,
-                capture_output=capture_output,
-                text=True,
-                timeout=300  # 5 minute timeout
-            )
+            with self.tracer.span(command) as span:
+                result = subprocess.run(
+                    command,
+                    capture_output=True,
+                    text=True,
+                    timeout=300  # 5 minute timeout
+                )
+                span['exit_code'] = result.returncode
+                span['output_bytes'] = len((result.stdout or '').encode()) + len((result.stderr or '').encode())
             return result
         except subprocess.TimeoutExpired:
             Logger.error(f"Command timed out: {' '.join(command)}")
@@ -98,15 +305,280 @@ class BrewUtil:
             Logger.error(f"Command failed: {' '.join(command)}, Error: {e}")
             raise
     
+    def _stream_command(self, command: List[str], echo: bool = True) -> StreamResult:
+        """
+        Run a long brew command, streaming its output and parsing progress events
+        
+        Only the last lines of each stream are kept in memory for error reports,
+        and the command is killed only after inactivity_timeout seconds of silence.
+        
+        Args:
+            command: List of command parts
+            echo: Whether to show the output live
+            
+        Returns:
+            StreamResult with the exit code, output tails and download/pour events
+        """
+        try:
+            with self.tracer.span(command) as span:
+                result = run_streaming(command, echo=echo, patterns=BREW_EVENT_PATTERNS,
+                                       inactivity_timeout=self.inactivity_timeout)
+                span['exit_code'] = result.returncode
+                span['output_bytes'] = result.output_bytes
+                span['downloads'] = len(result.events_of('download'))
+                span['pours'] = len(result.events_of('pour'))
+            return result
+        except subprocess.TimeoutExpired:
+            Logger.error(f"Command produced no output for {self.inactivity_timeout:.0f}s and was stopped: {' '.join(command)}")
+            raise
+    
+    def _get_brew_prefix(self) -> str:
+        """
+        Resolve the Homebrew prefix without starting Ruby when possible
+        
+        Returns:
+            Homebrew prefix path, or empty string if it cannot be determined
+        """
+        if self._brew_prefix is not None:
+            return self._brew_prefix
+        
+        prefix = os.environ.get('HOMEBREW_PREFIX', '')
+        if not prefix:
+            for candidate in self.DEFAULT_PREFIXES:
+                if os.path.isdir(os.path.join(candidate, 'Cellar')):
+                    prefix = candidate
+                    break
+        if not prefix:
+            try:
+                result = self._run_command(['brew', '--prefix'])
+                if result.returncode == 0:
+                    prefix = result.stdout.strip()
+            except Exception:
+                pass
+        
+        self._brew_prefix = prefix
+        return prefix
+    
+    def _get_state_stamp(self, kind: str) -> Optional[int]:
+        """
+        Get the generation stamp of the directories backing an installed-state set
+        
+        Homebrew creates or removes a top-level entry in Cellar/Caskroom whenever a
+        formula/cask is installed or uninstalled, which bumps the directory mtime;
+        an upgrade only adds a version inside an existing rack, which bumps that
+        rack's mtime instead, and relinking replaces the opt/ and linked/ symlinks.
+        The stamp is the newest of all these mtimes, so any of them invalidates
+        the cached versions. It costs one stat per rack and no version listing.
+        
+        Args:
+            kind: 'formulas' or 'casks'
+            
+        Returns:
+            Newest mtime in nanoseconds, or None if the directory does not exist
+        """
+        prefix = self._get_brew_prefix()
+        if not prefix:
+            return None
+        directory = os.path.join(prefix, 'Cellar' if kind == 'formulas' else 'Caskroom')
+        try:
+            stamp = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.name.startswith('.'):
+                        stamp = max(stamp, entry.stat(follow_symlinks=False).st_mtime_ns)
+        except OSError:
+            return None
+        if kind == 'formulas':
+            for link_dir in (os.path.join(prefix, 'opt'), os.path.join(prefix, 'var', 'homebrew', 'linked')):
+                stamp = max(stamp, self._get_dir_mtime(link_dir) or 0)
+        return stamp
+    
+    def _read_state_cache(self) -> Dict:
+        """Read the on-disk installed-state cache, returning an empty cache if unusable"""
+        try:
+            with open(self.cache_file) as f:
+                cache = json.load(f)
+            if cache.get('version') == self.CACHE_VERSION and cache.get('prefix') == self._get_brew_prefix():
+                return cache
+        except (OSError, ValueError):
+            pass
+        return {'version': self.CACHE_VERSION, 'prefix': self._get_brew_prefix()}
+    
+    def _get_cached_entry(self, kind: str, stamp: Optional[int]) -> Optional[Dict]:
+        """
+        Get the cached installed-state entry if it matches the current stamp
+        
+        Args:
+            kind: 'formulas' or 'casks'
+            stamp: Current generation stamp from _get_state_stamp
+            
+        Returns:
+            Cache entry with 'names' and 'details', or None on a cache miss
+        """
+        if not self.use_cache or stamp is None:
+            return None
+        entry = self._read_state_cache().get(kind)
+        if entry and entry.get('stamp') == stamp:
+            return entry
+        return None
+    
+    def _store_cached_entry(self, kind: str, stamp: Optional[int], names: Set[str], details: Dict[str, Dict]) -> None:
+        """
+        Persist installed names and details for the given stamp (atomic replace, best effort)
+        
+        Args:
+            kind: 'formulas' or 'casks'
+            stamp: Generation stamp the names were observed at
+            names: Installed names
+            details: Per-name details (versions, link state), may be empty
+        """
+        if not self.use_cache or stamp is None:
+            return
+        cache = self._read_state_cache()
+        cache[kind] = {'stamp': stamp, 'names': sorted(names), 'details': details}
+        self._write_state_cache(cache)
+    
+    def _write_state_cache(self, cache: Dict) -> None:
+        """Write the installed-state cache (atomic replace, best effort)"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(cache, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            Logger.warning(f"Could not write installed-state cache: {e}")
+    
+    @staticmethod
+    def _version_sort_key(version: str) -> List[Tuple[int, object]]:
+        """Natural sort key so that 3.10 orders after 3.9"""
+        return [(0, int(part)) if part.isdigit() else (1, part) for part in re.split(r'[._\-+,]', version)]
+    
+    @classmethod
+    def _list_version_dirs(cls, path: str) -> List[str]:
+        """List the non-hidden version subdirectories of a Cellar rack or Caskroom entry, oldest first"""
+        with os.scandir(path) as entries:
+            return sorted((e.name for e in entries if not e.name.startswith('.') and e.is_dir()), key=cls._version_sort_key)
+    
+    @staticmethod
+    def _is_keg_only(keg_path: str, name: str) -> Optional[bool]:
+        """
+        Detect keg-only status from the formula file Homebrew keeps inside each keg
+        
+        Args:
+            keg_path: Path to Cellar/<name>/<version>
+            name: Formula name
+            
+        Returns:
+            True/False, or None if the keg has no formula file to inspect
+        """
+        try:
+            with open(os.path.join(keg_path, '.brew', f"{name}.rb")) as f:
+                return any(line.lstrip().startswith('keg_only') for line in f)
+        except OSError:
+            return None
+    
+    def _scan_cellar(self) -> Optional[Dict[str, Dict]]:
+        """
+        Read installed formulas straight from $(brew --prefix)/Cellar and opt/
+        
+        Returns:
+            Mapping of formula name to {'versions', 'linked_version', 'linked', 'keg_only'},
+            or None if the prefix layout is not what we expect
+        """
+        prefix = self._get_brew_prefix()
+        if not prefix:
+            return None
+        opt_dir = os.path.join(prefix, 'opt')
+        linked_dir = os.path.join(prefix, 'var', 'homebrew', 'linked')
+        
+        formulas: Dict[str, Dict] = {}
+        try:
+            with os.scandir(os.path.join(prefix, 'Cellar')) as racks:
+                for rack in racks:
+                    if rack.name.startswith('.') or rack.is_symlink():
+                        # Symlinked racks are oldnames of renamed formulas (see _scan_formula_aliases)
+                        continue
+                    if not rack.is_dir(follow_symlinks=False):
+                        return None
+                    versions = self._list_version_dirs(rack.path)
+                    if not versions:
+                        continue
+                    
+                    try:
+                        opt_version = os.path.basename(os.readlink(os.path.join(opt_dir, rack.name)))
+                    except OSError:
+                        opt_version = None
+                    current = opt_version if opt_version in versions else versions[-1]
+                    linked = os.path.islink(os.path.join(linked_dir, rack.name))
+                    keg_only = self._is_keg_only(os.path.join(rack.path, current), rack.name)
+                    
+                    formulas[rack.name] = {
+                        'versions': versions,
+                        'linked_version': opt_version,
+                        'linked': linked,
+                        'keg_only': (not linked) if keg_only is None else keg_only,
+                    }
+        except OSError:
+            return None
+        return formulas
+    
+    def _scan_caskroom(self) -> Optional[Dict[str, Dict]]:
+        """
+        Read installed casks straight from $(brew --prefix)/Caskroom
+        
+        Returns:
+            Mapping of cask name to {'versions'}, or None if the prefix layout is not what we expect
+        """
+        prefix = self._get_brew_prefix()
+        if not prefix:
+            return None
+        
+        casks: Dict[str, Dict] = {}
+        try:
+            with os.scandir(os.path.join(prefix, 'Caskroom')) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if not entry.is_dir(follow_symlinks=False):
+                        return None
+                    versions = self._list_version_dirs(entry.path)
+                    if versions:
+                        casks[entry.name] = {'versions': versions}
+        except OSError:
+            return None
+        return casks
+    
     def _load_installed_formulas(self) -> None:
         """Load the list of installed Homebrew formulas"""
         if self._formulas_loaded:
             return
+        
+        # Take the stamp before listing so a concurrent install invalidates what we store
+        stamp = self._get_state_stamp('formulas')
+        cached = self._get_cached_entry('formulas', stamp)
+        if cached is not None:
+            self._installed_formulas = set(cached.get('names', []))
+            self._formula_details = cached.get('details', {})
+            self._formulas_loaded = True
+            return
+        
+        # Fast path: read the Cellar directly; only fall back to brew when the layout is unexpected
+        scanned = self._scan_cellar()
+        if scanned is not None:
+            self._installed_formulas = set(scanned)
+            self._formula_details = scanned
+            self._store_cached_entry('formulas', stamp, self._installed_formulas, self._formula_details)
+            self._learn_formula_aliases(self._scan_formula_aliases())
+            self._formulas_loaded = True
+            return
             
         try:
             result = self._run_command(['brew', 'list', '--formula'])
             if result.returncode == 0:
                 self._installed_formulas = set(result.stdout.strip().split('\n')) if result.stdout.strip() else set()
+                self._formula_details = {}
+                self._store_cached_entry('formulas', stamp, self._installed_formulas, self._formula_details)
             else:
                 Logger.warning("Failed to get list of installed formulas")
                 self._installed_formulas = set()
@@ -120,11 +592,29 @@ class BrewUtil:
         """Load the list of installed Homebrew casks"""
         if self._casks_loaded:
             return
+        
+        stamp = self._get_state_stamp('casks')
+        cached = self._get_cached_entry('casks', stamp)
+        if cached is not None:
+            self._installed_casks = set(cached.get('names', []))
+            self._cask_details = cached.get('details', {})
+            self._casks_loaded = True
+            return
+        
+        scanned = self._scan_caskroom()
+        if scanned is not None:
+            self._installed_casks = set(scanned)
+            self._cask_details = scanned
+            self._store_cached_entry('casks', stamp, self._installed_casks, self._cask_details)
+            self._casks_loaded = True
+            return
             
         try:
             result = self._run_command(['brew', 'list', '--cask'])
             if result.returncode == 0:
                 self._installed_casks = set(result.stdout.strip().split('\n')) if result.stdout.strip() else set()
+                self._cask_details = {}
+                self._store_cached_entry('casks', stamp, self._installed_casks, self._cask_details)
             else:
                 Logger.warning("Failed to get list of installed casks")
                 self._installed_casks = set()
@@ -134,6 +624,162 @@ class BrewUtil:
         
         self._casks_loaded = True
     
+    def _record_installed_formulas(self, packages: List[str]) -> None:
+        """
+        Update the installed-state cache in place after a successful install
+        
+        Args:
+            packages: Formula names that were just installed
+        """
+        stamp = self._get_state_stamp('formulas')
+        scanned = self._scan_cellar()
+        if scanned is not None:
+            # A rescan also picks up dependencies poured alongside the requested packages
+            self._installed_formulas = set(scanned)
+            self._formula_details = scanned
+            self._learn_formula_aliases(self._scan_formula_aliases())
+        else:
+            self._load_installed_formulas()
+            for package in packages:
+                self._installed_formulas.add(self.resolve_formula_name(package))
+        self._formulas_loaded = True
+        self._installed_dependencies = None
+        self._store_cached_entry('formulas', stamp, self._installed_formulas, self._formula_details)
+    
+    def _record_installed_casks(self, casks: List[str]) -> None:
+        """
+        Update the installed-state cache in place after a successful cask install
+        
+        Args:
+            casks: Cask names that were just installed
+        """
+        stamp = self._get_state_stamp('casks')
+        scanned = self._scan_caskroom()
+        if scanned is not None:
+            self._installed_casks = set(scanned)
+            self._cask_details = scanned
+        else:
+            self._load_installed_casks()
+            self._installed_casks.update(casks)
+        self._casks_loaded = True
+        self._app_index = None
+        self._store_cached_entry('casks', stamp, self._installed_casks, self._cask_details)
+    
+    def _load_formula_aliases(self) -> None:
+        """Merge the alias index persisted in the installed-state cache"""
+        if self._aliases_loaded:
+            return
+        self._aliases_loaded = True
+        if self.use_cache:
+            self._formula_aliases.update(self._read_state_cache().get('aliases') or {})
+    
+    def _learn_formula_aliases(self, aliases: Dict[str, str]) -> None:
+        """
+        Add alias -> formula entries to the index, persisting it if anything is new
+        
+        Args:
+            aliases: Mapping of alternative name to canonical formula name
+        """
+        self._load_formula_aliases()
+        new = {alias: name for alias, name in aliases.items()
+               if alias != name and self._formula_aliases.get(alias) != name}
+        if not new:
+            return
+        self._formula_aliases.update(new)
+        if self.use_cache and self._get_brew_prefix():
+            cache = self._read_state_cache()
+            cache['aliases'] = {k: v for k, v in self._formula_aliases.items() if k not in self.PACKAGE_NAME_MAPPING}
+            self._write_state_cache(cache)
+    
+    def _scan_formula_aliases(self) -> Dict[str, str]:
+        """
+        Collect aliases and oldnames of installed formulas from the prefix
+        
+        Homebrew links every alias of an installed formula as opt/<alias> and
+        leaves a Cellar/<oldname> symlink behind when a formula is renamed, so
+        both resolve to the canonical rack without asking brew.
+        
+        Returns:
+            Mapping of alias or oldname to canonical formula name
+        """
+        prefix = self._get_brew_prefix()
+        if not prefix:
+            return {}
+        aliases: Dict[str, str] = {}
+        for directory, depth in (('opt', 2), ('Cellar', 1)):
+            try:
+                with os.scandir(os.path.join(prefix, directory)) as entries:
+                    for entry in entries:
+                        if not entry.is_symlink():
+                            continue
+                        try:
+                            target = os.path.normpath(os.path.join(os.path.dirname(entry.path), os.readlink(entry.path)))
+                        except OSError:
+                            continue
+                        # opt/<alias> -> Cellar/<name>/<version>, Cellar/<oldname> -> Cellar/<name>
+                        name = os.path.basename(os.path.dirname(target)) if depth == 2 else os.path.basename(target)
+                        if name and name != entry.name:
+                            aliases[entry.name] = name
+            except OSError:
+                continue
+        return aliases
+    
+    @staticmethod
+    def _formula_json_aliases(formula: Dict) -> Dict[str, str]:
+        """Alias -> name entries (aliases, oldnames, full_name) from one `brew info --json=v2` formula"""
+        oldnames = formula.get('oldnames') or ([formula['oldname']] if formula.get('oldname') else [])
+        names = (formula.get('aliases') or []) + oldnames + [formula.get('full_name')]
+        return {alias: formula['name'] for alias in names if alias and alias != formula['name']}
+    
+    def resolve_formula_name(self, package: str) -> str:
+        """
+        Map any name brew would accept (alias, oldname, tap-qualified) to the installed formula name
+        
+        Args:
+            package: Formula name as written in a manifest or on the command line
+            
+        Returns:
+            Canonical formula name, or the input unchanged if it is unknown
+        """
+        self._load_installed_formulas()
+        if package in self._installed_formulas:
+            return package
+        self._load_formula_aliases()
+        if package in self._formula_aliases:
+            return self._formula_aliases[package]
+        if package.startswith(self.CORE_TAP):
+            short_name = package[len(self.CORE_TAP):]
+            return self._formula_aliases.get(short_name, short_name)
+        return package
+    
+    def get_formula_details(self, package: str) -> Optional[Dict]:
+        """
+        Get installed versions and link state of a formula
+        
+        Args:
+            package: Formula name
+            
+        Returns:
+            Dict with 'versions', 'linked_version', 'linked' and 'keg_only',
+            or None if not installed or details are unavailable (brew list fallback)
+        """
+        # Resolve first: it loads the installed state, which replaces _formula_details
+        name = self.resolve_formula_name(package)
+        return self._formula_details.get(name)
+    
+    def get_cask_details(self, cask: str) -> Optional[Dict]:
+        """
+        Get installed versions of a cask
+        
+        Args:
+            cask: Cask name
+            
+        Returns:
+            Dict with 'versions', or None if not installed or details are unavailable
+        """
+        self._load_installed_casks()
+        return self._cask_details.get(cask)
+    
     def is_formula_installed(self, package: str) -> bool:
         """
         Check if a Homebrew formula is installed
@@ -144,75 +790,128 @@ class BrewUtil:
         Returns:
             True if installed, False otherwise
         """
-        self._load_installed_formulas()
+        # Exact names, aliases, oldnames and tap-qualified names are all dictionary hits
+        return self.resolve_formula_name(package) in self._installed_formulas
+    
+    @staticmethod
+    def _normalize_app_name(name: str) -> str:
+        """Normalize an app bundle or cask name for index lookups ('Visual Studio Code.app' -> 'visualstudiocode')"""
+        if name.endswith('.app'):
+            name = name[:-4]
+        return re.sub(r'[^a-z0-9]', '', name.lower())
+    
+    @staticmethod
+    def _get_dir_mtime(path: str) -> Optional[int]:
+        """Get a directory mtime in nanoseconds, or None if it does not exist"""
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _load_app_index(self) -> Dict[str, str]:
+        """
+        Build the application index from a single scan of the application directories
         
-        # Check if the exact package name is installed
-        if package in self._installed_formulas:
-            return True
+        Each .app is keyed by its normalized file name and by its CFBundleName /
+        CFBundleDisplayName, so later lookups are dictionary hits instead of
+        repeated os.path.exists probes.
         
-        # Check if the package has a mapped name and if that mapped name is installed
-        mapped_name = self.PACKAGE_NAME_MAPPING.get(package)
-        if mapped_name and mapped_name in self._installed_formulas:
-            return True
+        Returns:
+            Mapping of normalized name to absolute .app path
+        """
+        stamp = tuple(self._get_dir_mtime(app_dir) for app_dir in self.app_dirs)
+        if self._app_index is not None and stamp == self._app_index_stamp:
+            return self._app_index
         
-        return False
+        import plistlib
+        
+        index: Dict[str, str] = {}
+        for app_dir in self.app_dirs:
+            try:
+                entries = list(os.scandir(app_dir))
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.name.endswith('.app'):
+                    continue
+                keys = {self._normalize_app_name(entry.name)}
+                try:
+                    with open(os.path.join(entry.path, 'Contents', 'Info.plist'), 'rb') as f:
+                        info = plistlib.load(f)
+                    for field in ('CFBundleName', 'CFBundleDisplayName'):
+                        if isinstance(info.get(field), str):
+                            keys.add(self._normalize_app_name(info[field]))
+                except Exception:
+                    pass
+                # Earlier directories take precedence (~/Applications before /Applications)
+                for key in keys:
+                    index.setdefault(key, entry.path)
+        
+        self._app_index = index
+        self._app_index_stamp = stamp
+        return index
     
-    def _get_cask_app_path(self, cask: str) -> str:
+    def _load_cask_app_names(self, casks: List[str]) -> None:
         """
-        Get the expected application path for a cask
+        Resolve the .app artifacts of many casks with one `brew info --json=v2 --cask` call
         
         Args:
-            cask: Cask name
-            
-        Returns:
-            Expected app path in ~/Applications or /Applications
+            casks: Cask names whose app names are not yet known
         """
-        # Try to get cask info to find the actual app name
+        pending = [c for c in casks if c not in self._cask_app_names]
+        if not pending:
+            return
+        
         try:
-            result = self._run_command(['brew', 'info', '--cask', cask])
+            result = self._run_command(['brew', 'info', '--json=v2', '--cask'] + pending)
             if result.returncode == 0:
-                # Parse the output to find .app files
-                lines = result.stdout.split('\n')
-                for line in lines:
-                    if '.app' in line and ('→' in line or 'installed' in line):
-                        # Extract app name from the line
-                        parts = line.split()
-                        for part in parts:
-                            if part.endswith('.app'):
-                                app_name = part
-                                break
-                        else:
-                            continue
-                        
-                        # Check both ~/Applications and /Applications
-                        user_apps_path = os.path.expanduser(f"~/Applications/{app_name}")
-                        system_apps_path = f"/Applications/{app_name}"
-                        
-                        if os.path.exists(user_apps_path):
-                            return user_apps_path
-                        elif os.path.exists(system_apps_path):
-                            return system_apps_path
+                self._ingest_cask_info(json.loads(result.stdout).get('casks', []))
         except Exception:
             pass
         
-        # Fallback: use cask name with common patterns
-        possible_names = [
-            f"{cask}.app",
-            f"{cask.capitalize()}.app",
-            f"{cask.title()}.app",
-            f"{cask.upper()}.app",
-            f"{'-'.join(word.capitalize() for word in cask.split('-'))}.app",
-            f"{cask.replace('-', ' ').title().replace(' ', '')}.app"
-        ]
+        # Unknown or failed lookups fall back to name heuristics; never query them again
+        for cask in pending:
+            self._cask_app_names.setdefault(cask, [])
+    
+    def _ingest_cask_info(self, casks: List[Dict]) -> None:
+        """
+        Remember the app names and download digests of casks described by `brew info --json=v2`
         
-        for app_name in possible_names:
-            user_path = os.path.expanduser(f"~/Applications/{app_name}")
-            system_path = f"/Applications/{app_name}"
+        Args:
+            casks: The 'casks' list of brew's JSON output
+        """
+        for cask_info in casks:
+            app_names = []
+            for artifact in cask_info.get('artifacts', []):
+                if not isinstance(artifact, dict):
+                    continue
+                for item in artifact.get('app', []):
+                    if isinstance(item, str) and item.endswith('.app'):
+                        app_names.append(os.path.basename(item))
+                    elif isinstance(item, dict) and str(item.get('target', '')).endswith('.app'):
+                        app_names.append(os.path.basename(item['target']))
+            self._cask_app_names[cask_info.get('token', '')] = app_names
+            if cask_info.get('sha256') and cask_info['sha256'] != 'no_check':
+                self._cask_sha256[cask_info.get('token', '')] = cask_info['sha256']
+    
+    def _get_cask_app_path(self, cask: str) -> str:
+        """
+        Get the expected application path for a cask
+        
+        Args:
+            cask: Cask name
             
-            if os.path.exists(user_path):
-                return user_path
-            elif os.path.exists(system_path):
-                return system_path
+        Returns:
+            Expected app path in ~/Applications or /Applications
+        """
+        self._load_cask_app_names([cask])
+        app_index = self._load_app_index()
+        
+        # Prefer the app names declared by the cask, then fall back to the cask token itself
+        for app_name in self._cask_app_names.get(cask, []) + [cask]:
+            app_path = app_index.get(self._normalize_app_name(app_name))
+            if app_path:
+                return app_path
         
         return ""
     
@@ -276,9 +975,7 @@ class BrewUtil:
             result = self._run_command(['brew', 'install', package], capture_output=False)
             if result.returncode == 0:
                 Logger.success(f"{package} installed successfully")
-                # Reload installed formulas since a new package was installed
-                self._formulas_loaded = False
-                self._installed_formulas.clear()
+                self._record_installed_formulas([package])
                 return True
             else:
                 Logger.warning(f"Failed to install {package}")
@@ -315,7 +1012,7 @@ class BrewUtil:
             ], capture_output=False)
             if result.returncode == 0:
                 Logger.success(f"{description} installed successfully")
-                self._installed_casks.add(cask)
+                self._record_installed_casks([cask])
                 return True
             else:
                 Logger.warning(f"Failed to install {description}")
@@ -324,67 +1021,473 @@ class BrewUtil:
             Logger.warning(f"Failed to install {description}: {e}")
             return False
     
-    def install_formulas_batch(self, packages: List[str]) -> Tuple[List[str], List[str]]:
+    def prefetch_packages(self, formulas: List[str], casks: List[str], jobs: Optional[int] = None) -> List[str]:
         """
-        Install multiple Homebrew formulas in batch
+        Download formulas (with dependencies) and casks into HOMEBREW_CACHE concurrently
+        
+        Runs one `brew fetch` per package in a bounded thread pool so network I/O
+        overlaps across packages; the subsequent `brew install` then pours from the
+        warm cache. Fetch failures are not fatal: the install simply downloads again.
         
         Args:
-            packages: List of package names to install
+            formulas: Formula names to fetch
+            casks: Cask names to fetch
+            jobs: Maximum concurrent downloads (defaults to prefetch_jobs)
             
         Returns:
-            Tuple of (successful_packages, failed_packages)
+            List of package names whose fetch failed
         """
-        if not packages:
-            return [], []
-        
-        self._load_installed_formulas()
+        from concurrent.futures import ThreadPoolExecutor, as_completed
         
-        Logger.info(f"Checking installation status of {len(packages)} packages...")
-        
-        # Separate installed from missing packages
-        missing_packages = []
-        for package in packages:
-            if self.is_formula_installed(package):
-                Logger.success(f"{package} already installed")
-            else:
-                missing_packages.append(package)
+        commands = [(f, ['brew', 'fetch', '--deps', f]) for f in formulas]
+        commands += [(c, ['brew', 'fetch', '--cask', c]) for c in casks]
+        if not commands:
+            return []
         
-        successful_packages = [p for p in packages if self.is_formula_installed(p)]
-        failed_packages = []
+        jobs = max(1, jobs or self.prefetch_jobs or 1)
+        Logger.info(f"Prefetching {len(commands)} packages with up to {jobs} parallel downloads...")
         
-        # Install missing packages in batch if any
-        if missing_packages:
-            Logger.info(f"Installing {len(missing_packages)} missing packages: {' '.join(missing_packages)}")
-            try:
-                result = self._run_command(['brew', 'install'] + missing_packages, capture_output=False)
-                if result.returncode == 0:
-                    # Reload installed formulas since new packages were installed
-                    self._formulas_loaded = False
-                    self._installed_formulas.clear()
-                    self._load_installed_formulas()
-                    
-                    for package in missing_packages:
-                        Logger.success(f"{package} installed successfully")
-                    successful_packages.extend(missing_packages)
+        failed = []
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {executor.submit(self._stream_command, command, False): name for name, command in commands}
+            for done, future in enumerate(as_completed(futures), start=1):
+                name = futures[future]
+                try:
+                    ok = future.result().returncode == 0
+                except Exception:
+                    ok = False
+                if ok:
+                    Logger.info(f"[{done}/{len(commands)}] Fetched {name}")
                 else:
-                    Logger.warning("Some packages may have failed to install - checking individually...")
-                    # Fallback to individual installation for failed packages
-                    for package in missing_packages:
-                        if self.install_formula(package):
-                            successful_packages.append(package)
-                        else:
-                            failed_packages.append(package)
-            except Exception as e:
-                Logger.warning(f"Batch installation failed: {e} - falling back to individual installation")
-                # Fallback to individual installation
-                for package in missing_packages:
-                    if self.install_formula(package):
-                        successful_packages.append(package)
-                    else:
-                        failed_packages.append(package)
+                    Logger.warning(f"[{done}/{len(commands)}] Failed to prefetch {name} - it will be downloaded during install")
+                    failed.append(name)
+        return failed
+    
+    def _get_download_paths(self, packages: List[str], cask: bool = False) -> Dict[str, str]:
+        """
+        Ask brew where it caches the downloads of many packages with one `brew --cache` call
+        
+        Args:
+            packages: Formula or cask names
+            cask: True for casks
+            
+        Returns:
+            Mapping of package name to its path under HOMEBREW_CACHE (empty if brew failed)
+        """
+        if not packages:
+            return {}
+        try:
+            result = self._run_command(['brew', '--cache'] + (['--cask'] if cask else ['--formula']) + packages)
+        except (subprocess.TimeoutExpired, OSError):
+            return {}
+        paths = result.stdout.split('\n')[:len(packages)] if result.returncode == 0 else []
+        if len(paths) != len(packages):
+            return {}
+        return dict(zip(packages, paths))
+    
+    def _get_download_digest(self, package: str, path: str, cask: bool) -> Optional[str]:
+        """
+        Look up the sha256 brew will verify for a cached download
+        
+        Args:
+            package: Formula or cask name
+            path: Download path from _get_download_paths (carries the bottle tag)
+            cask: True for casks
+            
+        Returns:
+            Expected sha256, or None if the metadata does not pin one
+        """
+        if cask:
+            return self._cask_sha256.get(package)
+        bottles = (self._formula_metadata.get(package) or {}).get('bottles') or {}
+        match = re.search(r'\.([a-z0-9_]+)\.bottle(?:\.\d+)?\.tar\.gz$', path)
+        if match and match.group(1) in bottles:
+            return bottles[match.group(1)]
+        return bottles.get('all')
+    
+    def seed_download_cache(self, packages: List[str], cask: bool = False) -> Dict[str, Tuple[str, str]]:
+        """
+        Place artifacts from the artifact store into HOMEBREW_CACHE before an install
+        
+        Paths come from one `brew --cache` call and digests from brew's JSON
+        metadata (fetched in one call if not already known), so brew finds the
+        files already downloaded and only verifies their checksums.
+        
+        Args:
+            packages: Formula or cask names about to be installed
+            cask: True for casks
+            
+        Returns:
+            Mapping of package name to (download path, sha256) for ingest_downloads()
+        """
+        if not self.artifact_store or not packages:
+            return {}
+        if cask:
+            self._load_cask_app_names(packages)
+        else:
+            pending = [p for p in packages if p not in self._formula_metadata]
+            if pending:
+                self._formula_metadata.update(self._fetch_formula_metadata(pending) or {})
+        
+        downloads: Dict[str, Tuple[str, str]] = {}
+        seeded = 0
+        for package, path in self._get_download_paths(packages, cask).items():
+            digest = self._get_download_digest(package, path, cask)
+            if not digest:
+                continue
+            downloads[package] = (path, digest)
+            if not os.path.exists(path) and self.artifact_store.get(digest, path):
+                seeded += 1
+        Logger.info(f"Artifact store: {seeded} of {len(packages)} downloads served locally")
+        return downloads
+    
+    def ingest_downloads(self, downloads: Dict[str, Tuple[str, str]], packages: List[str]) -> None:
+        """
+        Add the verified downloads of installed packages to the artifact store
+        
+        Args:
+            downloads: Result of seed_download_cache()
+            packages: Packages that installed successfully
+        """
+        if not self.artifact_store:
+            return
+        added = 0
+        for package in packages:
+            path, digest = downloads.get(package, (None, None))
+            if not path or self.artifact_store.has(digest) or not os.path.isfile(path):
+                continue
+            if self.artifact_store.put(path, digest, name=os.path.basename(path)):
+                added += 1
+        if added:
+            Logger.info(f"Artifact store: added {added} new downloads")
+    
+    def _run_install_command(self, command: List[str]) -> StreamResult:
+        """
+        Run an install command with its output on the terminal while keeping stderr's tail
+        
+        brew's error messages are echoed live and the last lines are returned so
+        the caller can tell which packages of a batch were responsible for a failure.
+        
+        Args:
+            command: List of command parts
+            
+        Returns:
+            StreamResult with stderr populated
+        """
+        result = self._stream_command(command)
+        pours = result.events_of('pour')
+        if pours:
+            Logger.info(f"Poured {len(pours)} bottles, {len(result.events_of('download'))} downloaded "
+                        f"in {result.duration:.0f}s")
+        return result
+    
+    def _parse_failed_packages(self, stderr: str, candidates: List[str]) -> Set[str]:
+        """
+        Extract the names brew blamed for a failure, limited to the given candidates
+        
+        Args:
+            stderr: Captured brew stderr
+            candidates: Package names that may have failed
+            
+        Returns:
+            Set of candidate names mentioned in brew's error messages
+        """
+        mentioned = set()
+        for pattern in self.BREW_ERROR_PATTERNS:
+            mentioned.update(pattern.findall(stderr or ''))
+        # brew may report tap-qualified names (homebrew/core/foo)
+        mentioned.update(name.rsplit('/', 1)[-1] for name in list(mentioned))
+        return {c for c in candidates if c in mentioned}
+    
+    def _install_isolating_failures(self, packages: List[str], cask: bool = False) -> Tuple[List[str], List[str]]:
+        """
+        Install packages in one brew invocation, isolating failures if the batch fails
+        
+        On a non-zero exit the installed state is reloaded once to see which packages
+        actually landed. Packages brew named in its error output are marked failed and
+        the rest are retried as one batch; if brew named nobody, the remainder is
+        bisected. A single bad package therefore costs O(log n) extra invocations
+        instead of one `brew install` per package.
+        
+        Args:
+            packages: Missing formula or cask names
+            cask: True to install casks
+            
+        Returns:
+            Tuple of (successful_packages, failed_packages)
+        """
+        base_command = ['brew', 'install', '--cask', '--appdir=~/Applications'] if cask else ['brew', 'install']
+        try:
+            result = self._run_install_command(base_command + packages)
+        except Exception as e:
+            Logger.warning(f"Batch installation failed: {e}")
+            result = subprocess.CompletedProcess(base_command + packages, 1, None, str(e))
+        
+        if result.returncode == 0:
+            if cask:
+                self._record_installed_casks(packages)
+            else:
+                self._record_installed_formulas(packages)
+            return list(packages), []
+        
+        # One state reload tells us what landed despite the failure
+        if cask:
+            self._record_installed_casks([])
+            landed = [p for p in packages if p in self._installed_casks]
+        else:
+            self._record_installed_formulas([])
+            landed = [p for p in packages if self.is_formula_installed(p)]
+        remaining = [p for p in packages if p not in landed]
+        if not remaining:
+            return list(packages), []
+        if len(packages) == 1:
+            return [], list(packages)
+        
+        culprits = self._parse_failed_packages(result.stderr, remaining)
+        retry = [p for p in remaining if p not in culprits]
+        successful, failed = list(landed), [p for p in remaining if p in culprits]
+        if not retry:
+            return successful, failed
+        
+        if culprits or landed:
+            Logger.warning(f"Retrying {len(retry)} packages not installed by the failed batch...")
+            groups = [retry]
+        else:
+            Logger.warning(f"Batch failed without naming a package - bisecting {len(retry)} packages...")
+            middle = len(retry) // 2
+            groups = [retry[:middle], retry[middle:]]
+        
+        for group in groups:
+            group_successful, group_failed = self._install_isolating_failures(group, cask=cask)
+            successful.extend(group_successful)
+            failed.extend(group_failed)
+        return successful, failed
+    
+    def _fetch_formula_metadata(self, names: List[str]) -> Optional[Dict[str, Dict]]:
+        """
+        Fetch name and direct dependencies of many formulas with one `brew info --json=v2` call
+        
+        Args:
+            names: Formula names (aliases and tap-qualified names are accepted)
+            
+        Returns:
+            Mapping of every requested spelling and canonical name to {'name', 'dependencies'},
+            or None if brew could not describe the formulas
+        """
+        try:
+            result = self._run_command(['brew', 'info', '--json=v2', '--formula'] + names)
+            if result.returncode != 0:
+                return None
+            formulae = json.loads(result.stdout).get('formulae', [])
+        except (subprocess.TimeoutExpired, OSError, ValueError):
+            return None
+        return self._ingest_formula_info(formulae)
+    
+    def prefetch_metadata(self, formulas: List[str], casks: List[str]) -> None:
+        """
+        Describe formulas and casks about to be installed, with one `brew info` call each
+        
+        Args:
+            formulas: Missing formulas (their dependency plan reuses the descriptions)
+            casks: Missing casks (their app lookup reuses the descriptions)
+        """
+        pending = [f for f in formulas if f not in self._formula_metadata]
+        if pending:
+            self._formula_metadata.update(self._fetch_formula_metadata(pending) or {})
+        self._load_cask_app_names(casks)
+    
+    def _fetch_dependency_closure(self, names: List[str]) -> List[str]:
+        """
+        List every recursive runtime dependency of formulas with one `brew deps --union` call
+        
+        Args:
+            names: Canonical formula names
+            
+        Returns:
+            Dependency names (installed ones included), or [] if brew could not list them
+        """
+        try:
+            result = self._run_command(['brew', 'deps', '--union'] + names)
+        except (subprocess.TimeoutExpired, OSError):
+            return []
+        if result.returncode != 0:
+            return []
+        return [line.strip().rsplit('/', 1)[-1] for line in result.stdout.splitlines() if line.strip()]
+    
+    def _ingest_formula_info(self, formulae: List[Dict]) -> Dict[str, Dict]:
+        """
+        Index formulas described by `brew info --json=v2` and learn their aliases
+        
+        Args:
+            formulae: The 'formulae' list of brew's JSON output
+            
+        Returns:
+            Mapping of every canonical name and alias to {'name', 'dependencies', 'bottles'}
+        """
+        metadata: Dict[str, Dict] = {}
+        aliases: Dict[str, str] = {}
+        for formula in formulae:
+            bottle_files = ((formula.get('bottle') or {}).get('stable') or {}).get('files') or {}
+            entry = {
+                'name': formula['name'],
+                'dependencies': [dep.rsplit('/', 1)[-1] for dep in formula.get('dependencies') or []],
+                'bottles': {tag: info.get('sha256') for tag, info in bottle_files.items() if info.get('sha256')},
+            }
+            formula_aliases = self._formula_json_aliases(formula)
+            aliases.update(formula_aliases)
+            for key in [formula['name']] + list(formula_aliases):
+                metadata[key] = entry
+        self._learn_formula_aliases(aliases)
+        return metadata
+    
+    def plan_formula_install(self, packages: List[str]) -> Optional[Dict]:
+        """
+        Resolve the missing dependency graph of formulas and order them in topological waves
+        
+        Requested formulas are described with one batched `brew info` call (and the
+        descriptions are kept for the life of this BrewUtil). If any of them needs
+        a dependency that is neither installed nor described, the whole closure is
+        snapshotted at once: one `brew deps --union` lists it and one `brew info`
+        describes its missing members, however deep the graph. Installed
+        dependencies count as satisfied and are pruned from the graph.
+        
+        Args:
+            packages: Missing formula names to plan
+            
+        Returns:
+            Dict with 'waves' (lists of formulas that can be poured together, dependencies
+            first), 'order' (the requested names in install order) and 'dependencies'
+            (formulas that will be poured only as dependencies), or None if brew could
+            not describe the packages
+        """
+        known = self._formula_metadata
+        pending = [p for p in packages if p not in known]
+        if pending:
+            fetched = self._fetch_formula_metadata(pending)
+            if fetched is None:
+                return None
+            known.update(fetched)
+        
+        requested: Dict[str, str] = {}
+        for package in packages:
+            entry = known.get(package) or known.get(self.resolve_formula_name(package))
+            if not entry:
+                return None
+            requested[entry['name']] = package
+        
+        missing_direct = {dep for name in requested for dep in known[name]['dependencies']
+                          if dep not in known and not self.is_formula_installed(dep)}
+        if missing_direct:
+            closure = self._fetch_dependency_closure(list(requested))
+            unknown = sorted({dep for dep in closure if dep not in known and not self.is_formula_installed(dep)})
+            if unknown:
+                more = self._fetch_formula_metadata(unknown)
+                if more is None:
+                    return None
+                known.update(more)
+        
+        # Breadth-first over missing dependencies; the snapshot normally leaves nothing to fetch here
+        graph: Dict[str, List[str]] = {}
+        frontier = list(requested)
+        while frontier:
+            next_level = []
+            for name in frontier:
+                deps = known[name]['dependencies'] if name in known else []
+                graph[name] = [dep for dep in deps if not self.is_formula_installed(dep)]
+                next_level.extend(graph[name])
+            unknown = sorted({dep for dep in next_level if dep not in known})
+            if unknown:
+                more = self._fetch_formula_metadata(unknown)
+                if more is None:
+                    return None
+                known.update(more)
+            frontier = [dep for dep in dict.fromkeys(next_level) if dep not in graph]
+        
+        levels: Dict[str, int] = {}
+        
+        def level(name: str, path: Tuple[str, ...] = ()) -> int:
+            if name not in levels:
+                deps = [dep for dep in graph.get(name, []) if dep not in path]
+                levels[name] = 1 + max((level(dep, path + (name,)) for dep in deps), default=-1)
+            return levels[name]
+        
+        for name in graph:
+            level(name)
+        waves = [sorted(n for n in graph if levels[n] == i) for i in range(max(levels.values(), default=-1) + 1)]
+        return {
+            'waves': waves,
+            'order': [requested[name] for wave in waves for name in wave if name in requested],
+            'dependencies': sorted(n for n in graph if n not in requested),
+        }
+    
+    @staticmethod
+    def _log_install_plan(plan: Dict) -> None:
+        """Report the dependency waves and the transitive dependencies an install will pour"""
+        Logger.info(f"Dependency plan: {len(plan['order'])} formulas in {len(plan['waves'])} waves, "
+                    f"{len(plan['dependencies'])} new dependencies")
+        for number, wave in enumerate(plan['waves'], 1):
+            Logger.info(f"  Wave {number}: {' '.join(wave)}")
+        if plan['dependencies']:
+            Logger.info(f"Dependencies that will be poured: {' '.join(plan['dependencies'])}")
+    
+    def install_formulas_batch(self, packages: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Install multiple Homebrew formulas in batch
+        
+        Args:
+            packages: List of package names to install
+            
+        Returns:
+            Tuple of (successful_packages, failed_packages)
+        """
+        if not packages:
+            return [], []
+        
+        # A journal hit is only trusted while the (cached) Cellar scan still shows every package,
+        # since packages can be removed outside purge-devlab.sh
+        journal_key = step_key('brew install', *packages)
+        self._load_installed_formulas()
+        if self.journal.is_done(journal_key) and all(self.is_formula_installed(p) for p in packages):
+            Logger.success(f"All {len(packages)} packages already installed (journal)")
+            return list(packages), []
+        
+        Logger.info(f"Checking installation status of {len(packages)} packages...")
+        
+        # Separate installed from missing packages
+        missing_packages = []
+        successful_packages = []
+        for package in packages:
+            if self.is_formula_installed(package):
+                Logger.success(f"{package} already installed")
+                successful_packages.append(package)
+            else:
+                missing_packages.append(package)
+        
+        failed_packages = []
+        
+        # Install missing packages in batch if any
+        if missing_packages:
+            plan = self.plan_formula_install(missing_packages)
+            if plan:
+                self._log_install_plan(plan)
+                missing_packages = plan['order']
+            downloads = self.seed_download_cache(missing_packages + (plan['dependencies'] if plan else []))
+            if self.prefetch_jobs > 0:
+                self.prefetch_packages(missing_packages, [])
+            Logger.info(f"Installing {len(missing_packages)} missing packages: {' '.join(missing_packages)}")
+            installed, failed = self._install_isolating_failures(missing_packages)
+            self.ingest_downloads(downloads, [p for p in downloads if self.is_formula_installed(p)])
+            for package in installed:
+                Logger.success(f"{package} installed successfully")
+            for package in failed:
+                Logger.warning(f"Failed to install {package}")
+            successful_packages.extend(installed)
+            failed_packages.extend(failed)
         else:
             Logger.success(f"All {len(packages)} packages already installed")
         
+        if not failed_packages:
+            self.journal.record(journal_key)
         return successful_packages, failed_packages
     
     def install_casks_batch(self, casks: List[str]) -> Tuple[List[str], List[str]]:
@@ -404,54 +1507,568 @@ class BrewUtil:
             Logger.info(f"Skipping {len(casks)} cask applications (SKIP_CASK_APPS=true)")
             return [], []  # Return empty lists instead of treating skips as failures
         
+        journal_key = step_key('brew install --cask', *casks)
         self._load_installed_casks()
+        if self.journal.is_done(journal_key) and all(c in self._installed_casks for c in casks):
+            Logger.success(f"All {len(casks)} applications already installed (journal)")
+            return list(casks), []
         
         Logger.info(f"Checking installation status of {len(casks)} applications...")
         
+        # Resolve app names for every cask brew does not manage in one bulk lookup
+        self._load_cask_app_names([c for c in casks if c not in self._installed_casks])
+        
         # Separate installed from missing casks
         missing_casks = []
+        successful_casks = []
         for cask in casks:
             if self.is_cask_installed(cask):  # This now checks both brew list and filesystem
                 Logger.success(f"{cask} already installed")
+                successful_casks.append(cask)
             else:
                 missing_casks.append(cask)
         
-        successful_casks = [c for c in casks if self.is_cask_installed(c)]
         failed_casks = []
         
         # Install missing casks in batch if any
         if missing_casks:
+            downloads = self.seed_download_cache(missing_casks, cask=True)
+            if self.prefetch_jobs > 0:
+                self.prefetch_packages([], missing_casks)
             Logger.info(f"Installing {len(missing_casks)} missing applications: {' '.join(missing_casks)}")
-            try:
-                result = self._run_command([
-                    'brew', 'install', '--cask', '--appdir=~/Applications'
-                ] + missing_casks, capture_output=False)
-                if result.returncode == 0:
-                    for cask in missing_casks:
-                        Logger.success(f"{cask} installed successfully")
-                        self._installed_casks.add(cask)
-                    successful_casks.extend(missing_casks)
-                else:
-                    Logger.warning("Some applications may have failed to install - checking individually...")
-                    # Fallback to individual installation for failed casks
-                    for cask in missing_casks:
-                        if self.install_cask(cask):
-                            successful_casks.append(cask)
-                        else:
-                            failed_casks.append(cask)
-            except Exception as e:
-                Logger.warning(f"Batch installation failed: {e} - falling back to individual installation")
-                # Fallback to individual installation
-                for cask in missing_casks:
-                    if self.install_cask(cask):
-                        successful_casks.append(cask)
-                    else:
-                        failed_casks.append(cask)
+            installed, failed = self._install_isolating_failures(missing_casks, cask=True)
+            self.ingest_downloads(downloads, installed)
+            for cask in installed:
+                Logger.success(f"{cask} installed successfully")
+            for cask in failed:
+                Logger.warning(f"Failed to install {cask}")
+            successful_casks.extend(installed)
+            failed_casks.extend(failed)
         else:
             Logger.success(f"All {len(casks)} applications already installed")
         
+        if not failed_casks:
+            self.journal.record(journal_key)
         return successful_casks, failed_casks
     
+    def install_manifest(self, manifest: PackageManifest, phases: Optional[List[str]] = None,
+                         groups: Optional[List[str]] = None) -> Tuple[List[str], List[str]]:
+        """
+        Install everything the manifest selects with as few brew invocations as possible
+        
+        The missing set is computed across all selected phases/groups at once, so
+        the formulas go through one batched `brew install` and the casks through
+        one `brew install --cask`, instead of one round-trip per goal.
+        
+        Args:
+            manifest: Loaded package manifest
+            phases: Phase numbers to include (None for all)
+            groups: Group names to include (None for all)
+            
+        Returns:
+            Tuple of (successful_packages, failed_packages)
+        """
+        journal_key = self.manifest_journal_key(manifest, phases, groups)
+        formulas = manifest.packages('formulas', phases, groups)
+        casks = manifest.packages('casks', phases, groups)
+        if self.journal.is_done(journal_key):
+            self._load_installed_formulas()
+            self._load_installed_casks()
+            if (all(self.is_formula_installed(p) for p in formulas)
+                    and (self.skip_cask_apps or all(c in self._installed_casks for c in casks))):
+                Logger.success("Manifest packages already installed (journal)")
+                return [], []
+
+        selected = manifest.select_groups(phases, groups)
+        Logger.info(f"Install plan: {len(formulas)} formulas and {len(casks)} casks from {len(selected)} manifest groups")
+        # With --query-jobs the formula and cask descriptions are fetched side by side
+        self._load_installed_casks()
+        self.prefetch_metadata([p for p in formulas if not self.is_formula_installed(p)],
+                               [] if self.skip_cask_apps else [c for c in casks if c not in self._installed_casks])
+        
+        successful, failed = self.install_formulas_batch(formulas)
+        cask_successful, cask_failed = self.install_casks_batch(casks)
+        if not failed and not cask_failed:
+            self.journal.record(journal_key)
+        return successful + cask_successful, failed + cask_failed
+    
+    def manifest_journal_key(self, manifest: PackageManifest, phases: Optional[List[str]] = None,
+                             groups: Optional[List[str]] = None) -> str:
+        """
+        Journal key of a manifest install
+        
+        The manifest's modification time is part of the key, so editing the
+        manifest makes the next run check the selected packages again.
+        """
+        inputs = []
+        if phases:
+            inputs += ['--phases'] + list(phases)
+        if groups:
+            inputs += ['--groups'] + list(groups)
+        if self.skip_cask_apps:
+            inputs.append('--skip-cask-apps')
+        inputs += ['--mtime', int(os.stat(manifest.path).st_mtime)]
+        return step_key('brew install-manifest', *inputs)
+    
+    def _current_version(self, name: str, cask: bool = False) -> Optional[str]:
+        """Installed version in use: the opt-linked keg for formulas, else the newest version"""
+        details = (self._cask_details if cask else self._formula_details).get(name) or {}
+        versions = details.get('versions') or []
+        if not versions:
+            return None
+        return details.get('linked_version') if details.get('linked_version') in versions else versions[-1]
+    
+    def _read_install_receipt(self, name: str) -> Optional[Dict]:
+        """
+        Read the INSTALL_RECEIPT.json of a formula's current keg
+        
+        Args:
+            name: Installed formula name
+            
+        Returns:
+            Parsed receipt, or None if the keg or receipt is unavailable
+        """
+        prefix = self._get_brew_prefix()
+        version = self._current_version(name)
+        if not prefix or not version:
+            return None
+        try:
+            with open(os.path.join(prefix, 'Cellar', name, version, 'INSTALL_RECEIPT.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _load_installed_dependencies(self) -> Dict[str, List[str]]:
+        """
+        Build the runtime dependency index of every installed formula
+        
+        Each keg records its runtime dependencies in INSTALL_RECEIPT.json, so the
+        index usually costs a directory walk. Formulas without a readable receipt
+        are filled in from one `brew info --json=v2 --installed` call.
+        
+        Returns:
+            Mapping of installed formula name to the names of its runtime dependencies
+        """
+        if self._installed_dependencies is not None:
+            return self._installed_dependencies
+        
+        self._load_installed_formulas()
+        index: Dict[str, List[str]] = {}
+        for name in self._installed_formulas:
+            receipt = self._read_install_receipt(name)
+            if receipt is None:
+                continue
+            index[name] = [dep['full_name'].rsplit('/', 1)[-1]
+                           for dep in receipt.get('runtime_dependencies') or [] if dep.get('full_name')]
+        
+        if len(index) < len(self._installed_formulas):
+            try:
+                result = self._run_command(['brew', 'info', '--json=v2', '--installed'])
+                formulae = json.loads(result.stdout).get('formulae', []) if result.returncode == 0 else []
+            except (subprocess.TimeoutExpired, OSError, ValueError):
+                formulae = []
+            self._learn_formula_aliases({alias: name for formula in formulae
+                                         for alias, name in self._formula_json_aliases(formula).items()})
+            for formula in formulae:
+                if formula['name'] in index:
+                    continue
+                installed = (formula.get('installed') or [{}])[-1]
+                runtime = installed.get('runtime_dependencies')
+                if runtime is not None:
+                    index[formula['name']] = [dep['full_name'].rsplit('/', 1)[-1]
+                                              for dep in runtime if dep.get('full_name')]
+                else:
+                    index[formula['name']] = [dep.rsplit('/', 1)[-1] for dep in formula.get('dependencies') or []]
+        
+        self._installed_dependencies = index
+        return index
+    
+    def plan_formula_uninstall(self, packages: List[str]) -> Dict:
+        """
+        Decide which formulas can be removed without breaking other installed formulas
+        
+        A reverse-dependency index is built once from the installed dependency
+        index. Starting from every requested, installed formula, anything still
+        required by an installed formula outside the removal set is kept, until
+        the set stops changing. What remains can go in a single `brew uninstall`.
+        
+        Args:
+            packages: Formula names to remove
+            
+        Returns:
+            Dict with 'remove' (formulas to uninstall), 'kept' (formula -> installed
+            formulas that still need it) and 'not_installed'
+        """
+        self._load_installed_formulas()
+        dependencies = self._load_installed_dependencies()
+        dependents: Dict[str, Set[str]] = {}
+        for name, deps in dependencies.items():
+            for dep in deps:
+                dependents.setdefault(dep, set()).add(name)
+        
+        removable, not_installed = [], []
+        for package in packages:
+            name = self.resolve_formula_name(package)
+            if name in self._installed_formulas:
+                removable.append(name)
+            else:
+                not_installed.append(package)
+        removable = list(dict.fromkeys(removable))
+        
+        kept: Dict[str, List[str]] = {}
+        changed = True
+        while changed:
+            changed = False
+            remaining = set(removable)
+            for name in list(removable):
+                blockers = dependents.get(name, set()) - remaining
+                if blockers:
+                    kept[name] = sorted(blockers)
+                    removable.remove(name)
+                    remaining.discard(name)
+                    changed = True
+        
+        return {'remove': removable, 'kept': kept, 'not_installed': not_installed}
+    
+    def _uninstall(self, names: List[str], cask: bool, dry_run: bool) -> Tuple[List[str], List[str]]:
+        """
+        Remove packages with one `brew uninstall` call and report what is gone
+        
+        Args:
+            names: Installed formula or cask names
+            cask: True to uninstall casks
+            dry_run: If True, only report the command
+            
+        Returns:
+            Tuple of (removed_packages, failed_packages)
+        """
+        command = ['brew', 'uninstall', '--cask' if cask else '--formula'] + names
+        if dry_run:
+            Logger.info(f"[DRY RUN] Would run: {' '.join(command)}")
+            return list(names), []
+        
+        Logger.info(f"Uninstalling {len(names)} {'casks' if cask else 'formulas'}: {' '.join(names)}")
+        try:
+            result = self._run_install_command(command)
+            returncode = result.returncode
+        except Exception as e:
+            Logger.warning(f"Batch uninstall failed: {e}")
+            returncode = 1
+        
+        # Install steps recorded in the journal may cover what was just removed
+        self.journal.forget('brew install')
+        if cask:
+            self._record_installed_casks([])
+            still_installed = self._installed_casks
+        else:
+            self._record_installed_formulas([])
+            still_installed = self._installed_formulas
+        if returncode == 0:
+            return list(names), []
+        return [n for n in names if n not in still_installed], [n for n in names if n in still_installed]
+    
+    def uninstall_formulas_batch(self, packages: List[str], dry_run: bool = False) -> Tuple[List[str], List[str]]:
+        """
+        Uninstall formulas that no other installed formula depends on, in one brew call
+        
+        Args:
+            packages: Formula names to remove
+            dry_run: If True, only print the plan
+            
+        Returns:
+            Tuple of (removed_packages, failed_packages); formulas kept because
+            something else needs them are neither
+        """
+        if not packages:
+            return [], []
+        
+        plan = self.plan_formula_uninstall(packages)
+        for package in plan['not_installed']:
+            Logger.info(f"{package} not installed")
+        for name, blockers in sorted(plan['kept'].items()):
+            Logger.warning(f"Keeping {name}: still required by {', '.join(blockers)}")
+        if not plan['remove']:
+            Logger.info("No formulas to uninstall")
+            return [], []
+        
+        removed, failed = self._uninstall(plan['remove'], cask=False, dry_run=dry_run)
+        for package in failed:
+            Logger.warning(f"Failed to uninstall {package}")
+        return removed, failed
+    
+    def uninstall_casks_batch(self, casks: List[str], dry_run: bool = False) -> Tuple[List[str], List[str]]:
+        """
+        Uninstall the installed casks among the given ones in one brew call
+        
+        Args:
+            casks: Cask names to remove
+            dry_run: If True, only print the plan
+            
+        Returns:
+            Tuple of (removed_casks, failed_casks)
+        """
+        self._load_installed_casks()
+        installed = [c for c in dict.fromkeys(casks) if c in self._installed_casks]
+        for cask in casks:
+            if cask not in self._installed_casks:
+                Logger.info(f"{cask} not installed")
+        if not installed:
+            Logger.info("No casks to uninstall")
+            return [], []
+        
+        removed, failed = self._uninstall(installed, cask=True, dry_run=dry_run)
+        for cask in failed:
+            Logger.warning(f"Failed to uninstall cask {cask}")
+        return removed, failed
+    
+    def _list_pinned(self) -> Set[str]:
+        """Pinned formulas, read from the var/homebrew/pinned links brew keeps"""
+        prefix = self._get_brew_prefix()
+        try:
+            return {entry.name for entry in os.scandir(os.path.join(prefix, 'var', 'homebrew', 'pinned'))} if prefix else set()
+        except OSError:
+            return set()
+    
+    def _list_taps(self) -> Set[str]:
+        """Installed taps, read from Library/Taps (<user>/homebrew-<repo> -> <user>/<repo>)"""
+        prefix = self._get_brew_prefix()
+        if not prefix:
+            return set()
+        repository = os.environ.get('HOMEBREW_REPOSITORY')
+        candidates = [repository] if repository else [prefix, os.path.join(prefix, 'Homebrew')]
+        for root in candidates:
+            taps_dir = os.path.join(root, 'Library', 'Taps')
+            if not os.path.isdir(taps_dir):
+                continue
+            taps = set()
+            for user in os.listdir(taps_dir):
+                user_dir = os.path.join(taps_dir, user)
+                if os.path.isdir(user_dir):
+                    taps.update(f"{user}/{repo[len('homebrew-'):]}" for repo in os.listdir(user_dir)
+                                if repo.startswith('homebrew-'))
+            return taps
+        return set()
+    
+    def snapshot_state(self) -> Dict:
+        """
+        Capture the exact installed state: formulas, casks, versions, taps and pins
+        
+        Returns:
+            Lockfile dict; formulas also record whether they were installed on request
+        """
+        self._load_installed_formulas()
+        self._load_installed_casks()
+        pinned = self._list_pinned()
+        formulas = {}
+        for name in sorted(self._installed_formulas):
+            receipt = self._read_install_receipt(name) or {}
+            formulas[name] = {
+                'version': self._current_version(name),
+                'pinned': name in pinned,
+                'on_request': receipt.get('installed_on_request', True),
+            }
+        casks = {name: {'version': self._current_version(name, cask=True)} for name in sorted(self._installed_casks)}
+        return {'version': 1, 'formulas': formulas, 'casks': casks, 'taps': sorted(self._list_taps())}
+    
+    def write_lockfile(self, path: str = DEFAULT_LOCKFILE) -> Dict:
+        """
+        Write the current installed state to a lockfile
+        
+        Args:
+            path: Lockfile path
+            
+        Returns:
+            The written lockfile dict
+        """
+        lock = self.snapshot_state()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_file = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(lock, f, indent=2, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp_file, path)
+        Logger.success(f"Wrote lockfile with {len(lock['formulas'])} formulas, {len(lock['casks'])} casks "
+                       f"and {len(lock['taps'])} taps to {path}")
+        return lock
+    
+    def plan_reconcile(self, lock: Dict) -> Dict[str, List[str]]:
+        """
+        Compute the minimal changes that bring this machine to a lockfile
+        
+        Everything is set arithmetic over the cached installed state plus two
+        directory listings (pins, taps), so an up-to-date machine costs no brew calls.
+        
+        Args:
+            lock: Lockfile dict from snapshot_state()
+            
+        Returns:
+            Dict of change lists: tap, install_formulas, upgrade_formulas, uninstall_formulas,
+            install_casks, upgrade_casks, uninstall_casks, pin, unpin and newer (installed
+            versions ahead of the lockfile, which brew cannot downgrade)
+        """
+        self._load_installed_formulas()
+        self._load_installed_casks()
+        locked_formulas = lock.get('formulas', {})
+        locked_casks = lock.get('casks', {})
+        pinned = self._list_pinned()
+        plan: Dict[str, List[str]] = {key: [] for key in (
+            'tap', 'install_formulas', 'upgrade_formulas', 'uninstall_formulas',
+            'install_casks', 'upgrade_casks', 'uninstall_casks', 'pin', 'unpin', 'newer')}
+        
+        plan['tap'] = sorted(set(lock.get('taps', [])) - self._list_taps())
+        missing = set(locked_formulas) - self._installed_formulas
+        # Dependencies come along with the formulas that need them
+        plan['install_formulas'] = sorted(n for n in missing if locked_formulas[n].get('on_request', True))
+        plan['uninstall_formulas'] = sorted(self._installed_formulas - set(locked_formulas))
+        plan['install_casks'] = sorted(set(locked_casks) - self._installed_casks)
+        plan['uninstall_casks'] = sorted(self._installed_casks - set(locked_casks))
+        
+        for kind, locked, installed, cask in (('formulas', locked_formulas, self._installed_formulas, False),
+                                              ('casks', locked_casks, self._installed_casks, True)):
+            for name in sorted(set(locked) & installed):
+                wanted, current = locked[name].get('version'), self._current_version(name, cask)
+                if not wanted or not current or wanted == current:
+                    continue
+                if self._version_sort_key(current) < self._version_sort_key(wanted):
+                    plan[f"upgrade_{kind}"].append(name)
+                else:
+                    plan['newer'].append(f"{name} {current} (locked {wanted})")
+        
+        for name, entry in locked_formulas.items():
+            if entry.get('pinned') and name not in pinned:
+                plan['pin'].append(name)
+        plan['pin'].sort()
+        plan['unpin'] = sorted(n for n in pinned & self._installed_formulas
+                               if n in locked_formulas and not locked_formulas[n].get('pinned'))
+        return plan
+    
+    def reconcile(self, path: str = DEFAULT_LOCKFILE, prune: bool = False,
+                  dry_run: bool = False) -> Tuple[List[str], List[str]]:
+        """
+        Apply the minimal change set between a lockfile and this machine in batched calls
+        
+        Args:
+            path: Lockfile path
+            prune: If True, also uninstall packages the lockfile does not list
+            dry_run: If True, only print the plan
+            
+        Returns:
+            Tuple of (changed_packages, failed_packages)
+        """
+        with open(path) as f:
+            lock = json.load(f)
+        plan = self.plan_reconcile(lock)
+        if not prune:
+            plan['uninstall_formulas'], plan['uninstall_casks'] = [], []
+        
+        for name in plan['newer']:
+            Logger.warning(f"Installed version is ahead of the lockfile: {name}")
+        pending = {key: names for key, names in plan.items() if names and key != 'newer'}
+        if not pending:
+            Logger.success(f"Installed state matches {path}")
+            return [], []
+        for key, names in pending.items():
+            Logger.info(f"{'[DRY RUN] ' if dry_run else ''}{key.replace('_', ' ')}: {' '.join(names)}")
+        if dry_run:
+            return [n for names in pending.values() for n in names], []
+        
+        changed, failed = [], []
+        for tap in plan['tap']:
+            (changed if self._run_reconcile_command(['brew', 'tap', tap]) else failed).append(tap)
+        for installer, names in ((self.install_formulas_batch, plan['install_formulas']),
+                                 (self.install_casks_batch, plan['install_casks'])):
+            if names:
+                ok, bad = installer(names)
+                changed.extend(ok)
+                failed.extend(bad)
+        for flag, names in (('--formula', plan['upgrade_formulas']), ('--cask', plan['upgrade_casks'])):
+            if names:
+                ok, bad = self._upgrade_isolating_failures(names, flag)
+                changed.extend(ok)
+                failed.extend(bad)
+        for command, names in (('pin', plan['pin']), ('unpin', plan['unpin'])):
+            if names and self._run_reconcile_command(['brew', command] + names):
+                changed.extend(names)
+            elif names:
+                # Settle which packages the failed batch left unchanged, one call each
+                for name in names:
+                    (changed if self._run_reconcile_command(['brew', command, name]) else failed).append(name)
+        for uninstaller, names in ((self.uninstall_formulas_batch, plan['uninstall_formulas']),
+                                   (self.uninstall_casks_batch, plan['uninstall_casks'])):
+            if names:
+                ok, bad = uninstaller(names)
+                changed.extend(ok)
+                failed.extend(bad)
+        
+        self._record_installed_formulas([])
+        self._record_installed_casks([])
+        Logger.success(f"Reconciled with {path}: {len(changed)} changed, {len(failed)} failed")
+        return changed, failed
+    
+    def _run_reconcile_command(self, command: List[str]) -> bool:
+        """Run one `brew tap`/`pin`/`unpin` call of a reconcile, treating timeouts and OS errors as failure"""
+        try:
+            return self._run_command(command, capture_output=False).returncode == 0
+        except (subprocess.TimeoutExpired, OSError) as e:
+            Logger.warning(f"{' '.join(command)} failed: {e}")
+            return False
+    
+    def _upgrade_isolating_failures(self, names: List[str], flag: str) -> Tuple[List[str], List[str]]:
+        """
+        Upgrade packages in one brew invocation, isolating failures if the batch fails
+        
+        Packages brew named in its error output are marked failed and the rest are
+        retried as one batch; if brew named nobody, each package is upgraded on its
+        own, so a failed batch is never reported as upgraded.
+        
+        Args:
+            names: Formula or cask names to upgrade
+            flag: '--formula' or '--cask'
+            
+        Returns:
+            Tuple of (upgraded, failed) names
+        """
+        command = ['brew', 'upgrade', flag] + names
+        try:
+            result = self._run_install_command(command)
+        except (subprocess.TimeoutExpired, OSError) as e:
+            Logger.warning(f"Batch upgrade failed: {e}")
+            result = subprocess.CompletedProcess(command, 1, None, str(e))
+        if result.returncode == 0:
+            return list(names), []
+        if len(names) == 1:
+            return [], list(names)
+        
+        culprits = self._parse_failed_packages(result.stderr, names)
+        failed = [n for n in names if n in culprits]
+        if culprits:
+            retry = [n for n in names if n not in culprits]
+            ok, bad = self._upgrade_isolating_failures(retry, flag) if retry else ([], [])
+            return ok, failed + bad
+        
+        Logger.warning(f"Batch upgrade failed without naming a package - upgrading {len(names)} packages one at a time...")
+        upgraded: List[str] = []
+        for name in names:
+            ok, bad = self._upgrade_isolating_failures([name], flag)
+            upgraded.extend(ok)
+            failed.extend(bad)
+        return upgraded, failed
+    
+    def refresh_state(self) -> None:
+        """
+        Drop in-memory installed state so the next query revalidates it
+        
+        Used by the long-lived server between requests: the on-disk cache, the
+        application index and resolved cask metadata stay warm and are
+        revalidated by their own stamps, so a refresh costs a couple of stats.
+        """
+        self._formulas_loaded = False
+        self._casks_loaded = False
+        self._installed_dependencies = None
+        if not self._brew_prefix:
+            # Homebrew may have been installed since the prefix was last probed
+            self._brew_prefix = None
+    
     def update_homebrew(self) -> bool:
         """
         Update Homebrew package database
@@ -459,11 +2076,15 @@ class BrewUtil:
         Returns:
             True if successful, False otherwise
         """
+        # An explicit update always runs; the day's record only lets provision-devlab.sh skip its own update
+        journal_key = step_key('brew update', time.strftime('%Y-%m-%d'))
+        
         Logger.info("Updating Homebrew...")
         try:
             result = self._run_command(['brew', 'update'], capture_output=False)
             if result.returncode == 0:
                 Logger.success("Homebrew updated successfully")
+                self.journal.record(journal_key)
                 # Clear cached data since packages may have changed
                 self._formulas_loaded = False
                 self._casks_loaded = False
@@ -477,6 +2098,165 @@ class BrewUtil:
             Logger.warning(f"Failed to update Homebrew: {e}")
             return False
     
+    @staticmethod
+    def _parse_version(version: str) -> Tuple[Optional[Tuple[int, ...]], int]:
+        """
+        Parse a Homebrew version string into numeric release components and a revision
+        
+        Handles formula revisions (1.2.3_1), cask build suffixes (4.5,1234), v-prefixes
+        and pre-release tails (3.0.0-beta1 -> 3.0.0). Non-numeric versions such as
+        `latest` or commit hashes yield None.
+        
+        Args:
+            version: Version string from brew
+            
+        Returns:
+            Tuple of (release components or None, revision)
+        """
+        version = version.strip().split(',', 1)[0]
+        revision = 0
+        match = re.search(r'_(\d+)$', version)
+        if match:
+            revision = int(match.group(1))
+            version = version[:match.start()]
+        match = re.match(r'[vV]?(\d+(?:[.-]\d+)*)', version)
+        if not match:
+            return None, revision
+        return tuple(int(part) for part in re.split(r'[.-]', match.group(1))), revision
+    
+    @classmethod
+    def classify_version_change(cls, current: str, latest: str) -> str:
+        """
+        Classify an available update as 'major', 'minor', 'patch', 'revision' or 'other'
+        
+        Args:
+            current: Installed version
+            latest: Available version
+            
+        Returns:
+            Change class; 'other' when either version is not numeric or only a tag changed
+        """
+        current_release, current_revision = cls._parse_version(current)
+        latest_release, latest_revision = cls._parse_version(latest)
+        if current_release is None or latest_release is None:
+            return 'other'
+        width = max(len(current_release), len(latest_release), 3)
+        current_release += (0,) * (width - len(current_release))
+        latest_release += (0,) * (width - len(latest_release))
+        if latest_release[0] != current_release[0]:
+            return 'major'
+        if latest_release[1] != current_release[1]:
+            return 'minor'
+        if latest_release != current_release:
+            return 'patch'
+        if latest_revision != current_revision:
+            return 'revision'
+        return 'other'
+    
+    def get_outdated(self) -> Optional[List[Dict]]:
+        """
+        List outdated formulas and casks with one `brew outdated --json=v2` call
+        
+        Returns:
+            List of {'name', 'cask', 'current', 'latest', 'pinned', 'change'}, or None if brew failed
+        """
+        try:
+            result = self._run_command(['brew', 'outdated', '--json=v2'])
+            if result.returncode != 0:
+                return None
+            data = json.loads(result.stdout)
+        except (subprocess.TimeoutExpired, OSError, ValueError):
+            return None
+        
+        outdated = []
+        for key, cask in (('formulae', False), ('casks', True)):
+            for entry in data.get(key, []):
+                installed = entry.get('installed_versions') or []
+                if isinstance(installed, str):
+                    installed = [installed]
+                current = max(installed, key=self._version_sort_key) if installed else ''
+                latest = entry.get('current_version') or ''
+                outdated.append({
+                    'name': entry['name'],
+                    'cask': cask,
+                    'current': current,
+                    'latest': latest,
+                    'pinned': bool(entry.get('pinned')),
+                    'change': self.classify_version_change(current, latest),
+                })
+        return outdated
+    
+    def upgrade_selective(self, policy: str = 'major-minor', exclude: Optional[List[str]] = None,
+                          dry_run: bool = False) -> Tuple[List[str], List[str]]:
+        """
+        Upgrade the outdated packages whose version change the policy accepts
+        
+        Outdated packages are listed once, classified in one pass, and the chosen
+        formulas and casks are upgraded with one batched `brew upgrade` each.
+        
+        Args:
+            policy: 'major', 'major-minor' or 'all'
+            exclude: Package names to leave at their current version
+            dry_run: If True, only report what would be upgraded
+            
+        Returns:
+            Tuple of (upgraded_packages, failed_packages); in dry-run mode the packages
+            that would be upgraded
+        """
+        accepted = self.UPGRADE_POLICIES[policy]
+        exclude = set(exclude or [])
+        Logger.info(f"Running selective upgrade: {policy}")
+        
+        outdated = self.get_outdated()
+        if outdated is None:
+            Logger.error("Failed to list outdated packages")
+            return [], []
+        if not outdated:
+            Logger.success("All packages are up to date")
+            return [], []
+        
+        selected: Dict[bool, List[str]] = {False: [], True: []}
+        skipped = 0
+        for entry in sorted(outdated, key=lambda e: e['name']):
+            change = f"{entry['current']} → {entry['latest']}"
+            if entry['name'] in exclude:
+                reason = 'excluded'
+            elif entry['pinned']:
+                reason = 'pinned'
+            elif entry['cask'] and self.skip_cask_apps:
+                reason = 'cask apps skipped'
+            elif entry['change'] not in accepted:
+                reason = f"{entry['change']} update"
+            else:
+                selected[entry['cask']].append(entry['name'])
+                print(f"   {Colors.GREEN}✓{Colors.NC} {entry['name']:<25} {change} ({entry['change']})")
+                continue
+            print(f"   {Colors.YELLOW}⏭{Colors.NC} {entry['name']:<25} {change} (skipped: {reason})")
+            skipped += 1
+        
+        chosen = selected[False] + selected[True]
+        if not chosen:
+            Logger.info(f"No packages meet the upgrade criteria ({policy})")
+            return [], []
+        if dry_run:
+            Logger.info(f"Dry run: would upgrade {len(chosen)} packages, {skipped} skipped")
+            return chosen, []
+        
+        upgraded, failed = [], []
+        for cask, names in ((False, selected[False]), (True, selected[True])):
+            if not names:
+                continue
+            Logger.info(f"Upgrading {len(names)} {'casks' if cask else 'formulas'}...")
+            ok, bad = self._upgrade_isolating_failures(names, '--cask' if cask else '--formula')
+            upgraded.extend(ok)
+            failed.extend(bad)
+        
+        self._record_installed_formulas([])
+        if selected[True]:
+            self._record_installed_casks([])
+        Logger.success(f"Selective upgrade completed: {len(upgraded)} upgraded, {skipped} skipped, {len(failed)} failed")
+        return upgraded, failed
+    
     def is_homebrew_installed(self) -> bool:
         """
         Check if Homebrew is installed
@@ -491,8 +2271,210 @@ class BrewUtil:
             return False
 
 
-def main():
-    """Main function for command-line usage"""
+class AsyncBrewUtil(BrewUtil):
+    """
+    BrewUtil with an asyncio query layer for running independent brew queries concurrently
+    
+    Read-only queries (`which brew`, `brew --prefix`, `brew info`, `brew tap-info`)
+    run as asyncio subprocesses, at most max_concurrency at a time. Mutations
+    (installs, uninstalls, upgrades, updates) are serialized behind one lock,
+    since brew takes a global lock while it changes the prefix and refuses a
+    second concurrent change. The synchronous BrewUtil API keeps working; bulk
+    `brew info` lookups stay one call each, since every brew call pays a Ruby
+    start, and only independent ones (formulas and casks) run side by side.
+    """
+    
+    def __init__(self, *args, max_concurrency: int = 4, **kwargs):
+        """
+        Initialize AsyncBrewUtil
+        
+        Args:
+            max_concurrency: Maximum number of brew queries running at once
+            args, kwargs: Passed on to BrewUtil
+        """
+        super().__init__(*args, **kwargs)
+        self.max_concurrency = max(1, max_concurrency)
+        # asyncio primitives belong to one event loop; keep a set per loop
+        self._loop_primitives = weakref.WeakKeyDictionary()
+    
+    def _primitives(self) -> Tuple[asyncio.Semaphore, asyncio.Lock]:
+        """Query semaphore and mutation lock of the running event loop"""
+        loop = asyncio.get_running_loop()
+        if loop not in self._loop_primitives:
+            self._loop_primitives[loop] = (asyncio.Semaphore(self.max_concurrency), asyncio.Lock())
+        return self._loop_primitives[loop]
+    
+    def _run_sync(self, coroutine, fallback):
+        """Run a coroutine to completion from synchronous code, or call fallback inside a running loop"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        coroutine.close()
+        return fallback()
+    
+    async def query(self, command: List[str], timeout: float = 300) -> subprocess.CompletedProcess:
+        """
+        Run a read-only command as an asyncio subprocess, bounded by the query semaphore
+        
+        Args:
+            command: List of command parts
+            timeout: Seconds before the command is killed
+            
+        Returns:
+            CompletedProcess with decoded stdout/stderr
+        """
+        semaphore, _ = self._primitives()
+        async with semaphore:
+            with self.tracer.span(command) as span:
+                process = await asyncio.create_subprocess_exec(
+                    *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+                try:
+                    stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+                    Logger.error(f"Command timed out: {' '.join(command)}")
+                    raise subprocess.TimeoutExpired(command, timeout)
+                span['exit_code'] = process.returncode
+                span['output_bytes'] = len(stdout) + len(stderr)
+        return subprocess.CompletedProcess(command, process.returncode,
+                                           stdout.decode(errors='replace'), stderr.decode(errors='replace'))
+    
+    async def mutate(self, method, *args):
+        """
+        Run a mutating BrewUtil method in a worker thread, one mutation at a time
+        
+        Args:
+            method: Bound method such as self.install_formulas_batch
+            args: Its arguments
+            
+        Returns:
+            The method's result
+        """
+        _, lock = self._primitives()
+        async with lock:
+            return await asyncio.to_thread(method, *args)
+    
+    async def is_homebrew_installed_async(self) -> bool:
+        """Async variant of is_homebrew_installed"""
+        try:
+            return (await self.query(['which', 'brew'])).returncode == 0
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+    
+    async def get_brew_prefix_async(self) -> str:
+        """Async variant of _get_brew_prefix; only asks brew when no prefix is known locally"""
+        if self._brew_prefix is None and not os.environ.get('HOMEBREW_PREFIX') and \
+                not any(os.path.isdir(os.path.join(c, 'Cellar')) for c in self.DEFAULT_PREFIXES):
+            try:
+                result = await self.query(['brew', '--prefix'])
+                self._brew_prefix = result.stdout.strip() if result.returncode == 0 else ''
+            except (OSError, subprocess.TimeoutExpired):
+                self._brew_prefix = ''
+        return self._get_brew_prefix()
+    
+    async def _info_json(self, names: List[str], kind: str) -> Optional[Dict]:
+        """One `brew info --json=v2` query; None if it fails"""
+        try:
+            result = await self.query(['brew', 'info', '--json=v2', f'--{kind}'] + names)
+            return json.loads(result.stdout) if result.returncode == 0 else None
+        except (OSError, subprocess.TimeoutExpired, ValueError):
+            return None
+    
+    async def formula_info_async(self, names: List[str]) -> Optional[Dict[str, Dict]]:
+        """
+        Async variant of _fetch_formula_metadata (one bulk `brew info` call)
+        
+        Args:
+            names: Formula names
+            
+        Returns:
+            Same mapping as _fetch_formula_metadata, or None if brew could not describe the formulas
+        """
+        result = await self._info_json(names, 'formula')
+        if result is None:
+            return None
+        return self._ingest_formula_info(result.get('formulae', []))
+    
+    async def cask_info_async(self, casks: List[str]) -> None:
+        """
+        Async variant of _load_cask_app_names (one bulk `brew info` call)
+        
+        Args:
+            casks: Cask names whose app names are not yet known
+        """
+        pending = [c for c in casks if c not in self._cask_app_names]
+        if not pending:
+            return
+        result = await self._info_json(pending, 'cask')
+        if result:
+            self._ingest_cask_info(result.get('casks', []))
+        for cask in pending:
+            self._cask_app_names.setdefault(cask, [])
+    
+    async def preflight_async(self, formulas: List[str], casks: List[str]) -> Dict:
+        """
+        Run every read-only check an install needs at the same time
+        
+        The formula and cask descriptions are remembered, so the install that
+        follows finds them already known.
+        
+        Args:
+            formulas: Formulas about to be installed
+            casks: Casks about to be installed
+            
+        Returns:
+            Dict with 'homebrew' (bool), 'prefix' and 'formulas' (metadata or None)
+        """
+        pending = [f for f in formulas if f not in self._formula_metadata]
+        homebrew, prefix, metadata, _ = await asyncio.gather(
+            self.is_homebrew_installed_async(),
+            self.get_brew_prefix_async(),
+            self.formula_info_async(pending) if pending else asyncio.sleep(0),
+            self.cask_info_async(casks) if casks else asyncio.sleep(0),
+        )
+        self._formula_metadata.update(metadata or {})
+        return {'homebrew': homebrew, 'prefix': prefix, 'formulas': metadata}
+    
+    async def install_formulas_async(self, packages: List[str]) -> Tuple[List[str], List[str]]:
+        """Async variant of install_formulas_batch (serialized with other mutations)"""
+        return await self.mutate(self.install_formulas_batch, packages)
+    
+    async def install_casks_async(self, casks: List[str]) -> Tuple[List[str], List[str]]:
+        """Async variant of install_casks_batch (serialized with other mutations)"""
+        return await self.mutate(self.install_casks_batch, casks)
+    
+    async def uninstall_formulas_async(self, packages: List[str], dry_run: bool = False) -> Tuple[List[str], List[str]]:
+        """Async variant of uninstall_formulas_batch (serialized with other mutations)"""
+        return await self.mutate(self.uninstall_formulas_batch, packages, dry_run)
+    
+    async def update_homebrew_async(self) -> bool:
+        """Async variant of update_homebrew (serialized with other mutations)"""
+        return await self.mutate(self.update_homebrew)
+    
+    def prefetch_metadata(self, formulas: List[str], casks: List[str]) -> None:
+        if not (formulas and casks):
+            return super().prefetch_metadata(formulas, casks)
+        self._run_sync(self.preflight_async(formulas, casks),
+                       lambda: super(AsyncBrewUtil, self).prefetch_metadata(formulas, casks))
+
+
+def make_brew_util(query_jobs: int = 0, **kwargs) -> BrewUtil:
+    """
+    Create the BrewUtil variant matching the requested query concurrency
+    
+    Args:
+        query_jobs: Concurrent read-only brew queries (> 1 selects AsyncBrewUtil)
+        kwargs: Passed on to the BrewUtil constructor
+    """
+    if query_jobs > 1:
+        return AsyncBrewUtil(max_concurrency=query_jobs, **kwargs)
+    return BrewUtil(**kwargs)
+
+
+def build_parser():
+    """Build the command-line parser shared by direct runs and server requests"""
     import argparse
     
     parser = argparse.ArgumentParser(description='Homebrew Utility for Developer Laboratory Setup')
@@ -502,45 +2484,394 @@ def main():
                         help='Install specified formulas')
     parser.add_argument('--install-casks', nargs='+', 
                         help='Install specified casks')
+    parser.add_argument('--plan-formulas', nargs='+',
+                        help='Print the dependency waves and new dependencies for installing formulas, without installing')
     parser.add_argument('--update', action='store_true', 
                         help='Update Homebrew')
+    parser.add_argument('--upgrade-selective', choices=list(BrewUtil.UPGRADE_POLICIES),
+                        help='Upgrade outdated packages whose version change the policy accepts')
+    parser.add_argument('--exclude', nargs='+', default=[],
+                        help='With --upgrade-selective: packages to leave at their current version')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='With --upgrade-selective, --reconcile or an uninstall: only show what would change')
     parser.add_argument('--check-homebrew', action='store_true', 
                         help='Check if Homebrew is installed')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore the on-disk installed-state cache and query brew directly')
+    parser.add_argument('--prefetch-jobs', type=int,
+                        default=int(os.environ.get('DEVLAB_BREW_PREFETCH_JOBS', '0') or 0),
+                        help='Download missing packages with N parallel `brew fetch` jobs before installing (0 disables)')
+    parser.add_argument('--query-jobs', type=int,
+                        default=int(os.environ.get('DEVLAB_BREW_QUERY_JOBS', '0') or 0),
+                        help='Run independent read-only brew queries with up to N concurrent subprocesses (0 or 1: sequential)')
+    parser.add_argument('--artifact-store', metavar='DIR', default=os.environ.get('DEVLAB_ARTIFACT_STORE'),
+                        help='Serve bottle/cask downloads from this content-addressed store and add new ones to it')
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST,
+                        help='Package manifest (TOML) used by --install-manifest and --list-manifest')
+    parser.add_argument('--install-manifest', action='store_true',
+                        help='Install the manifest packages selected by --phases/--groups in one planned pass')
+    parser.add_argument('--list-manifest', action='store_true',
+                        help='Print the manifest packages selected by --phases/--groups, one per line')
+    parser.add_argument('--phases', nargs='+',
+                        help='Manifest phases to select (default: all)')
+    parser.add_argument('--groups', nargs='+',
+                        help='Manifest groups to select (default: all)')
+    parser.add_argument('--uninstall-formulas', nargs='+',
+                        help='Uninstall specified formulas that no other installed formula needs')
+    parser.add_argument('--uninstall-casks', nargs='+',
+                        help='Uninstall specified casks')
+    parser.add_argument('--uninstall-manifest', action='store_true',
+                        help="Uninstall the --kind packages selected by --phases/--groups, honoring purge_keep")
+    parser.add_argument('--write-lockfile', nargs='?', const=DEFAULT_LOCKFILE, metavar='PATH',
+                        help='Write the exact installed state (formulas, casks, versions, taps, pins) to a lockfile')
+    parser.add_argument('--reconcile', nargs='?', const=DEFAULT_LOCKFILE, metavar='PATH',
+                        help='Install, upgrade and (with --prune) uninstall the minimal set that matches a lockfile')
+    parser.add_argument('--prune', action='store_true',
+                        help='With --reconcile: uninstall packages the lockfile does not list')
+    parser.add_argument('--kind', choices=['formulas', 'casks'], default='formulas',
+                        help='Package kind used by --list-manifest and --uninstall-manifest')
+    parser.add_argument('--purge', action='store_true',
+                        help="With --list-manifest: leave out each group's purge_keep packages")
+    parser.add_argument('--serve', metavar='SOCKET',
+                        help='Run as a long-lived server on a Unix domain socket (clients connect via DEVLAB_BREW_SOCKET)')
+    parser.add_argument('--parent-pid', type=int,
+                        help='With --serve: exit when this process (the provisioner) is gone')
+    parser.add_argument('--stop-server', action='store_true',
+                        help='Ask the server at DEVLAB_BREW_SOCKET to shut down')
+    return parser
+
+
+def run_cli(args, brew_util: BrewUtil) -> int:
+    """
+    Execute the actions requested on the command line
     
-    args = parser.parse_args()
-    
-    brew_util = BrewUtil(skip_cask_apps=args.skip_cask_apps)
+    Args:
+        args: Parsed arguments from build_parser()
+        brew_util: BrewUtil instance to act on
+        
+    Returns:
+        Process exit code
+    """
+    if args.list_manifest:
+        try:
+            manifest = PackageManifest(args.manifest)
+            packages = manifest.packages(args.kind, args.phases, args.groups, purge=args.purge)
+        except (OSError, KeyError, ValueError, SyntaxError) as e:
+            Logger.error(f"Cannot read package manifest {args.manifest}: {e}")
+            return 1
+        for package in packages:
+            print(package)
+        return 0
     
     if args.check_homebrew:
         if brew_util.is_homebrew_installed():
             Logger.success("Homebrew is installed")
-            sys.exit(0)
+            return 0
         else:
             Logger.error("Homebrew is not installed")
-            sys.exit(1)
+            return 1
+    
+    if args.plan_formulas:
+        missing = [p for p in args.plan_formulas if not brew_util.is_formula_installed(p)]
+        if not missing:
+            Logger.success(f"All {len(args.plan_formulas)} formulas already installed")
+            return 0
+        plan = brew_util.plan_formula_install(missing)
+        if plan is None:
+            Logger.error(f"Cannot resolve dependencies for: {' '.join(missing)}")
+            return 1
+        brew_util._log_install_plan(plan)
+        return 0
     
     if args.update:
         if not brew_util.update_homebrew():
-            sys.exit(1)
+            return 1
+    
+    if args.reconcile:
+        try:
+            changed, failed = brew_util.reconcile(args.reconcile, prune=args.prune, dry_run=args.dry_run)
+        except (OSError, ValueError) as e:
+            Logger.error(f"Cannot read lockfile {args.reconcile}: {e}")
+            return 1
+        if failed:
+            Logger.error(f"Failed to reconcile: {' '.join(failed)}")
+            return 1
+    
+    if args.upgrade_selective:
+        upgraded, failed = brew_util.upgrade_selective(args.upgrade_selective, args.exclude, args.dry_run)
+        if failed:
+            Logger.error(f"Failed to upgrade packages: {' '.join(failed)}")
+            return 1
+    
+    if args.install_manifest:
+        try:
+            manifest = PackageManifest(args.manifest)
+            manifest.select_groups(args.phases, args.groups)
+        except (OSError, KeyError, ValueError, SyntaxError) as e:
+            Logger.error(f"Cannot read package manifest {args.manifest}: {e}")
+            return 1
+        successful, failed = brew_util.install_manifest(manifest, args.phases, args.groups)
+        if failed:
+            Logger.error(f"Failed to install packages: {' '.join(failed)}")
+            return 1
+    
+    if args.write_lockfile:
+        brew_util.write_lockfile(args.write_lockfile)
+    
+    uninstall_formulas = list(args.uninstall_formulas or [])
+    uninstall_casks = list(args.uninstall_casks or [])
+    if args.uninstall_manifest:
+        try:
+            manifest = PackageManifest(args.manifest)
+            selected = manifest.packages(args.kind, args.phases, args.groups, purge=True)
+        except (OSError, KeyError, ValueError, SyntaxError) as e:
+            Logger.error(f"Cannot read package manifest {args.manifest}: {e}")
+            return 1
+        (uninstall_casks if args.kind == 'casks' else uninstall_formulas).extend(selected)
+    if uninstall_formulas or uninstall_casks:
+        _, failed = brew_util.uninstall_formulas_batch(uninstall_formulas, args.dry_run)
+        _, cask_failed = brew_util.uninstall_casks_batch(uninstall_casks, args.dry_run) if uninstall_casks else ([], [])
+        if failed or cask_failed:
+            Logger.error(f"Failed to uninstall packages: {' '.join(failed + cask_failed)}")
+            return 1
     
     if args.install_formulas:
         successful, failed = brew_util.install_formulas_batch(args.install_formulas)
         if failed:
             Logger.error(f"Failed to install formulas: {' '.join(failed)}")
-            sys.exit(1)
+            return 1
     
     if args.install_casks:
         successful, failed = brew_util.install_casks_batch(args.install_casks)
         if failed and not args.skip_cask_apps:
             # Only treat as error if we're not intentionally skipping casks
             Logger.error(f"Failed to install casks: {' '.join(failed)}")
-            sys.exit(1)
+            return 1
         elif failed and args.skip_cask_apps:
             # This shouldn't happen with the updated logic, but just in case
             Logger.warning(f"Casks skipped due to SKIP_CASK_APPS: {' '.join(failed)}")
         elif args.skip_cask_apps:
             Logger.info("All cask installations skipped due to SKIP_CASK_APPS=true")
+    
+    return 0
+
+
+class _SocketStream:
+    """File-like object that forwards writes to a server client as JSON frames"""
+    
+    def __init__(self, conn, stream: str):
+        self.conn = conn
+        self.stream = stream
+    
+    def write(self, data: str) -> int:
+        if data:
+            self.conn.sendall((json.dumps({'stream': self.stream, 'data': data}) + '\n').encode())
+        return len(data)
+    
+    def flush(self) -> None:
+        pass
+
+
+# Environment forwarded with each request so the server sees the caller's current settings
+FORWARDED_ENV_PREFIXES = ('DEVLAB_', 'HOMEBREW_', 'XDG_')
+FORWARDED_ENV_NAMES = ('PATH',)
+
+
+def forward_to_server(socket_path: str, request: Dict) -> Optional[int]:
+    """
+    Send a request to a running brew_helper server and relay its output
+    
+    Args:
+        socket_path: Unix domain socket of the server
+        request: Request payload ({'argv': [...]} or {'shutdown': True})
+        
+    Returns:
+        Exit code reported by the server, or None if no server is reachable
+    """
+    import socket
+    
+    try:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(socket_path)
+    except OSError:
+        return None
+    
+    request['env'] = {k: v for k, v in os.environ.items()
+                      if k.startswith(FORWARDED_ENV_PREFIXES) or k in FORWARDED_ENV_NAMES}
+    with conn:
+        conn.sendall((json.dumps(request) + '\n').encode())
+        for line in conn.makefile('r'):
+            message = json.loads(line)
+            if 'exit' in message:
+                return message['exit']
+            stream = sys.stderr if message.get('stream') == 'stderr' else sys.stdout
+            stream.write(message.get('data', ''))
+            stream.flush()
+    Logger.warning("brew_helper server closed the connection unexpectedly")
+    return 1
+
+
+def _apply_request_env(server_env: Dict[str, str], request_env: Optional[Dict[str, str]]) -> None:
+    """
+    Replace os.environ with the server's environment overlaid by a request's forwarded variables
+    
+    Forwarded variables the client does not have are removed, so a setting the
+    client unset does not linger from the server's start-up environment. A
+    request without forwarded variables runs in the server's environment.
+    """
+    os.environ.clear()
+    if request_env is None:
+        os.environ.update(server_env)
+        return
+    os.environ.update({k: v for k, v in server_env.items()
+                       if not (k.startswith(FORWARDED_ENV_PREFIXES) or k in FORWARDED_ENV_NAMES)})
+    os.environ.update(request_env)
+
+
+def _construction_settings(args) -> Tuple:
+    """Settings a BrewUtil reads only when it is built: query concurrency, cache file and inactivity timeout"""
+    return (
+        max(args.query_jobs, 1),
+        os.environ.get('DEVLAB_BREW_CACHE_FILE') or os.environ.get('XDG_CACHE_HOME') or '',
+        os.environ.get('DEVLAB_BREW_INACTIVITY_TIMEOUT') or '',
+    )
+
+
+def serve(socket_path: str, parent_pid: Optional[int] = None, idle_timeout: int = 3600) -> None:
+    """
+    Serve brew_helper requests over a Unix domain socket until shut down
+    
+    One BrewUtil instance lives for the whole provisioning run, so the installed
+    state, application index and cask metadata are built once instead of once per
+    helper call. Each request runs in the environment the client forwarded, and
+    the instance is rebuilt if that changes a setting it only reads when built.
+    Requests are handled one at a time, matching the sequential provisioner. The
+    server exits on a shutdown request, SIGTERM, when the parent process
+    disappears, or after idle_timeout seconds without requests.
+    
+    Args:
+        socket_path: Path of the Unix domain socket to listen on
+        parent_pid: Process to watch; the server exits once it is gone
+        idle_timeout: Seconds without requests before exiting
+    """
+    import contextlib
+    import signal
+    import socket
+    
+    def _terminate(signum, frame):
+        raise SystemExit(0)
+    
+    signal.signal(signal.SIGTERM, _terminate)
+    
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+    server.settimeout(1.0)
+    
+    # Requests run in the client's environment; the server's own is restored after each one
+    server_env = dict(os.environ)
+    brew_util: Optional[BrewUtil] = None
+    settings: Optional[Tuple] = None
+    last_request = time.monotonic()
+    
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                if parent_pid and not _is_process_alive(parent_pid):
+                    break
+                if time.monotonic() - last_request > idle_timeout:
+                    break
+                continue
+            
+            with conn:
+                conn.settimeout(None)
+                last_request = time.monotonic()
+                try:
+                    request = json.loads(conn.makefile('r').readline() or '{}')
+                except ValueError:
+                    request = {}
+                if request.get('shutdown'):
+                    conn.sendall(b'{"exit": 0}\n')
+                    break
+                
+                _apply_request_env(server_env, request.get('env'))
+                # Built per request so env-derived defaults follow the client's environment
+                parser = build_parser()
+                stdout, stderr = _SocketStream(conn, 'stdout'), _SocketStream(conn, 'stderr')
+                try:
+                    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                        try:
+                            args = parser.parse_args(request.get('argv', []))
+                            # Settings fixed at construction: rebuild (dropping warm state) only when they change
+                            request_settings = _construction_settings(args)
+                            if brew_util is None or request_settings != settings:
+                                brew_util = make_brew_util(args.query_jobs)
+                                settings = request_settings
+                            brew_util.skip_cask_apps = args.skip_cask_apps
+                            brew_util.use_cache = not args.no_cache
+                            brew_util.prefetch_jobs = args.prefetch_jobs
+                            brew_util.artifact_store = ArtifactStore(args.artifact_store) if args.artifact_store else None
+                            brew_util.refresh_state()
+                            exit_code = run_cli(args, brew_util)
+                        except SystemExit as e:
+                            exit_code = e.code if isinstance(e.code, int) else 1
+                        except Exception as e:
+                            Logger.error(f"brew_helper server request failed: {e}")
+                            exit_code = 1
+                    conn.sendall((json.dumps({'exit': exit_code}) + '\n').encode())
+                except OSError:
+                    # Client went away mid-request; keep serving
+                    pass
+                finally:
+                    os.environ.clear()
+                    os.environ.update(server_env)
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def _is_process_alive(pid: int) -> bool:
+    """Check whether a process exists"""
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def main():
+    """Main function for command-line usage"""
+    argv = sys.argv[1:]
+    socket_path = os.environ.get('DEVLAB_BREW_SOCKET')
+    
+    # Thin-client mode: hand the request to the long-lived server when one is running
+    if socket_path and '--serve' not in argv:
+        request = {'shutdown': True} if '--stop-server' in argv else {'argv': argv}
+        exit_code = forward_to_server(socket_path, request)
+        if exit_code is not None:
+            sys.exit(exit_code)
+    
+    args = build_parser().parse_args(argv)
+    
+    if args.serve:
+        serve(args.serve, parent_pid=args.parent_pid)
+        return
+    if args.stop_server:
+        # No server reachable: nothing to stop
+        return
+    
+    brew_util = make_brew_util(args.query_jobs, skip_cask_apps=args.skip_cask_apps, use_cache=not args.no_cache,
+                               prefetch_jobs=args.prefetch_jobs,
+                               artifact_store=ArtifactStore(args.artifact_store) if args.artifact_store else None)
+    sys.exit(run_cli(args, brew_util))
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Provisioning Journal Module for Developer Laboratory Setup
+
+This module keeps a persistent, append-only journal of completed provisioning
+steps so that a re-run of provision-devlab.sh can skip work that already
+finished (package installs, `uv python install`, `nvm install`, `ollama pull`)
+without spawning a single subprocess to re-check it.
+
+Each step is identified by a key built from the step and its inputs, such as
+"brew install git gh" or "ollama pull llama3.2:3b"; changing an input therefore
+produces a new key and the step runs again. The journal is a JSONL file under
+$XDG_STATE_HOME/devlab (or $DEVLAB_JOURNAL) with one entry per line:
+
+    {"key": "uv python install 3.13", "status": "done", "ts": 1718000000, "source": "provision-devlab.sh"}
+
+Later lines win, so a step is invalidated by appending a "forgotten" entry for
+its key. The line layout is fixed so the shell scripts can read the journal with
+builtins only. Setting DEVLAB_JOURNAL_VERIFY=1 (provision-devlab.sh --verify)
+ignores recorded completions and re-checks every step.
+
+Usage:
+    python3 scripts/util/journal_helper.py --list
+    python3 scripts/util/journal_helper.py --list "ollama pull"
+    python3 scripts/util/journal_helper.py --forget "brew install"
+
+Author: Balamurugan Krishnamoorthy
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+
+def default_journal_path() -> str:
+    """Journal location: $DEVLAB_JOURNAL, else $XDG_STATE_HOME/devlab/journal.jsonl"""
+    state_home = os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+    return os.environ.get('DEVLAB_JOURNAL') or os.path.join(state_home, 'devlab', 'journal.jsonl')
+
+
+def step_key(step: str, *inputs) -> str:
+    """
+    Build the journal key of a step from its inputs
+
+    Args:
+        step: Step name, e.g. 'brew install' or 'ollama pull'
+        inputs: Values the step's outcome depends on, in a stable order
+
+    Returns:
+        Space-separated key, e.g. 'ollama pull llama3.2:3b'
+    """
+    return ' '.join([step] + [str(value) for value in inputs])
+
+
+class Journal:
+    """Append-only record of completed provisioning steps"""
+
+    # Environment variable that disables skipping (every step is re-checked and re-recorded)
+    VERIFY_ENV_VAR = 'DEVLAB_JOURNAL_VERIFY'
+
+    def __init__(self, path: Optional[str] = None, source: str = 'devlab'):
+        """
+        Initialize Journal
+
+        Args:
+            path: Journal file (defaults to default_journal_path(), read at use time)
+            source: Name of the helper recording completions
+        """
+        self._path = path
+        self.source = source
+        self._entries: Dict[str, Dict] = {}
+        self._stamp: Optional[tuple] = None
+
+    @property
+    def path(self) -> str:
+        return self._path or default_journal_path()
+
+    @property
+    def verify(self) -> bool:
+        """True when recorded completions must be re-checked instead of trusted"""
+        return os.environ.get(self.VERIFY_ENV_VAR, '') not in ('', '0')
+
+    def entries(self) -> Dict[str, Dict]:
+        """Latest entry per key, re-read only when the journal file changed"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self._entries, self._stamp = {}, None
+            return self._entries
+        stamp = (self.path, stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            entries = {}
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        entries[entry['key']] = entry
+                    except (ValueError, KeyError, TypeError):
+                        # A torn last line from an interrupted run is ignored
+                        continue
+            self._entries, self._stamp = entries, stamp
+        return self._entries
+
+    def is_done(self, key: str) -> bool:
+        """Check whether a step is recorded as completed (always False in verify mode)"""
+        if self.verify:
+            return False
+        return self.entries().get(key, {}).get('status') == 'done'
+
+    def _append(self, entries: List[Dict]) -> None:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+        except OSError:
+            # The journal only saves time; never fail provisioning over it
+            pass
+
+    def record(self, key: str, **details) -> None:
+        """
+        Record a step as completed
+
+        Args:
+            key: Step key from step_key()
+            details: Extra fields stored with the entry (e.g. duration)
+        """
+        entry = {'key': key, 'status': 'done', 'ts': int(time.time()), 'source': self.source}
+        entry.update(details)
+        self._append([entry])
+
+    def forget(self, prefix: str = '') -> List[str]:
+        """
+        Invalidate every completed step whose key starts with prefix
+
+        Args:
+            prefix: Key prefix such as 'brew install' ('' forgets everything)
+
+        Returns:
+            Keys that were invalidated
+        """
+        keys = sorted(k for k, e in self.entries().items() if k.startswith(prefix) and e.get('status') == 'done')
+        now = int(time.time())
+        self._append([{'key': k, 'status': 'forgotten', 'ts': now, 'source': self.source} for k in keys])
+        return keys
+
+
+def main():
+    """Main function for command-line usage"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect the Developer Laboratory provisioning journal')
+    parser.add_argument('--journal', default=None,
+                        help='Journal file (default: $DEVLAB_JOURNAL or $XDG_STATE_HOME/devlab/journal.jsonl)')
+    parser.add_argument('--list', nargs='?', const='', metavar='PREFIX',
+                        help='List completed steps, optionally only keys starting with PREFIX')
+    parser.add_argument('--check', metavar='KEY', help='Exit 0 if the step is recorded as completed, 1 otherwise')
+    parser.add_argument('--forget', metavar='PREFIX',
+                        help="Invalidate completed steps whose key starts with PREFIX ('' for all)")
+    args = parser.parse_args()
+
+    journal = Journal(args.journal, source='journal_helper')
+    if args.check is not None:
+        sys.exit(0 if journal.is_done(args.check) else 1)
+    if args.forget is not None:
+        forgotten = journal.forget(args.forget)
+        print(f"Forgot {len(forgotten)} completed steps")
+        return
+    prefix = args.list or ''
+    done = [e for k, e in sorted(journal.entries().items()) if k.startswith(prefix) and e.get('status') == 'done']
+    for entry in done:
+        print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.get('ts', 0)))}  {entry['key']}")
+    print(f"{len(done)} completed steps in {journal.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Snapshot History Module for Developer Laboratory Setup
+
+This module keeps a deduplicated history of "id@version" inventories, such as
+the extensions installed in VS Code, Cursor or Windsurf, in place of a full
+timestamped backup file per run.
+
+Each snapshot is hashed; one identical to the previous snapshot of the same
+stream (e.g. 'code' or 'extensions.txt') is not stored again. Snapshot contents
+live once under <dir>/snapshots/<sha256>.txt, and <dir>/history.jsonl gets one
+line per change holding the delta against the previous snapshot:
+
+    {"stream": "code", "ts": 1718000000, "sha256": "...", "count": 42,
+     "added": ["ms-python.python@2024.8.0"], "removed": [], "changed": [["a.b", "1.0.0", "1.1.0"]]}
+
+Retention keeps the contents of the newest snapshots per stream and deletes
+older ones; the deltas stay, so questions like "when was extension X added or
+removed" are answered from history.jsonl alone without opening any snapshot.
+The history lives under $XDG_STATE_HOME/devlab/extension-backups (or
+$DEVLAB_EXTENSION_BACKUPS).
+
+Usage:
+    python3 scripts/util/snapshot_helper.py --history
+    python3 scripts/util/snapshot_helper.py --when ms-python.python
+    python3 scripts/util/snapshot_helper.py --show 3f2a9c
+
+Author: Balamurugan Krishnamoorthy
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Optional
+
+
+def default_snapshot_dir() -> str:
+    """History location: $DEVLAB_EXTENSION_BACKUPS, else $XDG_STATE_HOME/devlab/extension-backups"""
+    state_home = os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+    return os.environ.get('DEVLAB_EXTENSION_BACKUPS') or os.path.join(state_home, 'devlab', 'extension-backups')
+
+
+def parse_inventory(lines: List[str]) -> Dict[str, str]:
+    """Parse "id@version" lines into id -> version ('' when unversioned), skipping blanks and comments"""
+    inventory = {}
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            item, _, version = line.partition('@')
+            inventory[item] = version
+    return inventory
+
+
+class SnapshotHistory:
+    """Content-addressed inventory snapshots with a delta log and count-based retention"""
+
+    # Snapshot contents kept per stream (overridable with DEVLAB_EXTENSION_BACKUP_KEEP)
+    DEFAULT_KEEP = 30
+
+    def __init__(self, directory: Optional[str] = None, keep: Optional[int] = None):
+        """
+        Initialize SnapshotHistory
+
+        Args:
+            directory: History directory (defaults to default_snapshot_dir())
+            keep: Snapshot contents kept per stream; older deltas are kept without their contents
+        """
+        self.directory = os.path.expanduser(directory or default_snapshot_dir())
+        if keep is None:
+            keep = int(os.environ.get('DEVLAB_EXTENSION_BACKUP_KEEP', '0') or 0) or self.DEFAULT_KEEP
+        self.keep = max(1, keep)
+        self.history_file = os.path.join(self.directory, 'history.jsonl')
+
+    def snapshot_path(self, sha256: str) -> str:
+        """Path of the snapshot contents with the given digest"""
+        return os.path.join(self.directory, 'snapshots', f"{sha256}.txt")
+
+    def entries(self, stream: Optional[str] = None) -> List[Dict]:
+        """History entries, oldest first, optionally of one stream"""
+        entries = []
+        try:
+            with open(self.history_file) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn last line from an interrupted run is ignored
+                        continue
+                    if stream is None or entry.get('stream') == stream:
+                        entries.append(entry)
+        except OSError:
+            pass
+        return entries
+
+    def record(self, stream: str, lines: List[str], ts: Optional[float] = None) -> Optional[Dict]:
+        """
+        Record a snapshot unless it is identical to the stream's previous one
+
+        Args:
+            stream: What the snapshot is of, e.g. 'code' or 'extensions.txt'
+            lines: "id@version" lines
+            ts: Snapshot time (defaults to now)
+
+        Returns:
+            The new history entry, or None if nothing changed
+        """
+        inventory = parse_inventory(lines)
+        content = ''.join(f"{item}@{version}\n" if version else f"{item}\n"
+                          for item, version in sorted(inventory.items(), key=lambda kv: kv[0].lower()))
+        sha256 = hashlib.sha256(content.encode()).hexdigest()
+        history = self.entries(stream)
+        if history and history[-1]['sha256'] == sha256:
+            return None
+
+        previous = self._inventory_at(history)
+        previous_by_key = {item.lower(): (item, version) for item, version in previous.items()}
+        current_keys = {item.lower() for item in inventory}
+        entry = {
+            'stream': stream,
+            'ts': int(ts if ts is not None else time.time()),
+            'sha256': sha256,
+            'count': len(inventory),
+            'added': [], 'removed': [], 'changed': [],
+        }
+        for item, version in inventory.items():
+            before = previous_by_key.get(item.lower())
+            if before is None:
+                entry['added'].append(f"{item}@{version}" if version else item)
+            elif before[1] != version:
+                entry['changed'].append([item, before[1], version])
+        entry['removed'] = sorted((f"{item}@{version}" if version else item)
+                                  for key, (item, version) in previous_by_key.items() if key not in current_keys)
+
+        path = self.snapshot_path(sha256)
+        if not os.path.isfile(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_file = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                f.write(content)
+            os.replace(tmp_file, path)
+        with open(self.history_file, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+        self.prune()
+        return entry
+
+    def _inventory_at(self, history: List[Dict]) -> Dict[str, str]:
+        """Inventory after the last of a stream's entries, from its snapshot or else by replaying deltas"""
+        if not history:
+            return {}
+        lines = self.read_snapshot(history[-1]['sha256'])
+        if lines is not None:
+            return parse_inventory(lines)
+        inventory: Dict[str, str] = {}
+        for entry in history:
+            for spec in entry['removed']:
+                inventory.pop(spec.partition('@')[0], None)
+            for spec in entry['added']:
+                item, _, version = spec.partition('@')
+                inventory[item] = version
+            for item, _, version in entry['changed']:
+                inventory[item] = version
+        return inventory
+
+    def read_snapshot(self, sha256: str) -> Optional[List[str]]:
+        """Lines of a stored snapshot, or None if it was pruned"""
+        try:
+            with open(self.snapshot_path(sha256)) as f:
+                return f.read().splitlines()
+        except OSError:
+            return None
+
+    def resolve(self, prefix: str) -> Optional[str]:
+        """Full digest of the most recent entry whose digest starts with prefix"""
+        for entry in reversed(self.entries()):
+            if entry['sha256'].startswith(prefix.lower()):
+                return entry['sha256']
+        return None
+
+    def prune(self) -> List[str]:
+        """
+        Delete snapshot contents beyond the newest `keep` entries of every stream
+
+        Returns:
+            Digests whose contents were deleted
+        """
+        by_stream: Dict[str, List[str]] = {}
+        for entry in self.entries():
+            by_stream.setdefault(entry['stream'], []).append(entry['sha256'])
+        retained = {sha256 for digests in by_stream.values() for sha256 in digests[-self.keep:]}
+        pruned = []
+        for path in glob.glob(os.path.join(self.directory, 'snapshots', '*.txt')):
+            sha256 = os.path.basename(path)[:-len('.txt')]
+            if sha256 not in retained:
+                os.remove(path)
+                pruned.append(sha256)
+        return pruned
+
+    def events_for(self, item: str) -> List[Dict]:
+        """
+        When an item was added, removed or changed version, from the deltas only
+
+        Args:
+            item: Id such as ms-python.python (case-insensitive)
+
+        Returns:
+            Dicts with 'stream', 'ts', 'event' ('added'/'removed'/'changed') and 'version' or 'from'/'to'
+        """
+        key = item.lower()
+        events = []
+        for entry in self.entries():
+            for event in ('added', 'removed'):
+                for spec in entry[event]:
+                    name, _, version = spec.partition('@')
+                    if name.lower() == key:
+                        events.append({'stream': entry['stream'], 'ts': entry['ts'], 'event': event, 'version': version})
+            for name, before, after in entry['changed']:
+                if name.lower() == key:
+                    events.append({'stream': entry['stream'], 'ts': entry['ts'], 'event': 'changed',
+                                   'from': before, 'to': after})
+        return events
+
+    def import_backups(self, directory: str, stream: str) -> int:
+        """
+        Replay legacy extensions-backup-YYYYmmdd-HHMMSS.txt files into the history, oldest first
+
+        Args:
+            directory: Directory holding the backup files (they are left in place)
+            stream: Stream the backups belong to
+
+        Returns:
+            Number of backups that added a history entry
+        """
+        imported = 0
+        for path in sorted(glob.glob(os.path.join(directory, 'extensions-backup-*.txt'))):
+            match = re.search(r'(\d{8}-\d{6})\.txt$', path)
+            ts = time.mktime(time.strptime(match.group(1), '%Y%m%d-%H%M%S')) if match else os.path.getmtime(path)
+            with open(path) as f:
+                if self.record(stream, f.read().splitlines(), ts):
+                    imported += 1
+        return imported
+
+
+def format_ts(ts: float) -> str:
+    """Local date and time of an epoch timestamp"""
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(ts))
+
+
+def main():
+    """Main function for command-line usage"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect the Developer Laboratory extension backup history')
+    parser.add_argument('--dir', default=None,
+                        help='History directory (default: $DEVLAB_EXTENSION_BACKUPS or '
+                             '$XDG_STATE_HOME/devlab/extension-backups)')
+    parser.add_argument('--stream', default=None, help="Only this stream (e.g. code, cursor, extensions.txt)")
+    parser.add_argument('--history', action='store_true', help='List recorded snapshots with their deltas')
+    parser.add_argument('--when', metavar='ID', help='Show when an extension was added, removed or changed version')
+    parser.add_argument('--show', metavar='SHA', help='Print a snapshot by digest prefix')
+    parser.add_argument('--import-backups', metavar='DIR',
+                        help='Replay legacy extensions-backup-*.txt files from DIR into --stream (default: code)')
+    parser.add_argument('--prune', action='store_true', help='Apply the retention policy now')
+    parser.add_argument('--keep', type=int, default=None,
+                        help=f'Snapshots kept per stream (default: $DEVLAB_EXTENSION_BACKUP_KEEP or '
+                             f'{SnapshotHistory.DEFAULT_KEEP})')
+    parser.add_argument('--json', action='store_true', help='Print --history / --when as JSON')
+    args = parser.parse_args()
+
+    history = SnapshotHistory(args.dir, args.keep)
+    if args.import_backups:
+        count = history.import_backups(args.import_backups, args.stream or 'code')
+        print(f"Imported {count} distinct backups from {args.import_backups}")
+    if args.prune:
+        print(f"Pruned {len(history.prune())} snapshots")
+    if args.show:
+        sha256 = history.resolve(args.show)
+        lines = history.read_snapshot(sha256) if sha256 else None
+        if lines is None:
+            print(f"No stored snapshot matches {args.show}", file=sys.stderr)
+            sys.exit(1)
+        print('\n'.join(lines))
+    if args.when:
+        events = [e for e in history.events_for(args.when) if args.stream in (None, e['stream'])]
+        if args.json:
+            print(json.dumps(events, indent=2))
+        elif not events:
+            print(f"{args.when} does not appear in the history")
+        else:
+            for event in events:
+                detail = f"{event['from']} -> {event['to']}" if event['event'] == 'changed' else event['version']
+                print(f"{format_ts(event['ts'])}  {event['stream']:<15} {event['event']:<8} {detail}")
+    if args.history or not (args.import_backups or args.prune or args.show or args.when):
+        entries = history.entries(args.stream)
+        if args.json:
+            print(json.dumps(entries, indent=2))
+            return
+        for entry in entries:
+            stored = '' if os.path.isfile(history.snapshot_path(entry['sha256'])) else ' (pruned)'
+            print(f"{format_ts(entry['ts'])}  {entry['stream']:<15} {entry['sha256'][:12]}  {entry['count']:>4} items  "
+                  f"+{len(entry['added'])} -{len(entry['removed'])} ~{len(entry['changed'])}{stored}")
+        print(f"{len(entries)} snapshots in {history.directory}")
+
+
+if __name__ == '__main__':
+    main()
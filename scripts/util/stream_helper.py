@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Streaming Subprocess Module for Developer Laboratory Setup
+
+This module runs long commands (brew install, code --install-extension, ...)
+while reading their stdout and stderr incrementally. Output can be echoed live,
+recognised progress lines become structured events, only a bounded tail of log
+lines is kept for error reports, and the timeout is based on inactivity rather
+than wall-clock time, so a long but healthy install is never killed.
+
+Author: Balamurugan Krishnamoorthy
+"""
+
+import codecs
+import os
+import re
+import selectors
+import subprocess
+import sys
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+
+# Progress lines printed by brew, mapped to event names
+BREW_EVENT_PATTERNS: List[Tuple[str, Pattern]] = [
+    ('fetch', re.compile(r'^==> Fetching (?:downloads for: )?(?P<package>\S+)')),
+    ('download', re.compile(r'^==> Downloading (?P<url>\S+)')),
+    ('install_dependency', re.compile(r'^==> Installing (?P<parent>\S+) dependency: (?P<package>\S+)')),
+    ('install', re.compile(r'^==> Installing (?:Cask )?(?P<package>[^\s:]+)$')),
+    ('upgrade', re.compile(r'^==> Upgrading (?P<package>\S+)')),
+    ('pour', re.compile(r'^==> Pouring (?P<package>[^\s/]+?)--(?P<version>[^\s/]+?)\.[a-z0-9_]+\.bottle')),
+    ('installed', re.compile(r'^🍺\s+\S*/(?:Cellar|Caskroom)/(?P<package>[^/\s]+)/(?P<version>[^:\s]+)')),
+    ('installed', re.compile(r'^🍺\s+(?P<package>\S+) was successfully installed')),
+    ('error', re.compile(r'^Error: (?P<message>.+)')),
+    ('progress', re.compile(r'^[#=\-O\s]*?(?P<percent>\d{1,3}(?:\.\d+)?)%\s*$')),
+]
+
+# Progress lines printed by `code --install-extension`
+VSCODE_EVENT_PATTERNS: List[Tuple[str, Pattern]] = [
+    ('installed', re.compile(r"Extension '(?P<package>[^']+)' v?(?P<version>\S+)? ?was successfully installed")),
+    ('already_installed', re.compile(r"Extension '(?P<package>[^']+)' (?:v\S+ )?is already installed")),
+    ('uninstalled', re.compile(r"Extension '(?P<package>[^']+)' was successfully uninstalled")),
+    ('error', re.compile(r"^Extension '(?P<package>[^']+)' is not installed")),
+    ('error', re.compile(r"^Failed Installing Extensions?: (?P<package>\S+)")),
+    ('error', re.compile(r"^Extension '(?P<package>[^']+)' not found")),
+]
+
+
+class StreamResult:
+    """Outcome of a streamed command: exit code, bounded output tails and parsed events"""
+
+    def __init__(self, args: List[str], returncode: int, stdout_tail: List[str], stderr_tail: List[str],
+                 events: List[Dict], output_bytes: int, duration: float):
+        self.args = args
+        self.returncode = returncode
+        self.stdout_tail = stdout_tail
+        self.stderr_tail = stderr_tail
+        self.events = events
+        self.output_bytes = output_bytes
+        self.duration = duration
+
+    @property
+    def stdout(self) -> str:
+        return '\n'.join(self.stdout_tail)
+
+    @property
+    def stderr(self) -> str:
+        return '\n'.join(self.stderr_tail)
+
+    def events_of(self, name: str) -> List[Dict]:
+        """Events with the given name, in order"""
+        return [event for event in self.events if event['event'] == name]
+
+
+def parse_event(line: str, patterns: List[Tuple[str, Pattern]]) -> Optional[Dict]:
+    """
+    Turn one output line into a structured event
+
+    Args:
+        line: Output line without its line ending
+        patterns: (event name, regex) pairs tried in order
+
+    Returns:
+        Dict with 'event' plus the pattern's named groups, or None if no pattern matches
+    """
+    stripped = line.strip()
+    for name, pattern in patterns:
+        match = pattern.match(stripped)
+        if match:
+            event = {'event': name}
+            event.update({k: v for k, v in match.groupdict().items() if v is not None})
+            return event
+    return None
+
+
+def run_streaming(command: List[str], echo: bool = True, patterns: Optional[List[Tuple[str, Pattern]]] = None,
+                  on_event: Optional[Callable[[Dict], None]] = None, inactivity_timeout: Optional[float] = None,
+                  tail_lines: int = 200, env: Optional[Dict[str, str]] = None) -> StreamResult:
+    """
+    Run a command, reading stdout and stderr incrementally
+
+    Args:
+        command: List of command parts
+        echo: If True, copy output to sys.stdout / sys.stderr as it arrives
+        patterns: Event patterns (e.g. BREW_EVENT_PATTERNS); None disables event parsing
+        on_event: Called with every parsed event as it happens
+        inactivity_timeout: Kill the command after this many seconds without any output (None: never)
+        tail_lines: Number of lines kept per stream for error reports
+        env: Environment for the command (defaults to the current one)
+
+    Returns:
+        StreamResult
+
+    Raises:
+        subprocess.TimeoutExpired: If the command produced no output for inactivity_timeout seconds
+    """
+    start = time.monotonic()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    streams = {'stdout': (process.stdout, sys.stdout), 'stderr': (process.stderr, sys.stderr)}
+    decoders = {name: codecs.getincrementaldecoder('utf-8')(errors='replace') for name in streams}
+    partial = {name: '' for name in streams}
+    tails = {name: deque(maxlen=tail_lines) for name in streams}
+    events: List[Dict] = []
+    output_bytes = 0
+
+    def handle_line(name: str, line: str) -> None:
+        event = parse_event(line, patterns) if patterns and line.strip() else None
+        if event:
+            events.append(event)
+            if on_event:
+                on_event(event)
+            if event['event'] == 'progress':
+                # Progress bars redraw constantly; keep them out of the error-report tail
+                return
+        if line.strip():
+            tails[name].append(line)
+
+    selector = selectors.DefaultSelector()
+    for name, (pipe, _) in streams.items():
+        selector.register(pipe, selectors.EVENT_READ, name)
+    last_output = time.monotonic()
+    try:
+        while selector.get_map():
+            timeout = None
+            if inactivity_timeout:
+                timeout = max(0.0, inactivity_timeout - (time.monotonic() - last_output))
+            ready = selector.select(timeout)
+            if not ready:
+                process.kill()
+                process.wait()
+                raise subprocess.TimeoutExpired(command, inactivity_timeout,
+                                                output='\n'.join(tails['stdout']), stderr='\n'.join(tails['stderr']))
+            for key, _ in ready:
+                name = key.data
+                chunk = os.read(key.fileobj.fileno(), 65536)
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                    continue
+                last_output = time.monotonic()
+                output_bytes += len(chunk)
+                text = decoders[name].decode(chunk)
+                if echo:
+                    streams[name][1].write(text)
+                    streams[name][1].flush()
+                # Progress bars end their updates with \r rather than \n
+                lines = re.split(r'\r\n|\r|\n', partial[name] + text)
+                partial[name] = lines.pop()
+                for line in lines:
+                    handle_line(name, line)
+    finally:
+        selector.close()
+        for pipe, _ in streams.values():
+            pipe.close()
+
+    for name in streams:
+        partial[name] += decoders[name].decode(b'', final=True)
+        if partial[name]:
+            handle_line(name, partial[name])
+    process.wait()
+    return StreamResult(command, process.returncode, list(tails['stdout']), list(tails['stderr']),
+                        events, output_bytes, time.monotonic() - start)
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Phase Timing History Module for Developer Laboratory Setup
+
+This module keeps a local SQLite history of how long each provisioning phase
+took, so a change to the provisioner or to the package manifest that makes
+fresh-machine setup slower shows up as a regression against earlier runs.
+
+provision-devlab.sh appends one tab-separated line per finished phase and per
+generate_phase_summary call to a per-run buffer file (no process is spawned for
+that), and ingests the buffer into the history once when the run ends:
+
+    <kind>  <phase>  <title>  <start epoch>  <end epoch>  <exit code>
+
+Package counts per phase are taken from the Homebrew manifest at ingest time.
+The history lives at $XDG_STATE_HOME/devlab/phase-history.db (or
+$DEVLAB_PHASE_HISTORY).
+
+Usage:
+    python3 scripts/util/timing_helper.py --report --runs 5
+    python3 scripts/util/timing_helper.py --export csv --output phase-history.csv
+    python3 scripts/util/timing_helper.py --export json
+
+Author: Balamurugan Krishnamoorthy
+"""
+
+import csv
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import sys
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started REAL,
+    finished REAL,
+    status TEXT,
+    host TEXT,
+    options TEXT
+);
+CREATE TABLE IF NOT EXISTS phases (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    kind TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    title TEXT,
+    started REAL,
+    finished REAL,
+    duration REAL,
+    exit_code INTEGER,
+    formulas INTEGER,
+    casks INTEGER
+);
+CREATE INDEX IF NOT EXISTS phases_run ON phases(run_id);
+"""
+
+
+def default_history_path() -> str:
+    """History location: $DEVLAB_PHASE_HISTORY, else $XDG_STATE_HOME/devlab/phase-history.db"""
+    state_home = os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+    return os.environ.get('DEVLAB_PHASE_HISTORY') or os.path.join(state_home, 'devlab', 'phase-history.db')
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Format seconds as 42.0s or 3m 05s"""
+    if seconds is None:
+        return '-'
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    return f"{int(seconds // 60)}m {int(seconds % 60):02d}s"
+
+
+class PhaseHistory:
+    """SQLite-backed record of provisioning runs and their phase durations"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize PhaseHistory
+
+        Args:
+            path: Database file (defaults to default_history_path())
+        """
+        self.path = path or default_history_path()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open the database (creating its tables), commit on success and always close it"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.executescript(SCHEMA)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def ingest(self, buffer_path: str, run_id: str, status: str, options: str = '',
+               manifest_path: Optional[str] = None) -> int:
+        """
+        Store the phase lines a provisioning run buffered
+
+        Args:
+            buffer_path: Tab-separated buffer written by provision-devlab.sh
+            run_id: Identifier of the run
+            status: Outcome of the run ('success', 'failed', 'interrupted')
+            options: Command-line options the run was started with
+            manifest_path: Homebrew manifest used to count packages per phase
+
+        Returns:
+            Number of phase rows stored
+        """
+        rows = []
+        with open(buffer_path) as f:
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) != 6:
+                    continue
+                kind, phase, title, started, finished, exit_code = fields
+                try:
+                    rows.append([kind, phase, title, float(started), float(finished), int(exit_code or 0)])
+                except ValueError:
+                    continue
+        if not rows:
+            return 0
+
+        counts = self._package_counts(manifest_path, {row[1] for row in rows})
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+                         (run_id, min(r[3] for r in rows), max(r[4] for r in rows), status,
+                          socket.gethostname(), options))
+            conn.execute("DELETE FROM phases WHERE run_id = ?", (run_id,))
+            conn.executemany(
+                "INSERT INTO phases VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, kind, phase, title, started, finished, round(finished - started, 3), exit_code)
+                 + counts.get(phase, (None, None))
+                 for kind, phase, title, started, finished, exit_code in rows])
+        return len(rows)
+
+    @staticmethod
+    def _package_counts(manifest_path: Optional[str], phases: set) -> Dict[str, tuple]:
+        """(formulas, casks) the manifest lists for each numeric phase; empty if it cannot be read"""
+        try:
+            from brew_helper import DEFAULT_MANIFEST, PackageManifest
+            manifest = PackageManifest(manifest_path or DEFAULT_MANIFEST)
+        except (ImportError, OSError, ValueError, SyntaxError):
+            return {}
+        return {
+            phase: (len(manifest.packages('formulas', [phase])), len(manifest.packages('casks', [phase])))
+            for phase in phases if phase.isdigit()
+        }
+
+    def runs(self, limit: Optional[int] = None) -> List[Dict]:
+        """Recorded runs, newest first"""
+        query = "SELECT * FROM runs ORDER BY started DESC"
+        with self._connect() as conn:
+            rows = conn.execute(query + (" LIMIT ?" if limit else ""), (limit,) if limit else ()).fetchall()
+        return [dict(row) for row in rows]
+
+    def phases(self, run_ids: Optional[List[str]] = None, kind: Optional[str] = None) -> List[Dict]:
+        """Phase rows of the given runs (all runs when None), in run and start order"""
+        query = "SELECT p.*, r.status FROM phases p JOIN runs r USING (run_id)"
+        conditions, params = [], []
+        if run_ids is not None:
+            conditions.append(f"p.run_id IN ({','.join('?' * len(run_ids))})")
+            params.extend(run_ids)
+        if kind:
+            conditions.append("p.kind = ?")
+            params.append(kind)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY r.started, p.started", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def compare(self, run_id: Optional[str] = None, previous: int = 5, threshold: float = 0.2,
+                min_seconds: float = 5.0) -> Optional[Dict]:
+        """
+        Compare one run's phase durations with the median of earlier runs
+
+        Args:
+            run_id: Run to inspect (defaults to the latest)
+            previous: Number of earlier runs forming the baseline
+            threshold: Relative slowdown that counts as a regression (0.2 = 20%)
+            min_seconds: Absolute slowdown below which a phase is never flagged
+
+        Returns:
+            Dict with 'run', 'baseline_runs' and per-phase 'rows', or None without history
+        """
+        runs = self.runs()
+        if run_id:
+            runs = runs[next((i for i, r in enumerate(runs) if r['run_id'] == run_id), len(runs)):]
+        if not runs:
+            return None
+        current, baseline_runs = runs[0], runs[1:previous + 1]
+
+        baseline: Dict[str, List[Dict]] = {}
+        for row in self.phases([r['run_id'] for r in baseline_runs], kind='phase'):
+            baseline.setdefault(row['phase'], []).append(row)
+
+        rows = []
+        for row in self.phases([current['run_id']], kind='phase'):
+            earlier = baseline.get(row['phase'], [])
+            median = statistics.median(r['duration'] for r in earlier) if earlier else None
+            delta = row['duration'] - median if median is not None else None
+            rows.append({
+                'phase': row['phase'],
+                'title': row['title'],
+                'duration': row['duration'],
+                'baseline': median,
+                'delta': delta,
+                'ratio': (delta / median) if median else None,
+                'formulas': row['formulas'],
+                'baseline_formulas': earlier[-1]['formulas'] if earlier else None,
+                'regressed': bool(delta is not None and delta >= min_seconds and median
+                                  and delta / median >= threshold),
+            })
+        return {'run': current, 'baseline_runs': len(baseline_runs), 'rows': rows}
+
+    def export(self, fmt: str, output) -> int:
+        """
+        Write every recorded phase row as CSV or as JSON runs with nested phases
+
+        Args:
+            fmt: 'csv' or 'json'
+            output: Writable text stream
+
+        Returns:
+            Number of phase rows written
+        """
+        phases = self.phases()
+        if fmt == 'csv':
+            fields = ['run_id', 'status', 'kind', 'phase', 'title', 'started', 'finished', 'duration',
+                      'exit_code', 'formulas', 'casks']
+            writer = csv.DictWriter(output, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(phases)
+        else:
+            runs = list(reversed(self.runs()))
+            by_run: Dict[str, List[Dict]] = {}
+            for row in phases:
+                by_run.setdefault(row.pop('run_id'), []).append(row)
+            for run in runs:
+                run['phases'] = by_run.get(run['run_id'], [])
+            json.dump(runs, output, indent=2)
+            output.write('\n')
+        return len(phases)
+
+
+def print_report(comparison: Dict) -> None:
+    """
+    Print a run's phase durations next to the baseline and list the phases that got slower
+
+    Args:
+        comparison: Result of PhaseHistory.compare()
+    """
+    run = comparison['run']
+    total = (run['finished'] or 0) - (run['started'] or 0)
+    print(f"Run {run['run_id']} ({run['status']}, {format_duration(total)}) "
+          f"vs median of {comparison['baseline_runs']} previous runs")
+    print(f"  {'phase':<6} {'title':<44} {'current':>9} {'baseline':>9} {'change':>8}")
+    for row in comparison['rows']:
+        change = f"{row['ratio'] * 100:+.0f}%" if row['ratio'] is not None else '-'
+        marker = '  << slower' if row['regressed'] else ''
+        print(f"  {row['phase']:<6} {row['title'][:44]:<44} {format_duration(row['duration']):>9} "
+              f"{format_duration(row['baseline']):>9} {change:>8}{marker}")
+
+    regressed = [row for row in comparison['rows'] if row['regressed']]
+    if not comparison['baseline_runs']:
+        print("No earlier runs to compare with yet")
+    elif not regressed:
+        print("No phase got slower")
+    for row in regressed:
+        note = ''
+        if row['formulas'] != row['baseline_formulas'] and row['baseline_formulas'] is not None:
+            note = f"; manifest formulas {row['baseline_formulas']} -> {row['formulas']}"
+        print(f"Slower: phase {row['phase']} {row['title']} "
+              f"(+{format_duration(row['delta'])}, {row['ratio'] * 100:+.0f}%{note})")
+
+
+def main():
+    """Main function for command-line usage"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Record and compare Developer Laboratory phase timings')
+    parser.add_argument('--history', default=None,
+                        help='History database (default: $DEVLAB_PHASE_HISTORY or $XDG_STATE_HOME/devlab/phase-history.db)')
+    parser.add_argument('--ingest', metavar='BUFFER', help='Store a run buffer written by provision-devlab.sh')
+    parser.add_argument('--run-id', help='With --ingest: run identifier; with --report: run to inspect')
+    parser.add_argument('--status', default='success', help='With --ingest: outcome of the run')
+    parser.add_argument('--options', default='', help='With --ingest: options the run was started with')
+    parser.add_argument('--manifest', help='With --ingest: Homebrew manifest used for package counts')
+    parser.add_argument('--report', action='store_true', help='Compare a run (default: latest) with earlier runs')
+    parser.add_argument('--runs', type=int, default=5, help='With --report: number of earlier runs in the baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='With --report: relative slowdown flagged as a regression (default 0.2)')
+    parser.add_argument('--min-seconds', type=float, default=5.0,
+                        help='With --report: ignore slowdowns shorter than this')
+    parser.add_argument('--export', choices=['csv', 'json'], help='Export every recorded phase')
+    parser.add_argument('--output', help='With --export: file to write (default: stdout)')
+    args = parser.parse_args()
+
+    history = PhaseHistory(args.history)
+    try:
+        if args.ingest:
+            if not args.run_id:
+                parser.error('--ingest requires --run-id')
+            history.ingest(args.ingest, args.run_id, args.status, args.options, args.manifest)
+        if args.export:
+            if args.output:
+                with open(args.output, 'w', newline='') as f:
+                    count = history.export(args.export, f)
+                print(f"Exported {count} phase records to {args.output}")
+            else:
+                history.export(args.export, sys.stdout)
+        if args.report or not (args.ingest or args.export):
+            comparison = history.compare(args.run_id, args.runs, args.threshold, args.min_seconds)
+            if comparison is None:
+                print(f"No provisioning runs recorded in {history.path}")
+                return
+            print_report(comparison)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Cannot use phase history {history.path}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
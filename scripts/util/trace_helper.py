@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Subprocess Timing Trace Module for Developer Laboratory Setup
+
+This module records a timing span for every subprocess the helper utilities run
+(command, phase, wall time, exit code, output size) as Chrome/Perfetto
+trace events, and summarizes recorded traces from the command line.
+
+Tracing is enabled by pointing DEVLAB_TRACE at a file. Events are appended one
+JSON object per line, so several helper processes can share one trace file.
+
+Usage:
+    DEVLAB_TRACE=/tmp/devlab-trace.jsonl ./provision-devlab.sh --yes
+    python3 scripts/util/trace_helper.py /tmp/devlab-trace.jsonl --top 15
+    python3 scripts/util/trace_helper.py /tmp/devlab-trace.jsonl --chrome trace.json
+
+Author: Balamurugan Krishnamoorthy
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+
+class Tracer:
+    """Append-only recorder of subprocess spans in Chrome trace-event format"""
+
+    # Environment variable holding the trace file path; tracing is off when unset
+    ENV_VAR = 'DEVLAB_TRACE'
+
+    # Environment variable naming the provisioning phase a span belongs to
+    PHASE_ENV_VAR = 'DEVLAB_PHASE'
+
+    def __init__(self, path: Optional[str] = None, source: str = 'devlab'):
+        """
+        Initialize Tracer
+
+        Args:
+            path: Trace file to append to (defaults to $DEVLAB_TRACE, read at record time)
+            source: Name of the helper recording the spans
+        """
+        self._path = path
+        self.source = source
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Optional[str]:
+        """Trace file path, or None when tracing is disabled"""
+        return self._path or os.environ.get(self.ENV_VAR) or None
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    @contextmanager
+    def span(self, command: List[str]) -> Iterator[Dict]:
+        """
+        Time a subprocess; the caller fills 'exit_code' and 'output_bytes' in the yielded dict
+
+        Args:
+            command: Command being run
+        """
+        details: Dict = {'exit_code': None, 'output_bytes': None}
+        start = time.time()
+        try:
+            yield details
+        finally:
+            if self.enabled:
+                self.record(command, start, time.time() - start, details)
+
+    def record(self, command: List[str], start: float, duration: float, details: Dict) -> None:
+        """
+        Append one complete ('X') trace event
+
+        Args:
+            command: Command that was run
+            start: Start time (seconds since the epoch)
+            duration: Wall time in seconds
+            details: Extra span fields such as exit_code and output_bytes
+        """
+        phase = os.environ.get(self.PHASE_ENV_VAR, '') or 'unphased'
+        event = {
+            'name': ' '.join(command[:2]),
+            'cat': phase,
+            'ph': 'X',
+            'ts': int(start * 1_000_000),
+            'dur': int(duration * 1_000_000),
+            'pid': os.getpid(),
+            'tid': threading.get_native_id(),
+            'args': dict(details, command=' '.join(command), phase=phase, source=self.source),
+        }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._lock, open(self.path, 'a') as f:
+                f.write(json.dumps(event) + '\n')
+        except OSError:
+            # Tracing must never break provisioning
+            pass
+
+
+def load_events(path: str) -> List[Dict]:
+    """
+    Load trace events from a JSONL trace (or an exported {"traceEvents": [...]} file)
+
+    Args:
+        path: Trace file
+
+    Returns:
+        List of complete ('X') events
+    """
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith('{"traceEvents"'):
+        events = json.loads(text)['traceEvents']
+    else:
+        events = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [e for e in events if e.get('ph') == 'X']
+
+
+def print_report(events: List[Dict], top: int = 10) -> None:
+    """
+    Print the slowest commands and the total subprocess time per phase
+
+    Args:
+        events: Trace events from load_events
+        top: Number of slowest commands to show
+    """
+    total = sum(e['dur'] for e in events) / 1e6
+    print(f"{len(events)} subprocesses, {total:.1f}s total wall time")
+
+    print(f"\nTop {top} slowest commands:")
+    for event in sorted(events, key=lambda e: e['dur'], reverse=True)[:top]:
+        args = event.get('args', {})
+        command = args.get('command', event['name'])
+        if len(command) > 70:
+            command = command[:67] + '...'
+        print(f"  {event['dur'] / 1e6:8.2f}s  exit={args.get('exit_code')!s:<4} [{event.get('cat')}] {command}")
+
+    per_phase: Dict[str, List[float]] = {}
+    for event in events:
+        per_phase.setdefault(event.get('cat', 'unphased'), []).append(event['dur'] / 1e6)
+    print("\nTime per phase:")
+    for phase, durations in sorted(per_phase.items(), key=lambda item: sum(item[1]), reverse=True):
+        print(f"  {sum(durations):8.2f}s  {len(durations):4d} commands  {phase}")
+
+
+def main():
+    """Main function for command-line usage"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Summarize Developer Laboratory subprocess timing traces')
+    parser.add_argument('trace', help='Trace file written via DEVLAB_TRACE')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Number of slowest commands to show')
+    parser.add_argument('--chrome', metavar='OUTPUT',
+                        help='Also export a Chrome/Perfetto trace JSON file (open in ui.perfetto.dev)')
+    args = parser.parse_args()
+
+    try:
+        events = load_events(args.trace)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read trace {args.trace}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print_report(events, args.top)
+
+    if args.chrome:
+        with open(args.chrome, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        print(f"\nChrome trace written to {args.chrome}")
+
+
+if __name__ == '__main__':
+    main()
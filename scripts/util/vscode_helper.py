@@ -4,14 +4,40 @@ VS Code Utility Module for Developer Laboratory Setup
 
 This module provides functions for managing VS Code extensions and settings,
 including capture, install, sync, backup, and diff operations, similar to the Homebrew helper.
+The same operations work for the VS Code forks Cursor and Windsurf, which share
+its extension model; several editors can be synced from one extensions.txt in
+one concurrent pass.
+
+Backups are snapshots in a SnapshotHistory (snapshot_helper.py): identical
+snapshots are skipped, changes are logged as deltas and old snapshots pruned.
+
+Pinned extensions (id@version) are installed from a local .vsix cache when
+possible: packages are downloaded from the marketplace once, kept in an
+ArtifactStore under $XDG_CACHE_HOME/devlab/vsix (or $DEVLAB_VSIX_CACHE) keyed by
+id@version, plus the target platform (e.g. darwin-arm64) for platform-specific
+packages, and the cache can be exported to and imported from a shared folder.
 
 Author: Balamurugan Krishnamoorthy
 """
+import gzip
+import json
 import os
+import platform
+import re
+import shutil
 import sys
 import subprocess
-from datetime import datetime
-from typing import List, Tuple
+import tempfile
+import threading
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from artifact_helper import ArtifactStore, parse_size
+from snapshot_helper import SnapshotHistory, default_snapshot_dir
+from stream_helper import VSCODE_EVENT_PATTERNS, run_streaming
+from trace_helper import Tracer
 
 class Colors:
     RED = '\033[0;31m'
@@ -34,121 +60,564 @@ class Logger:
     def error(message: str) -> None:
         print(f"{Colors.RED}[ERROR]{Colors.NC} {message}")
 
+def vsix_target_platform() -> str:
+    """Marketplace target platform of this machine, e.g. darwin-arm64 ($DEVLAB_VSIX_PLATFORM overrides it)"""
+    override = os.environ.get('DEVLAB_VSIX_PLATFORM')
+    if override:
+        return override
+    system = {'Darwin': 'darwin', 'Linux': 'linux', 'Windows': 'win32'}.get(platform.system(), platform.system().lower())
+    machine = platform.machine().lower()
+    arch = {'x86_64': 'x64', 'amd64': 'x64', 'aarch64': 'arm64', 'armv7l': 'armhf'}.get(machine, machine)
+    return f"{system}-{arch}"
+
+def package_target_platform(path: str) -> Optional[str]:
+    """TargetPlatform of a .vsix from its extension.vsixmanifest, or None for a universal package"""
+    try:
+        with zipfile.ZipFile(path) as package:
+            manifest = package.read('extension.vsixmanifest').decode('utf-8', 'replace')
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None
+    match = re.search(r'<Identity\b[^>]*\bTargetPlatform="([^"]+)"', manifest)
+    return match.group(1) if match and match.group(1) != 'universal' else None
+
+def default_vsix_cache_dir() -> str:
+    """VSIX cache location: $DEVLAB_VSIX_CACHE, else $XDG_CACHE_HOME/devlab/vsix"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.environ.get('DEVLAB_VSIX_CACHE') or os.path.join(cache_home, 'devlab', 'vsix')
+
+# Editors built on VS Code: CLI command, display name and installed extensions directory
+EDITOR_TARGETS: Dict[str, Dict[str, str]] = {
+    'code': {'cli': 'code', 'name': 'VS Code', 'extensions_dir': '~/.vscode/extensions'},
+    'cursor': {'cli': 'cursor', 'name': 'Cursor', 'extensions_dir': '~/.cursor/extensions'},
+    'windsurf': {'cli': 'windsurf', 'name': 'Windsurf', 'extensions_dir': '~/.windsurf/extensions'},
+}
+
 class VSCodeUtil:
-    def __init__(self, extensions_file: str, backup_dir: str):
+    # Extensions passed to one `code` launch; each launch is a full Electron CLI start
+    DEFAULT_BATCH_SIZE = 20
+    # Concurrent `code` launches; kept low because every launch rewrites the extensions index
+    DEFAULT_INSTALL_JOBS = 2
+    # Guards capturing extensions.txt, which editors installing concurrently share
+    _capture_lock = threading.Lock()
+
+    # Where VS Code keeps installed extensions (VSCODE_EXTENSIONS overrides it, as it does for VS Code)
+    DEFAULT_EXTENSIONS_DIR = EDITOR_TARGETS['code']['extensions_dir']
+
+    # Marketplace package URL (DEVLAB_VSIX_URL overrides it, e.g. for a mirror)
+    MARKETPLACE_VSIX_URL = ('https://marketplace.visualstudio.com/_apis/public/gallery/publishers/'
+                            '{publisher}/vsextensions/{name}/{version}/vspackage?targetPlatform={target_platform}')
+    # Size cap of the VSIX cache (overridable with DEVLAB_VSIX_CACHE_MAX)
+    DEFAULT_VSIX_CACHE_MAX = '2G'
+    # Concurrent marketplace downloads when filling the cache
+    DEFAULT_DOWNLOAD_JOBS = 4
+
+    def __init__(self, extensions_file: str, backup_dir: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 install_jobs: int = DEFAULT_INSTALL_JOBS, extensions_dir: Optional[str] = None,
+                 vsix_cache: Optional[ArtifactStore] = None, editor: str = 'code'):
         self.extensions_file = extensions_file
-        self.backup_dir = backup_dir
+        self.backup_dir = os.path.expanduser(backup_dir or default_snapshot_dir())
+        self.editor = editor
+        self.cli = EDITOR_TARGETS[editor]['cli']
+        self.editor_name = EDITOR_TARGETS[editor]['name']
+        if editor == 'code':
+            extensions_dir = extensions_dir or os.environ.get('VSCODE_EXTENSIONS')
+        self.extensions_dir = os.path.expanduser(extensions_dir or EDITOR_TARGETS[editor]['extensions_dir'])
+        self.batch_size = max(1, batch_size)
+        self.install_jobs = max(1, install_jobs)
+        self.vsix_cache = vsix_cache
+        self.target_platform = vsix_target_platform()
+        # Cleared when several editors run at once, whose output would interleave
+        self.echo_output = True
         os.makedirs(self.backup_dir, exist_ok=True)
+        self.snapshots = SnapshotHistory(self.backup_dir)
+        self.tracer = Tracer(source='vscode_helper')
 
-    def _run_command(self, command: List[str], capture_output: bool = True) -> subprocess.CompletedProcess:
+    def _run_command(self, command: List[str], capture_output: bool = True):
+        if not capture_output:
+            return self._stream_command(command)
         try:
-            result = subprocess.run(
-                command,
-                capture_output=capture_output,
-                text=True,
-                timeout=120
-            )
+            with self.tracer.span(command) as span:
+                result = subprocess.run(
+                    command,
+                    capture_output=capture_output,
+                    text=True,
+                    timeout=120
+                )
+                span['exit_code'] = result.returncode
+                if capture_output:
+                    span['output_bytes'] = len((result.stdout or '').encode()) + len((result.stderr or '').encode())
+            return result
+        except Exception as e:
+            Logger.error(f"Command failed: {' '.join(command)}: {e}")
+            raise
+
+    def _stream_command(self, command: List[str], echo: bool = True, on_event: Optional[Callable[[Dict], None]] = None):
+        # Extension installs can be slow on a cold marketplace; only stop after 5 minutes of silence
+        try:
+            with self.tracer.span(command) as span:
+                result = run_streaming(command, echo=echo, patterns=VSCODE_EVENT_PATTERNS, on_event=on_event,
+                                       inactivity_timeout=300)
+                span['exit_code'] = result.returncode
+                span['output_bytes'] = result.output_bytes
             return result
         except Exception as e:
             Logger.error(f"Command failed: {' '.join(command)}: {e}")
             raise
 
     def check_vscode_cli(self) -> bool:
-        result = self._run_command(['which', 'code'])
+        result = self._run_command(['which', self.cli])
         if result.returncode == 0:
             return True
-        Logger.error("VS Code CLI 'code' command not found. Please install VS Code and add 'code' to PATH.")
+        Logger.error(f"{self.editor_name} CLI '{self.cli}' command not found. "
+                     f"Please install {self.editor_name} and add '{self.cli}' to PATH.")
         return False
 
+    @staticmethod
+    def _version_key(version: str) -> List[Tuple[int, object]]:
+        return [(0, int(part)) if part.isdigit() else (1, part) for part in version.replace('-', '.').split('.')]
+
+    def _read_package_json(self, folder: str) -> Optional[Tuple[str, str]]:
+        """(publisher.name, version) from an extension folder's package.json, or None"""
+        try:
+            with open(os.path.join(self.extensions_dir, folder, 'package.json')) as f:
+                package = json.load(f)
+            return f"{package['publisher']}.{package['name']}", package.get('version', '')
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def read_installed_from_disk(self) -> Optional[Dict[str, str]]:
+        """Installed id -> version read from the extensions directory, or None if it cannot be read"""
+        if not os.path.isdir(self.extensions_dir):
+            return None
+        try:
+            with open(os.path.join(self.extensions_dir, '.obsolete')) as f:
+                obsolete = set(json.load(f))
+        except (OSError, ValueError, TypeError):
+            obsolete = set()
+
+        entries: List[Tuple[str, str]] = []
+        try:
+            with open(os.path.join(self.extensions_dir, 'extensions.json')) as f:
+                for entry in json.load(f):
+                    folder = entry.get('relativeLocation') or os.path.basename(
+                        (entry.get('location') or {}).get('path', ''))
+                    if folder in obsolete or not entry.get('identifier', {}).get('id'):
+                        continue
+                    # The index stores lower-cased ids; package.json has the casing the CLI prints
+                    package = self._read_package_json(folder)
+                    entries.append((package[0] if package else entry['identifier']['id'], entry.get('version', '')))
+        except FileNotFoundError:
+            try:
+                folders = os.listdir(self.extensions_dir)
+            except OSError:
+                return None
+            for folder in folders:
+                if folder not in obsolete and not folder.startswith('.'):
+                    package = self._read_package_json(folder)
+                    if package:
+                        entries.append(package)
+        except (OSError, ValueError, TypeError, AttributeError):
+            return None
+
+        # Several versions of one extension can sit side by side until VS Code cleans up
+        installed: Dict[str, str] = {}
+        for extension_id, version in entries:
+            current = installed.get(extension_id)
+            if current is None or self._version_key(version) > self._version_key(current):
+                installed[extension_id] = version
+        return installed
+
+    def list_extensions(self, show_versions: bool = False) -> Optional[List[str]]:
+        """Installed extensions as `code --list-extensions` prints them, read from disk when possible"""
+        installed = self.read_installed_from_disk()
+        if installed is not None:
+            return sorted((f"{i}@{v}" if show_versions else i for i, v in installed.items()), key=str.lower)
+        command = [self.cli, '--list-extensions'] + (['--show-versions'] if show_versions else [])
+        try:
+            result = self._run_command(command)
+        except Exception:
+            return None
+        if result.returncode != 0:
+            return None
+        return [line for line in result.stdout.splitlines() if line.strip()]
+
     def capture_extensions(self) -> None:
-        Logger.info("Capturing currently installed VS Code extensions...")
-        backup_file = os.path.join(self.backup_dir, f"extensions-backup-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt")
-        if os.path.isfile(self.extensions_file):
-            os.replace(self.extensions_file, backup_file)
-            Logger.warning(f"Created backup: {os.path.basename(backup_file)}")
-        result = self._run_command(['code', '--list-extensions', '--show-versions'])
-        if result.returncode == 0:
-            with open(self.extensions_file, 'w') as f:
-                f.write(result.stdout)
-            Logger.success(f"Captured {len(result.stdout.splitlines())} extensions to extensions.txt")
+        Logger.info(f"Capturing currently installed {self.editor_name} extensions...")
+        extensions = self.list_extensions(show_versions=True)
+        if extensions is not None:
+            if os.path.isfile(self.extensions_file):
+                with open(self.extensions_file) as f:
+                    if self.snapshots.record('extensions.txt', f.read().splitlines()):
+                        Logger.warning("Recorded the previous extensions.txt in the backup history")
+            self.snapshots.record(self.editor, extensions)
+            tmp_file = f"{self.extensions_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                f.write(''.join(line + '\n' for line in extensions))
+            os.replace(tmp_file, self.extensions_file)
+            Logger.success(f"Captured {len(extensions)} extensions to extensions.txt")
         else:
             Logger.error("Failed to capture extensions.")
 
     def get_installed_extensions(self) -> List[str]:
-        result = self._run_command(['code', '--list-extensions'])
-        if result.returncode == 0:
-            return result.stdout.strip().split('\n')
-        return []
+        return self.list_extensions() or []
 
-    def install_missing_extensions(self) -> Tuple[int, int, int]:
-        Logger.info("Installing missing VS Code extensions...")
-        if not os.path.isfile(self.extensions_file):
-            Logger.warning("extensions.txt not found. Capturing current extensions first...")
-            self.capture_extensions()
-        installed_count = 0
-        skipped_count = 0
-        error_count = 0
-        current_extensions = set(self.get_installed_extensions())
+    def get_installed_versions(self) -> Dict[str, str]:
+        """Installed extension id -> version"""
+        versions = {}
+        for line in self.list_extensions(show_versions=True) or []:
+            extension_id, _, version = line.partition('@')
+            versions[extension_id] = version
+        return versions
+
+    def read_configured_extensions(self) -> Dict[str, str]:
+        """extensions.txt as id -> pinned version ('' when unpinned)"""
+        configured = {}
         with open(self.extensions_file) as f:
             for line in f:
                 line = line.strip()
                 if not line or line.startswith('#'):
                     continue
-                extension_id = line.split('@')[0]
-                if extension_id in current_extensions:
-                    Logger.warning(f"Skipping {extension_id} (already installed)")
-                    skipped_count += 1
-                else:
-                    Logger.info(f"Installing {extension_id}...")
-                    result = self._run_command(['code', '--install-extension', extension_id, '--force'], capture_output=False)
-                    if result.returncode == 0:
-                        Logger.success(f"Installed {extension_id}")
-                        installed_count += 1
-                    else:
-                        Logger.error(f"Failed to install {extension_id}")
-                        error_count += 1
-        Logger.success(f"Installation complete: Installed={installed_count}, Skipped={skipped_count}, Errors={error_count}")
-        return installed_count, skipped_count, error_count
-
-    def backup_extensions(self) -> None:
-        Logger.info("Creating backup of current extensions...")
-        backup_file = os.path.join(self.backup_dir, f"extensions-backup-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt")
-        result = self._run_command(['code', '--list-extensions', '--show-versions'])
-        if result.returncode == 0:
-            with open(backup_file, 'w') as f:
-                f.write(result.stdout)
-            Logger.success(f"Backup created: {os.path.basename(backup_file)}")
-        else:
-            Logger.error("Failed to create backup.")
+                extension_id, _, version = line.partition('@')
+                configured[extension_id] = version
+        return configured
+
+    @staticmethod
+    def plan_sync(configured: Dict[str, str], installed: Dict[str, str]) -> Dict[str, List[Dict[str, str]]]:
+        """Case-insensitive delta of configured vs installed: missing, extra, version_changed, in_sync"""
+        installed_by_key = {extension_id.lower(): (extension_id, version) for extension_id, version in installed.items()}
+        configured_keys = {extension_id.lower() for extension_id in configured}
+        plan: Dict[str, List[Dict[str, str]]] = {'missing': [], 'extra': [], 'version_changed': [], 'in_sync': []}
+        for extension_id, version in configured.items():
+            current = installed_by_key.get(extension_id.lower())
+            if current is None:
+                plan['missing'].append({'id': extension_id, 'version': version})
+            elif version and version != current[1]:
+                plan['version_changed'].append({'id': extension_id, 'installed': current[1], 'configured': version})
+            else:
+                plan['in_sync'].append({'id': extension_id, 'version': current[1]})
+        plan['extra'] = [{'id': extension_id, 'version': version}
+                         for key, (extension_id, version) in sorted(installed_by_key.items()) if key not in configured_keys]
+        return plan
 
-    def diff_extensions(self) -> None:
-        Logger.info("Comparing installed vs configured extensions...")
+    @staticmethod
+    def _install_spec(entry: Dict[str, str]) -> str:
+        """`code --install-extension` argument: id@version when pinned, else id"""
+        version = entry.get('configured', entry.get('version', ''))
+        return f"{entry['id']}@{version}" if version else entry['id']
+
+    def install_missing_extensions(self) -> Tuple[int, int, int]:
+        Logger.info(f"Installing missing {self.editor_name} extensions...")
+        with self._capture_lock:
+            if not os.path.isfile(self.extensions_file):
+                Logger.warning("extensions.txt not found. Capturing current extensions first...")
+                self.capture_extensions()
+        plan = self.plan_sync(self.read_configured_extensions(), self.get_installed_versions())
+        skipped_count = len(plan['in_sync']) + len(plan['version_changed'])
+        for entry in plan['in_sync'] + plan['version_changed']:
+            Logger.warning(f"Skipping {entry['id']} (already installed)")
+        installed, failed = self.install_extensions_batch([self._install_spec(e) for e in plan['missing']])
+        for extension_id in failed:
+            Logger.error(f"Failed to install {extension_id}")
+        Logger.success(f"Installation complete: Installed={len(installed)}, Skipped={skipped_count}, Errors={len(failed)}")
+        return len(installed), skipped_count, len(failed)
+
+    def _extension_command(self, action: str, extension_ids: List[str]) -> Dict[str, bool]:
+        """Run one `code` launch for several extensions, mapping each _outcome_key() it reports to success"""
+        command = [self.cli]
+        for extension_id in extension_ids:
+            command += [f'--{action}-extension', extension_id]
+        if action == 'install':
+            command.append('--force')
+        try:
+            # Raw output of concurrent launches would interleave; they report one line per parsed event instead
+            echo = self.echo_output and self.install_jobs == 1
+            reported = set()
+
+            def report(event: Dict) -> None:
+                # The CLI can word one failure several ways; report each package once
+                key = (event['event'], event.get('package', '').lower())
+                if key not in reported:
+                    reported.add(key)
+                    self._report_event(event)
+
+            result = self._stream_command(command, echo=echo, on_event=None if echo else report)
+        except Exception:
+            return {}
+        succeeded = ('uninstalled',) if action == 'uninstall' else ('installed', 'already_installed')
+        outcome: Dict[str, bool] = {}
+        for event in result.events:
+            package = event.get('package', '').lower()
+            if package:
+                outcome[package] = event['event'] in succeeded
+        if result.returncode == 0 and len(extension_ids) == 1:
+            outcome.setdefault(self._outcome_key(extension_ids[0]), True)
+        return outcome
+
+    def _report_event(self, event: Dict) -> None:
+        """Print one parsed `code` CLI event as a single line"""
+        package = event.get('package', '')
+        if event['event'] == 'error':
+            Logger.error(f"{self.editor_name}: {package} failed")
+        elif event['event'] in ('installed', 'already_installed', 'uninstalled'):
+            version = f" {event['version']}" if event.get('version') else ''
+            Logger.info(f"{self.editor_name}: {package}{version} {event['event'].replace('_', ' ')}")
+
+    @staticmethod
+    def _outcome_key(argument: str) -> str:
+        """Name `code` reports an argument under: the file name for a .vsix path, else the lower-cased id"""
+        if argument.endswith('.vsix'):
+            return os.path.basename(argument).lower()
+        return argument.split('@')[0].lower()
+
+    def _install_command(self, extension_ids: List[str]) -> Dict[str, bool]:
+        return self._extension_command('install', extension_ids)
+
+    def _download_vsix(self, extension_id: str, version: str, dest: str) -> bool:
+        """Download one extension package for this platform, checking it is the requested id@version"""
+        publisher, _, name = extension_id.partition('.')
+        url = (os.environ.get('DEVLAB_VSIX_URL') or self.MARKETPLACE_VSIX_URL).format(
+            publisher=publisher, name=name, version=version, target_platform=self.target_platform)
+        try:
+            request = urllib.request.Request(url, headers={'User-Agent': 'devlab-bootstrap'})
+            with urllib.request.urlopen(request, timeout=120) as response:
+                # The marketplace gzips packages regardless of Accept-Encoding
+                body = gzip.GzipFile(fileobj=response) if response.headers.get('Content-Encoding') == 'gzip' else response
+                with open(dest, 'wb') as f:
+                    shutil.copyfileobj(body, f, 1024 * 1024)
+            with zipfile.ZipFile(dest) as package:
+                manifest = json.loads(package.read('extension/package.json'))
+        except Exception as e:
+            Logger.warning(f"Could not download {extension_id}@{version}: {e}")
+            return False
+        found = f"{manifest.get('publisher', '')}.{manifest.get('name', '')}@{manifest.get('version', '')}"
+        if found.lower() != f"{extension_id}@{version}".lower():
+            Logger.warning(f"Downloaded package for {extension_id}@{version} is {found}; not caching it")
+            return False
+        target_platform = package_target_platform(dest)
+        if target_platform not in (None, self.target_platform):
+            Logger.warning(f"Downloaded package for {extension_id}@{version} targets {target_platform}, "
+                           f"not {self.target_platform}; not caching it")
+            return False
+        return True
+
+    def _cached_vsix(self, spec: str) -> Optional[str]:
+        """Digest of the cached package of id@version for this platform, else of its universal package"""
+        digest = self.vsix_cache.lookup(f"{spec.lower()}@{self.target_platform}")
+        if digest:
+            return digest
+        digest = self.vsix_cache.lookup(spec.lower())
+        # Entries cached before packages were keyed by platform may hold another platform's build
+        if digest and package_target_platform(self.vsix_cache.object_path(digest)) in (None, self.target_platform):
+            return digest
+        return None
+
+    def cache_vsix(self, extension_ids: List[str]) -> Dict[str, str]:
+        """Make sure the cache holds every pinned id@version, returning id@version -> sha256"""
+        if not self.vsix_cache:
+            return {}
+        cached: Dict[str, str] = {}
+        missing: List[str] = []
+        for spec in extension_ids:
+            if '@' not in spec:
+                continue
+            digest = self._cached_vsix(spec)
+            if digest:
+                cached[spec] = digest
+            else:
+                missing.append(spec)
+        if not missing:
+            return cached
+
+        Logger.info(f"VSIX cache: downloading {len(missing)} extensions ({len(cached)} already cached)...")
+        staging = self._vsix_staging_dir('download-')
+
+        def download(spec: str) -> Optional[str]:
+            extension_id, _, version = spec.partition('@')
+            path = os.path.join(staging, f"{extension_id}-{version}.vsix")
+            if not self._download_vsix(extension_id, version, path):
+                return None
+            # Universal packages are shared by every platform; platform-specific ones are keyed by platform
+            target_platform = package_target_platform(path)
+            key = f"{spec.lower()}@{target_platform}" if target_platform else spec.lower()
+            return self.vsix_cache.put(path, name=os.path.basename(path), key=key)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.DEFAULT_DOWNLOAD_JOBS) as executor:
+                for spec, digest in zip(missing, executor.map(download, missing)):
+                    if digest:
+                        cached[spec] = digest
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return cached
+
+    def _vsix_staging_dir(self, prefix: str) -> str:
+        """Scratch directory inside the cache, so packages are hard-linked rather than copied"""
+        os.makedirs(self.vsix_cache.root, exist_ok=True)
+        return tempfile.mkdtemp(prefix=prefix, dir=self.vsix_cache.root)
+
+    def _stage_vsix(self, extension_ids: List[str], staging: str) -> Dict[str, str]:
+        """Place cached packages of pinned extensions in staging, returning id@version -> .vsix path"""
+        sources = {}
+        for spec, digest in self.cache_vsix(extension_ids).items():
+            extension_id, _, version = spec.partition('@')
+            path = os.path.join(staging, f"{extension_id}-{version}.vsix")
+            if self.vsix_cache.get(digest, path):
+                sources[spec] = path
+        if sources:
+            Logger.info(f"VSIX cache: installing {len(sources)} of {len(extension_ids)} extensions from local packages")
+        return sources
+
+    def install_extensions_batch(self, extension_ids: List[str]) -> Tuple[List[str], List[str]]:
+        """Install extensions in concurrent batched launches, retrying failures one at a time"""
+        if not extension_ids:
+            return [], []
+        batches = [extension_ids[i:i + self.batch_size] for i in range(0, len(extension_ids), self.batch_size)]
+        Logger.info(f"Installing {len(extension_ids)} extensions in {len(batches)} batches "
+                    f"({self.install_jobs} concurrent launches)...")
+
+        staging = self._vsix_staging_dir('install-') if self.vsix_cache else None
+        sources = self._stage_vsix(extension_ids, staging) if staging else {}
+
+        def install(specs: List[str], local: bool = True) -> Dict[str, bool]:
+            arguments = [sources.get(spec, spec) if local else spec for spec in specs]
+            result = self._install_command(arguments)
+            return {spec: bool(result.get(self._outcome_key(argument))) for spec, argument in zip(specs, arguments)}
+
+        outcome: Dict[str, bool] = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.install_jobs) as executor:
+                for result in executor.map(install, batches):
+                    outcome.update(result)
+                retry = [e for e in extension_ids if not outcome.get(e)]
+                if retry:
+                    # Older CLIs do not report every extension; one listing settles those before retrying
+                    present = {i.lower(): v for i, v in self.get_installed_versions().items()}
+                    for spec in retry:
+                        extension_id, _, version = spec.partition('@')
+                        if extension_id.lower() in present and (not version or present[extension_id.lower()] == version):
+                            outcome[spec] = True
+                    retry = [e for e in retry if not outcome.get(e)]
+                if retry:
+                    Logger.warning(f"Retrying {len(retry)} extensions individually...")
+                    for result in executor.map(lambda spec: install([spec], local=False), retry):
+                        outcome.update(result)
+        finally:
+            if staging:
+                shutil.rmtree(staging, ignore_errors=True)
+
+        installed = [e for e in extension_ids if outcome.get(e)]
+        failed = [e for e in extension_ids if not outcome.get(e)]
+        for extension_id in installed:
+            Logger.success(f"Installed {extension_id}")
+        return installed, failed
+
+    def uninstall_extensions_batch(self, extension_ids: List[str]) -> Tuple[List[str], List[str]]:
+        """Uninstall extensions in batched launches, returning (removed, failed)"""
+        if not extension_ids:
+            return [], []
+        batches = [extension_ids[i:i + self.batch_size] for i in range(0, len(extension_ids), self.batch_size)]
+        Logger.info(f"Uninstalling {len(extension_ids)} extensions in {len(batches)} batches...")
+        with ThreadPoolExecutor(max_workers=self.install_jobs) as executor:
+            list(executor.map(lambda batch: self._extension_command('uninstall', batch), batches))
+        present = {e.lower() for e in self.get_installed_extensions()}
+        removed = [e for e in extension_ids if e.lower() not in present]
+        failed = [e for e in extension_ids if e.lower() in present]
+        for extension_id in removed:
+            Logger.success(f"Uninstalled {extension_id}")
+        return removed, failed
+
+    def sync_extensions(self, prune: bool = False, dry_run: bool = False,
+                        plan: Optional[Dict[str, List[Dict[str, str]]]] = None) -> Dict:
+        """Apply the plan_sync delta, uninstalling extras with prune"""
+        if plan is None:
+            plan = self.plan_sync(self.read_configured_extensions(), self.get_installed_versions())
+        Logger.info(f"{self.editor_name} extension sync: {len(plan['missing'])} missing, {len(plan['version_changed'])} version changes, "
+                    f"{len(plan['extra'])} not configured, {len(plan['in_sync'])} in sync")
+        result = dict(plan, installed=[], removed=[], failed=[])
+        if dry_run:
+            return result
+
+        specs = [self._install_spec(e) for e in plan['missing'] + plan['version_changed']]
+        result['installed'], failed = self.install_extensions_batch(specs)
+        result['failed'].extend(failed)
+        if prune:
+            result['removed'], failed = self.uninstall_extensions_batch([e['id'] for e in plan['extra']])
+            result['failed'].extend(failed)
+        for extension_id in result['failed']:
+            Logger.error(f"Failed to sync {extension_id} ({self.editor_name})")
+        return result
+
+    def backup_extensions(self) -> Optional[Dict]:
+        """Snapshot installed extensions into the backup history; the new entry, or None if unchanged"""
+        Logger.info(f"Creating backup of current {self.editor_name} extensions...")
+        extensions = self.list_extensions(show_versions=True)
+        if extensions is not None:
+            entry = self.snapshots.record(self.editor, extensions)
+            if entry is None:
+                Logger.success("No changes since the last backup; nothing stored")
+            else:
+                Logger.success(f"Backup {entry['sha256'][:12]}: +{len(entry['added'])} -{len(entry['removed'])} "
+                               f"~{len(entry['changed'])} since the last backup")
+            return entry
+        Logger.error("Failed to create backup.")
+        return None
+
+    def diff_extensions(self) -> Optional[Dict]:
+        Logger.info(f"Comparing installed vs configured {self.editor_name} extensions...")
         if not os.path.isfile(self.extensions_file):
             Logger.error("extensions.txt not found.")
-            return
-        temp_current = os.path.join('/tmp', 'vscode-current-extensions.txt')
-        result = self._run_command(['code', '--list-extensions', '--show-versions'])
-        if result.returncode == 0:
-            with open(temp_current, 'w') as f:
-                f.write(result.stdout)
-            import difflib
-            with open(self.extensions_file) as f1, open(temp_current) as f2:
-                diff = list(difflib.unified_diff(f1.readlines(), f2.readlines(), fromfile='extensions.txt', tofile='current'))
-            if not diff:
-                Logger.success("No differences found. Extensions are in sync.")
-            else:
-                Logger.info("Differences:")
-                for line in diff:
-                    print(line, end='')
-            os.remove(temp_current)
-        else:
+            return None
+        installed = self.get_installed_versions()
+        if not installed and self.list_extensions() is None:
             Logger.error("Failed to get current extensions.")
+            return None
+        plan = self.plan_sync(self.read_configured_extensions(), installed)
+        if not (plan['missing'] or plan['extra'] or plan['version_changed']):
+            Logger.success("No differences found. Extensions are in sync.")
+            return plan
+        Logger.info("Differences:")
+        for entry in plan['missing']:
+            print(f"  + {self._install_spec(entry)} (not installed)")
+        for entry in plan['version_changed']:
+            print(f"  ~ {entry['id']} {entry['installed']} -> {entry['configured']}")
+        for entry in plan['extra']:
+            print(f"  - {entry['id']}@{entry['version']} (not in extensions.txt)")
+        return plan
 
     def link_settings(self, hrt_settings: str, user_settings: str) -> None:
         # Removed: Settings linking is handled by the provision script
         Logger.warning("Settings linking should be handled by the provision script, not this utility")
         pass
 
+def resolve_editors(names: str) -> List[str]:
+    """Editor keys from a comma-separated list; 'all' selects every editor whose CLI is on PATH"""
+    if names.strip() == 'all':
+        return [editor for editor, target in EDITOR_TARGETS.items() if shutil.which(target['cli'])]
+    editors = [name.strip() for name in names.split(',') if name.strip()]
+    unknown = [editor for editor in editors if editor not in EDITOR_TARGETS]
+    if unknown:
+        raise ValueError(f"Unknown editors: {', '.join(unknown)} (choose from {', '.join(EDITOR_TARGETS)})")
+    return list(dict.fromkeys(editors))
+
+def run_for_editors(utils: List[VSCodeUtil], action: Callable[[VSCodeUtil], object]) -> Dict[str, object]:
+    """Run an action for several editors concurrently, prefetching pinned packages they need once"""
+    if len(utils) > 1:
+        if not os.path.isfile(utils[0].extensions_file):
+            # Captured from the first editor before fanning out, as a lone --install would
+            Logger.warning("extensions.txt not found. Capturing current extensions first...")
+            utils[0].capture_extensions()
+        if utils[0].vsix_cache and os.path.isfile(utils[0].extensions_file):
+            configured = utils[0].read_configured_extensions()
+            needed = set()
+            for util in utils:
+                plan = util.plan_sync(configured, util.get_installed_versions())
+                needed.update(util._install_spec(e) for e in plan['missing'] + plan['version_changed'])
+            utils[0].cache_vsix(sorted(needed))
+        for util in utils:
+            util.echo_output = False
+    with ThreadPoolExecutor(max_workers=len(utils)) as executor:
+        return dict(zip([util.editor for util in utils], executor.map(action, utils)))
+
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser(description='VS Code Utility for Developer Laboratory Setup')
@@ -156,21 +625,103 @@ if __name__ == '__main__':
     parser.add_argument('--install', action='store_true', help='Install missing extensions from extensions.txt')
     parser.add_argument('--backup', action='store_true', help='Backup current extensions')
     parser.add_argument('--diff', action='store_true', help='Diff installed vs configured extensions')
+    parser.add_argument('--list', action='store_true', help='Print installed extensions with versions')
+    parser.add_argument('--sync', action='store_true',
+                        help='Install missing and re-pin changed extensions from extensions.txt in batched launches')
+    parser.add_argument('--prune', action='store_true', help='With --sync: uninstall extensions not in extensions.txt')
+    parser.add_argument('--dry-run', action='store_true', help='With --sync: only compute the delta')
+    parser.add_argument('--json', action='store_true',
+                        help='With --diff or --sync: print the delta as JSON on stdout (logs go to stderr)')
     parser.add_argument('--link-settings', nargs=2, metavar=('HRT_SETTINGS', 'USER_SETTINGS'), help='Link VSCode settings.json (deprecated - use provision script)')
     parser.add_argument('--extensions-file', default=os.path.expanduser('~/sys/hrt/conf/vscode/extensions.txt'))
-    parser.add_argument('--backup-dir', default=os.path.expanduser('~/sys/hrt/scripts'))
+    parser.add_argument('--backup-dir', default=None,
+                        help='Backup history directory (default: $DEVLAB_EXTENSION_BACKUPS or '
+                             '$XDG_STATE_HOME/devlab/extension-backups; see snapshot_helper.py for queries)')
+    parser.add_argument('--batch-size', type=int, default=VSCodeUtil.DEFAULT_BATCH_SIZE,
+                        help='Extensions installed per code launch')
+    parser.add_argument('--jobs', type=int, default=VSCodeUtil.DEFAULT_INSTALL_JOBS,
+                        help='Concurrent code launches when installing')
+    parser.add_argument('--extensions-dir', default=None,
+                        help='Installed extensions directory of a single editor '
+                             '(default: $VSCODE_EXTENSIONS or ~/.vscode/extensions for code)')
+    parser.add_argument('--editors', default=os.environ.get('DEVLAB_EDITORS', 'code'),
+                        help=f"Comma-separated editors to manage ({', '.join(EDITOR_TARGETS)}) or 'all' for every "
+                             "editor whose CLI is on PATH; --install, --sync, --diff and --list run for each, "
+                             "concurrently (default: $DEVLAB_EDITORS or code)")
+    parser.add_argument('--vsix-cache', metavar='DIR', default=None,
+                        help='VSIX cache directory (default: $DEVLAB_VSIX_CACHE or $XDG_CACHE_HOME/devlab/vsix)')
+    parser.add_argument('--vsix-cache-max', type=parse_size, default=None,
+                        help='VSIX cache size cap such as 2G (default: $DEVLAB_VSIX_CACHE_MAX or 2G)')
+    parser.add_argument('--no-vsix-cache', action='store_true', help='Always install from the marketplace')
+    parser.add_argument('--cache-extensions', action='store_true',
+                        help='Download the pinned extensions of extensions.txt into the VSIX cache without installing')
+    parser.add_argument('--export-cache', metavar='DIR', help='Copy the VSIX cache to a shared folder')
+    parser.add_argument('--import-cache', metavar='DIR', help='Copy packages from a shared folder into the VSIX cache')
     args = parser.parse_args()
-    util = VSCodeUtil(args.extensions_file, args.backup_dir)
-    if not util.check_vscode_cli():
+    vsix_cache = None
+    if not args.no_vsix_cache:
+        vsix_cache_max = args.vsix_cache_max or parse_size(
+            os.environ.get('DEVLAB_VSIX_CACHE_MAX') or VSCodeUtil.DEFAULT_VSIX_CACHE_MAX)
+        vsix_cache = ArtifactStore(args.vsix_cache or default_vsix_cache_dir(), vsix_cache_max)
+    try:
+        editors = resolve_editors(args.editors)
+    except ValueError as e:
+        parser.error(str(e))
+    if not editors:
+        Logger.error(f"None of the editor CLIs ({', '.join(t['cli'] for t in EDITOR_TARGETS.values())}) is on PATH.")
         sys.exit(1)
+    if len(editors) > 1 and args.extensions_dir:
+        parser.error('--extensions-dir applies to a single editor')
+    utils = [VSCodeUtil(args.extensions_file, args.backup_dir, args.batch_size, args.jobs, args.extensions_dir,
+                        vsix_cache, editor) for editor in editors]
+    # Capture, backup and settings linking work on the first editor
+    util = utils[0]
+    if vsix_cache and args.import_cache:
+        Logger.success(f"Imported {vsix_cache.import_from(args.import_cache)} packages from {args.import_cache}")
+    if vsix_cache and args.cache_extensions:
+        pinned = [f"{i}@{v}" for i, v in util.read_configured_extensions().items() if v]
+        Logger.success(f"VSIX cache holds {len(util.cache_vsix(pinned))} of {len(pinned)} pinned extensions")
+    if vsix_cache and args.export_cache:
+        Logger.success(f"Exported {vsix_cache.export_to(args.export_cache)} packages to {args.export_cache}")
+    if not (args.capture or args.install or args.backup or args.diff or args.list or args.sync or args.link_settings):
+        sys.exit(0)
+    # Listing works from the extensions directory alone; the CLI is needed to install or as a fallback
+    for editor_util in utils:
+        needs_cli = args.install or (args.sync and not args.dry_run) or editor_util.read_installed_from_disk() is None
+        if needs_cli and not editor_util.check_vscode_cli():
+            sys.exit(1)
+    if args.sync or (args.diff and args.json):
+        import contextlib
+        with contextlib.redirect_stdout(sys.stderr if args.json else sys.stdout):
+            if args.sync:
+                deltas = run_for_editors(utils, lambda u: u.sync_extensions(args.prune, args.dry_run))
+            else:
+                deltas = {u.editor: u.diff_extensions() for u in utils}
+        if args.json:
+            # A single editor keeps the flat layout; several are keyed by editor
+            print(json.dumps(deltas if len(utils) > 1 else deltas[util.editor], indent=2))
+        elif args.sync and len(utils) > 1:
+            for editor, delta in deltas.items():
+                Logger.info(f"{EDITOR_TARGETS[editor]['name']}: Installed={len(delta['installed'])}, "
+                            f"Removed={len(delta['removed'])}, Errors={len(delta['failed'])}")
+        sys.exit(1 if any(d is None or d.get('failed') for d in deltas.values()) else 0)
+    if args.list:
+        for editor_util in utils:
+            for line in editor_util.list_extensions(show_versions=True) or []:
+                print(f"{editor_util.editor}\t{line}" if len(utils) > 1 else line)
     if args.capture:
         util.capture_extensions()
     if args.install:
-        util.install_missing_extensions()
+        results = run_for_editors(utils, lambda u: u.install_missing_extensions())
+        if len(utils) > 1:
+            for editor, (installed, skipped, errors) in results.items():
+                Logger.info(f"{EDITOR_TARGETS[editor]['name']}: Installed={installed}, Skipped={skipped}, Errors={errors}")
     if args.backup:
-        util.backup_extensions()
+        for editor_util in utils:
+            editor_util.backup_extensions()
     if args.diff:
-        util.diff_extensions()
+        for editor_util in utils:
+            editor_util.diff_extensions()
     if args.link_settings:
         Logger.warning("Settings linking is deprecated in this utility - use provision script instead")
         util.link_settings(args.link_settings[0], args.link_settings[1])
@@ -0,0 +1,6 @@
+"""Make the helper modules in scripts/util importable by their bare names, as they import each other"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'util'))
@@ -0,0 +1,71 @@
+"""Content-addressed ArtifactStore: digest checks, LRU eviction and export/import"""
+
+import hashlib
+import itertools
+
+import pytest
+
+import artifact_helper
+from artifact_helper import ArtifactStore, parse_size
+
+
+@pytest.fixture(autouse=True)
+def ticking_clock(monkeypatch):
+    """Every call to time.time() is one second later, so LRU order never depends on clock resolution"""
+    clock = itertools.count(1_700_000_000)
+    monkeypatch.setattr(artifact_helper.time, 'time', lambda: next(clock))
+
+
+def artifact(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(name.encode()[:1] * size)
+    return str(path)
+
+
+def test_put_verifies_the_expected_digest(tmp_path):
+    store = ArtifactStore(str(tmp_path / 'store'))
+    path = artifact(tmp_path, 'git.bottle', 100)
+    assert store.put(path, sha256='0' * 64) is None
+    digest = hashlib.sha256(b'g' * 100).hexdigest()
+    assert store.put(path, sha256=digest.upper()) == digest
+    assert store.get(digest, str(tmp_path / 'out' / 'git.bottle'))
+    assert (tmp_path / 'out' / 'git.bottle').read_bytes() == b'g' * 100
+
+
+def test_least_recently_used_objects_are_evicted_first(tmp_path):
+    store = ArtifactStore(str(tmp_path / 'store'), max_bytes=250)
+    a = store.put(artifact(tmp_path, 'a', 100))
+    b = store.put(artifact(tmp_path, 'b', 100))
+    # Using a makes b the least recently used object
+    assert store.get(a, str(tmp_path / 'a.out'))
+    c = store.put(artifact(tmp_path, 'c', 100))
+
+    assert store.has(a) and store.has(c)
+    assert not store.has(b)
+    assert store.stats()['bytes'] == 200
+
+
+def test_new_object_is_never_evicted_and_oversized_files_are_refused(tmp_path):
+    store = ArtifactStore(str(tmp_path / 'store'), max_bytes=150)
+    a = store.put(artifact(tmp_path, 'a', 100))
+    b = store.put(artifact(tmp_path, 'b', 120))
+    assert store.has(b) and not store.has(a)
+    assert store.put(artifact(tmp_path, 'c', 151)) is None
+    assert store.has(b)
+
+
+def test_export_and_import_keep_lookup_keys(tmp_path):
+    store = ArtifactStore(str(tmp_path / 'store'))
+    digest = store.put(artifact(tmp_path, 'x.vsix', 10), key='pub.x@1.0.0')
+    assert store.export_to(str(tmp_path / 'usb')) == 1
+    assert store.export_to(str(tmp_path / 'usb')) == 0
+
+    other = ArtifactStore(str(tmp_path / 'other'))
+    assert other.import_from(str(tmp_path / 'usb')) == 1
+    assert other.lookup('pub.x@1.0.0') == digest
+
+
+@pytest.mark.parametrize('value, expected', [('1048576', 1048576), ('512M', 512 * 1024 ** 2),
+                                             ('20G', 20 * 1024 ** 3), ('1.5k', 1536), ('2GB', 2 * 1024 ** 3)])
+def test_parse_size(value, expected):
+    assert parse_size(value) == expected
@@ -0,0 +1,13 @@
+"""Smoke test of the brew_bench harness against its simulated brew"""
+
+import argparse
+
+import brew_bench
+
+
+def test_formula_batch_makes_one_info_and_one_install_call():
+    args = argparse.Namespace(installed_ratio=0.5, prefetch_jobs=0, latency='', fail_rate=0.0, verbose=False)
+    result = brew_bench.run_scenario('formulas', 10, args)
+    assert result['by_command'] == {'info': 1, 'install': 1}
+    assert result['successful'] == 10
+    assert result['failed'] == 0
@@ -0,0 +1,78 @@
+"""Batch install stages of BrewUtil: concurrent prefetch and failure isolation, against a synthetic prefix"""
+
+import subprocess
+import threading
+import time
+
+from brew_helper import BrewUtil
+
+
+def brew_util(tmp_path, **kwargs):
+    return BrewUtil(prefix=str(tmp_path / 'prefix'), cache_file=str(tmp_path / 'brew-installed.json'), **kwargs)
+
+
+def test_prefetch_overlaps_downloads_and_reports_failures(tmp_path):
+    util = brew_util(tmp_path, prefetch_jobs=3)
+    commands, active, peak = [], [0], [0]
+    lock = threading.Lock()
+
+    def fetch(command, echo=True):
+        with lock:
+            commands.append(command)
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return subprocess.CompletedProcess(command, 1 if command[-1] == 'broken' else 0, '', '')
+
+    util._stream_command = fetch
+    failed = util.prefetch_packages(['wget', 'jq', 'broken'], ['firefox'])
+    assert failed == ['broken']
+    assert sorted(commands) == [['brew', 'fetch', '--cask', 'firefox'], ['brew', 'fetch', '--deps', 'broken'],
+                                ['brew', 'fetch', '--deps', 'jq'], ['brew', 'fetch', '--deps', 'wget']]
+    assert 1 < peak[0] <= 3
+    assert util.prefetch_packages([], []) == []
+
+
+def scripted_install(tmp_path, broken, stderr, lands_before_failing=()):
+    """BrewUtil whose `brew install` fails any batch holding a broken package, recording each batch"""
+    util = brew_util(tmp_path)
+    util.batches = []
+
+    def install(command):
+        names = command[2:]
+        util.batches.append(names)
+        failed = bool(set(names) & set(broken))
+        for name in names:
+            if not failed or name in lands_before_failing:
+                (tmp_path / 'prefix' / 'Cellar' / name / '1.0').mkdir(parents=True, exist_ok=True)
+        return subprocess.CompletedProcess(command, int(failed), '', stderr if failed else '')
+
+    util._run_install_command = install
+    return util
+
+
+def test_failures_brew_names_are_dropped_and_the_rest_retried_once(tmp_path):
+    util = scripted_install(tmp_path, broken={'nosuch'}, lands_before_failing={'aaa'},
+                            stderr='Error: No available formula with the name "nosuch".\n')
+    successful, failed = util._install_isolating_failures(['aaa', 'nosuch', 'wget', 'jq'])
+    assert sorted(successful) == ['aaa', 'jq', 'wget'] and failed == ['nosuch']
+    # What landed before the failure is not installed again
+    assert util.batches == [['aaa', 'nosuch', 'wget', 'jq'], ['wget', 'jq']]
+
+
+def test_unattributed_failure_is_bisected(tmp_path):
+    packages = ['p0', 'p1', 'p2', 'p3', 'p4', 'p5', 'bad', 'p7']
+    util = scripted_install(tmp_path, broken={'bad'}, stderr='Error: An exception occurred within a child process.\n')
+    successful, failed = util._install_isolating_failures(packages)
+    assert sorted(successful) == sorted(set(packages) - {'bad'}) and failed == ['bad']
+    # 1 + 2 + 2 + 2 launches instead of one per package
+    assert len(util.batches) == 7
+    assert ['bad'] in util.batches
+
+
+def test_single_failing_package_is_not_retried(tmp_path):
+    util = scripted_install(tmp_path, broken={'bad'}, stderr='')
+    assert util._install_isolating_failures(['bad']) == ([], ['bad'])
+    assert util.batches == [['bad']]
@@ -0,0 +1,96 @@
+"""Dependency planning of BrewUtil installs and uninstalls against a scripted brew and synthetic prefix"""
+
+import json
+import os
+import subprocess
+
+from brew_helper import BrewUtil
+
+DEPENDENCIES = {
+    'graphviz': ['gts', 'librsvg', 'pango'],
+    'librsvg': ['pango', 'cairo'],
+    'pango': ['cairo', 'glib'],
+    'cairo': ['glib'],
+    'gts': ['glib'],
+}
+
+
+def scripted_brew(tmp_path, installed=()):
+    """BrewUtil over a synthetic prefix whose brew queries are answered from DEPENDENCIES"""
+    for name in installed:
+        os.makedirs(tmp_path / 'prefix' / 'Cellar' / name / '1.0')
+    util = BrewUtil(prefix=str(tmp_path / 'prefix'), cache_file=str(tmp_path / 'brew-installed.json'))
+    util.calls = []
+
+    def run(command, capture_output=True):
+        util.calls.append(command[1])
+        names = [arg for arg in command[2:] if not arg.startswith('-')]
+        if command[1] == 'deps':
+            closure, todo = set(), list(names)
+            while todo:
+                for dep in DEPENDENCIES.get(todo.pop(), []):
+                    if dep not in closure:
+                        closure.add(dep)
+                        todo.append(dep)
+            return subprocess.CompletedProcess(command, 0, '\n'.join(sorted(closure)), '')
+        formulae = [{'name': n, 'full_name': n, 'dependencies': DEPENDENCIES.get(n, [])} for n in names]
+        return subprocess.CompletedProcess(command, 0, json.dumps({'formulae': formulae, 'casks': []}), '')
+
+    util._run_command = run
+    return util
+
+
+def test_install_plan_snapshots_the_dependency_closure_once(tmp_path):
+    util = scripted_brew(tmp_path, installed=['glib'])
+    plan = util.plan_formula_install(['graphviz', 'ripgrep'])
+
+    # The requested formulas, the closure and its missing members: three calls however deep the graph
+    assert util.calls == ['info', 'deps', 'info']
+    assert plan['waves'] == [['cairo', 'gts', 'ripgrep'], ['pango'], ['librsvg'], ['graphviz']]
+    assert plan['order'] == ['ripgrep', 'graphviz']
+    assert plan['dependencies'] == ['cairo', 'gts', 'librsvg', 'pango']
+
+
+def test_install_plan_without_missing_dependencies_makes_one_call(tmp_path):
+    util = scripted_brew(tmp_path, installed=['glib'])
+    plan = util.plan_formula_install(['cairo', 'gts'])
+    assert util.calls == ['info']
+    assert plan['waves'] == [['cairo', 'gts']]
+
+
+def install_with_receipt(tmp_path, name, runtime_dependencies=()):
+    keg = tmp_path / 'prefix' / 'Cellar' / name / '1.0'
+    os.makedirs(keg)
+    receipt = {'runtime_dependencies': [{'full_name': dep, 'version': '1.0'} for dep in runtime_dependencies]}
+    (keg / 'INSTALL_RECEIPT.json').write_text(json.dumps(receipt))
+
+
+def test_uninstall_plan_keeps_formulas_other_installed_formulas_need(tmp_path):
+    install_with_receipt(tmp_path, 'graphviz', ['pango', 'cairo', 'glib'])
+    install_with_receipt(tmp_path, 'pango', ['cairo', 'glib'])
+    install_with_receipt(tmp_path, 'cairo', ['glib'])
+    install_with_receipt(tmp_path, 'glib')
+    install_with_receipt(tmp_path, 'wget', ['openssl@3'])
+    install_with_receipt(tmp_path, 'python@3.12', ['openssl@3'])
+    install_with_receipt(tmp_path, 'openssl@3')
+    util = scripted_brew(tmp_path)
+
+    plan = util.plan_formula_uninstall(['pango', 'cairo', 'glib', 'wget', 'openssl@3', 'jq'])
+    assert plan['remove'] == ['wget']
+    # Blockers propagate: cairo stays because pango stays, which graphviz needs
+    assert plan['kept'] == {'pango': ['graphviz'], 'cairo': ['graphviz', 'pango'],
+                            'glib': ['cairo', 'graphviz', 'pango'], 'openssl@3': ['python@3.12']}
+    assert plan['not_installed'] == ['jq']
+    # The reverse-dependency index comes from the install receipts alone
+    assert util.calls == []
+
+
+def test_uninstall_plan_removes_a_whole_dependency_chain_together(tmp_path):
+    install_with_receipt(tmp_path, 'graphviz', ['pango', 'cairo'])
+    install_with_receipt(tmp_path, 'pango', ['cairo'])
+    install_with_receipt(tmp_path, 'cairo')
+    util = scripted_brew(tmp_path)
+
+    plan = util.plan_formula_uninstall(['cairo', 'pango', 'graphviz'])
+    assert sorted(plan['remove']) == ['cairo', 'graphviz', 'pango']
+    assert plan['kept'] == {}
@@ -0,0 +1,101 @@
+"""Installed-state scanning and caching of BrewUtil against a synthetic Homebrew prefix"""
+
+import os
+
+from brew_helper import BrewUtil
+
+
+def make_keg(prefix, name, version, link=True):
+    keg = os.path.join(prefix, 'Cellar', name, version)
+    os.makedirs(keg)
+    if link:
+        opt = os.path.join(prefix, 'opt', name)
+        os.makedirs(os.path.dirname(opt), exist_ok=True)
+        if os.path.islink(opt):
+            os.remove(opt)
+        os.symlink(os.path.join('..', 'Cellar', name, version), opt)
+    return keg
+
+
+def age_tree(prefix, seconds=3600):
+    """Push every mtime into the past so a later change is always newer, whatever the clock resolution"""
+    for root, dirs, _ in os.walk(prefix):
+        for path in [root] + [os.path.join(root, d) for d in dirs]:
+            stat = os.lstat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - seconds * 10 ** 9), follow_symlinks=False)
+
+
+def brew(prefix, tmp_path):
+    return BrewUtil(prefix=str(prefix), cache_file=str(tmp_path / 'brew-installed.json'))
+
+
+def test_scan_reads_racks_versions_and_links(tmp_path):
+    prefix = tmp_path / 'prefix'
+    make_keg(str(prefix), 'git', '2.45.0')
+    make_keg(str(prefix), 'python@3.12', '3.12.3')
+    make_keg(str(prefix), 'python@3.12', '3.12.10')
+    make_keg(str(prefix), 'openssl@3', '3.3.0', link=False)
+
+    util = brew(prefix, tmp_path)
+    assert util.is_formula_installed('git')
+    assert not util.is_formula_installed('wget')
+    details = util.get_formula_details('python@3.12')
+    assert details['versions'] == ['3.12.3', '3.12.10']
+    assert details['linked_version'] == '3.12.10'
+    assert util.get_formula_details('openssl@3')['linked_version'] is None
+
+
+def test_aliases_and_oldnames_resolve_to_the_installed_rack(tmp_path):
+    prefix = tmp_path / 'prefix'
+    make_keg(str(prefix), 'python@3.12', '3.12.3')
+    os.symlink(os.path.join('..', 'Cellar', 'python@3.12', '3.12.3'), prefix / 'opt' / 'python3')
+    make_keg(str(prefix), 'podman', '5.0.0')
+    os.symlink('podman', prefix / 'Cellar' / 'podman-old')
+
+    util = brew(prefix, tmp_path)
+    assert util.resolve_formula_name('python3') == 'python@3.12'
+    assert util.resolve_formula_name('podman-old') == 'podman'
+    assert util.resolve_formula_name('homebrew/core/python3') == 'python@3.12'
+    assert util.is_formula_installed('python3')
+    assert 'podman-old' not in util._installed_formulas
+
+    # The alias index survives in the cache for processes that hit the cached state
+    assert brew(prefix, tmp_path).resolve_formula_name('python3') == 'python@3.12'
+
+
+def test_upgrade_inside_existing_rack_invalidates_cached_versions(tmp_path):
+    prefix = tmp_path / 'prefix'
+    make_keg(str(prefix), 'git', '2.45.0')
+    make_keg(str(prefix), 'jq', '1.7')
+    age_tree(str(prefix))
+    assert brew(prefix, tmp_path).get_formula_details('git')['linked_version'] == '2.45.0'
+
+    # `brew upgrade git` only adds a keg to the existing rack and relinks opt/git
+    cellar_mtime = os.stat(prefix / 'Cellar').st_mtime_ns
+    make_keg(str(prefix), 'git', '2.46.0')
+    assert os.stat(prefix / 'Cellar').st_mtime_ns == cellar_mtime
+
+    details = brew(prefix, tmp_path).get_formula_details('git')
+    assert details['versions'] == ['2.45.0', '2.46.0']
+    assert details['linked_version'] == '2.46.0'
+
+
+def test_unchanged_prefix_is_served_from_the_cache(tmp_path):
+    prefix = tmp_path / 'prefix'
+    make_keg(str(prefix), 'git', '2.45.0')
+    age_tree(str(prefix))
+    brew(prefix, tmp_path).is_formula_installed('git')
+
+    util = brew(prefix, tmp_path)
+    util._scan_cellar = lambda: (_ for _ in ()).throw(AssertionError('cache miss'))
+    assert util.is_formula_installed('git')
+
+
+def test_cask_upgrade_inside_existing_entry_invalidates_cached_versions(tmp_path):
+    prefix = tmp_path / 'prefix'
+    os.makedirs(prefix / 'Caskroom' / 'iterm2' / '3.5.0')
+    age_tree(str(prefix))
+    assert brew(prefix, tmp_path).get_cask_details('iterm2')['versions'] == ['3.5.0']
+
+    os.makedirs(prefix / 'Caskroom' / 'iterm2' / '3.5.2')
+    assert brew(prefix, tmp_path).get_cask_details('iterm2')['versions'] == ['3.5.0', '3.5.2']
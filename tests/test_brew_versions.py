@@ -0,0 +1,45 @@
+"""Version parsing and update classification behind brew_helper --upgrade-selective"""
+
+import pytest
+
+from brew_helper import BrewUtil
+
+
+@pytest.mark.parametrize('version, expected', [
+    ('1.2.3', ((1, 2, 3), 0)),
+    ('1.2.3_1', ((1, 2, 3), 1)),
+    ('v2.0', ((2, 0), 0)),
+    ('4.5,1234', ((4, 5), 0)),
+    ('0.141.2,def', ((0, 141, 2), 0)),
+    ('3.0.0-beta1', ((3, 0, 0), 0)),
+    ('2024-01-15', ((2024, 1, 15), 0)),
+    ('1.2a', ((1, 2), 0)),
+    ('HEAD-1a2b3c4', (None, 0)),
+    ('HEAD-1a2b3c4_2', (None, 2)),
+    ('latest', (None, 0)),
+    (' 13.0.0_2 ', ((13, 0, 0), 2)),
+])
+def test_parse_version(version, expected):
+    assert BrewUtil._parse_version(version) == expected
+
+
+@pytest.mark.parametrize('current, latest, expected', [
+    ('18.17.0', '20.5.0', 'major'),
+    ('3.11.4', '3.12.0', 'minor'),
+    ('2.41.0', '2.41.1', 'patch'),
+    ('1.2.3', '1.2.3_1', 'revision'),
+    ('13.0.0_1', '13.0.0_2', 'revision'),
+    # Missing components count as zero
+    ('1.2', '1.2.1', 'patch'),
+    ('1', '1.1', 'minor'),
+    # Cask build suffixes are not part of the release
+    ('0.140.5,abc', '0.141.2,def', 'minor'),
+    ('4.5,1234', '4.5,1300', 'other'),
+    ('3.0.0-beta1', '3.0.0', 'other'),
+    ('HEAD-1a2b3c4', 'HEAD-5d6e7f8', 'other'),
+    ('HEAD-1a2b3c4', '1.0.0', 'other'),
+    ('latest', 'latest', 'other'),
+    ('1.2.3', '1.2.3', 'other'),
+])
+def test_classify_version_change(current, latest, expected):
+    assert BrewUtil.classify_version_change(current, latest) == expected
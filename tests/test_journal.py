@@ -0,0 +1,43 @@
+"""Recording, forgetting and verifying completed steps in the provisioning journal"""
+
+from journal_helper import Journal, step_key
+
+
+def test_forget_invalidates_only_keys_with_the_prefix(tmp_path):
+    journal = Journal(str(tmp_path / 'journal.jsonl'))
+    for key in ('brew install git', 'brew install --cask zed', 'ollama pull llama3.2:3b'):
+        journal.record(key)
+
+    assert journal.forget('brew install') == ['brew install --cask zed', 'brew install git']
+    assert not journal.is_done('brew install git')
+    assert journal.is_done('ollama pull llama3.2:3b')
+    # A fresh reader replays the same file to the same state
+    assert not Journal(journal.path).is_done('brew install --cask zed')
+    # Forgotten steps are not forgotten twice, and can be completed again
+    assert journal.forget('brew') == []
+    journal.record('brew install git')
+    assert journal.is_done('brew install git')
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    journal = Journal(str(tmp_path / 'journal.jsonl'))
+    journal.record('uv python install 3.13')
+    with open(journal.path, 'a') as f:
+        f.write('{"key": "ollama pull')
+    assert journal.is_done('uv python install 3.13')
+
+
+def test_verify_mode_trusts_nothing(tmp_path, monkeypatch):
+    journal = Journal(str(tmp_path / 'journal.jsonl'))
+    journal.record('brew install git')
+    monkeypatch.setenv('DEVLAB_JOURNAL_VERIFY', '1')
+    assert not journal.is_done('brew install git')
+    monkeypatch.setenv('DEVLAB_JOURNAL_VERIFY', '0')
+    assert journal.is_done('brew install git')
+
+
+def test_step_key_matches_the_keys_the_provisioner_writes():
+    # provision-devlab.sh records the same space-separated keys with journal_record
+    assert step_key('ollama pull', 'llama3.2:3b') == 'ollama pull llama3.2:3b'
+    assert step_key('brew install-manifest', '--phases', 3, '--mtime', 1718000000) == \
+        'brew install-manifest --phases 3 --mtime 1718000000'
@@ -0,0 +1,55 @@
+"""Phase timing history: ingesting run buffers and flagging regressions against earlier runs"""
+
+from timing_helper import PhaseHistory
+
+
+def record_run(history, tmp_path, run_id, started, durations, status='success'):
+    """Ingest one run whose phases take the given {phase: seconds}, one after another"""
+    buffer = tmp_path / f"{run_id}.tsv"
+    lines, clock = [], started
+    for phase, seconds in durations.items():
+        lines.append(f"phase\t{phase}\tPhase {phase}\t{clock}\t{clock + seconds}\t0")
+        clock += seconds
+    lines.append(f"summary\tall\tSummary\t{started}\t{clock}\t0")
+    lines.append("not a phase line")
+    buffer.write_text('\n'.join(lines) + '\n')
+    return history.ingest(str(buffer), run_id, status, manifest_path=str(tmp_path / 'missing.toml'))
+
+
+def test_compare_flags_only_meaningful_slowdowns(tmp_path):
+    history = PhaseHistory(str(tmp_path / 'history.db'))
+    for i, phase3 in enumerate([100, 110, 90, 105, 95]):
+        assert record_run(history, tmp_path, f"run{i}", 1000 * i, {'3': phase3, '4': 10}) == 3
+    record_run(history, tmp_path, 'latest', 10000, {'3': 130, '4': 14, '5': 7})
+
+    report = history.compare()
+    assert report['run']['run_id'] == 'latest'
+    assert report['baseline_runs'] == 5
+    rows = {row['phase']: row for row in report['rows']}
+    assert set(rows) == {'3', '4', '5'}
+    # 30s over a 100s median: 30% slower and above the 5s floor
+    assert rows['3']['baseline'] == 100 and rows['3']['delta'] == 30 and rows['3']['regressed']
+    # 40% slower, but only by 4s
+    assert rows['4']['baseline'] == 10 and not rows['4']['regressed']
+    # No earlier run to compare a new phase with
+    assert rows['5']['baseline'] is None and not rows['5']['regressed']
+
+
+def test_compare_an_earlier_run_uses_only_runs_before_it(tmp_path):
+    history = PhaseHistory(str(tmp_path / 'history.db'))
+    record_run(history, tmp_path, 'first', 0, {'3': 100})
+    record_run(history, tmp_path, 'second', 1000, {'3': 200})
+    record_run(history, tmp_path, 'third', 2000, {'3': 100})
+
+    report = history.compare('second', threshold=0.5)
+    assert report['baseline_runs'] == 1
+    assert report['rows'][0]['baseline'] == 100 and report['rows'][0]['regressed']
+    assert PhaseHistory(str(tmp_path / 'empty.db')).compare() is None
+
+
+def test_reingesting_a_run_replaces_its_phases(tmp_path):
+    history = PhaseHistory(str(tmp_path / 'history.db'))
+    record_run(history, tmp_path, 'run', 0, {'3': 100, '4': 10})
+    record_run(history, tmp_path, 'run', 0, {'3': 90}, status='interrupted')
+    assert [r['status'] for r in history.runs()] == ['interrupted']
+    assert [(p['phase'], p['duration']) for p in history.phases(kind='phase')] == [('3', 90)]
@@ -0,0 +1,69 @@
+"""Deduplicated inventory snapshots, their delta log and retention"""
+
+from snapshot_helper import SnapshotHistory
+
+
+def test_identical_snapshots_are_recorded_once(tmp_path):
+    history = SnapshotHistory(str(tmp_path))
+    first = history.record('code', ['ms-python.python@2024.8.0', 'GitHub.copilot@1.200.0'], ts=100)
+    assert first['added'] == ['ms-python.python@2024.8.0', 'GitHub.copilot@1.200.0'] and first['count'] == 2
+    # Order, blanks and comments do not change the snapshot
+    assert history.record('code', ['# backup', 'GitHub.copilot@1.200.0', '', 'ms-python.python@2024.8.0'], ts=200) is None
+    # Another stream has its own history but shares the stored contents
+    assert history.record('cursor', ['GitHub.copilot@1.200.0', 'ms-python.python@2024.8.0'], ts=300)
+    assert len(history.entries('code')) == 1
+    assert len(list((tmp_path / 'snapshots').iterdir())) == 1
+
+
+def test_deltas_against_the_previous_snapshot(tmp_path):
+    history = SnapshotHistory(str(tmp_path))
+    history.record('code', ['a.one@1.0.0', 'b.two@2.0.0', 'c.three'], ts=100)
+    entry = history.record('code', ['A.One@1.1.0', 'c.three', 'd.four@4.0.0'], ts=200)
+    assert entry['added'] == ['d.four@4.0.0']
+    assert entry['removed'] == ['b.two@2.0.0']
+    # Ids compare case-insensitively, so a re-cased id with a new version is a change
+    assert entry['changed'] == [['A.One', '1.0.0', '1.1.0']]
+
+
+def test_events_for_an_item_survive_pruning(tmp_path):
+    history = SnapshotHistory(str(tmp_path), keep=1)
+    history.record('code', ['a.one@1.0.0'], ts=100)
+    history.record('code', ['a.one@1.0.0', 'b.two@2.0.0'], ts=200)
+    history.record('code', ['b.two@2.1.0'], ts=300)
+    history.record('code', ['b.two@2.1.0', 'c.three@3.0.0'], ts=400)
+
+    assert history.events_for('B.TWO') == [
+        {'stream': 'code', 'ts': 200, 'event': 'added', 'version': '2.0.0'},
+        {'stream': 'code', 'ts': 300, 'event': 'changed', 'from': '2.0.0', 'to': '2.1.0'},
+    ]
+    assert [e['event'] for e in history.events_for('a.one')] == ['added', 'removed']
+    entries = history.entries('code')
+    assert history.read_snapshot(entries[-1]['sha256']) == ['b.two@2.1.0', 'c.three@3.0.0']
+    assert all(history.read_snapshot(e['sha256']) is None for e in entries[:-1])
+    assert history.resolve(entries[0]['sha256'][:8]) == entries[0]['sha256']
+
+
+def test_deltas_are_replayed_when_the_previous_snapshot_was_pruned(tmp_path):
+    history = SnapshotHistory(str(tmp_path), keep=1)
+    history.record('code', ['a.one@1.0.0', 'b.two@2.0.0'], ts=100)
+    history.record('cursor', ['x.y@1.0.0'], ts=150)
+    history.record('code', ['a.one@1.0.0'], ts=200)
+    (tmp_path / 'snapshots' / f"{history.entries('code')[-1]['sha256']}.txt").unlink()
+
+    entry = history.record('code', ['a.one@1.0.1'], ts=300)
+    assert entry['changed'] == [['a.one', '1.0.0', '1.0.1']] and not entry['added'] and not entry['removed']
+
+
+def test_import_backups_replays_legacy_files_oldest_first(tmp_path):
+    backups = tmp_path / 'backups'
+    backups.mkdir()
+    (backups / 'extensions-backup-20240102-090000.txt').write_text('a.one@1.1.0\n')
+    (backups / 'extensions-backup-20240101-090000.txt').write_text('a.one@1.0.0\n')
+    (backups / 'extensions-backup-20240103-090000.txt').write_text('a.one@1.1.0\n')
+    (backups / 'notes.txt').write_text('ignored\n')
+
+    history = SnapshotHistory(str(tmp_path / 'history'))
+    assert history.import_backups(str(backups), 'code') == 2
+    assert [e['event'] for e in history.events_for('a.one')] == ['added', 'changed']
+    first, second = history.entries('code')
+    assert first['ts'] < second['ts']
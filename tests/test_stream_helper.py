@@ -0,0 +1,59 @@
+"""Streaming subprocess output: inactivity timeout, bounded tails and event parsing"""
+
+import subprocess
+import sys
+import time
+
+import pytest
+
+from stream_helper import BREW_EVENT_PATTERNS, run_streaming
+
+
+def python(code):
+    return [sys.executable, '-c', code]
+
+
+def test_slow_but_chatty_command_outlives_the_inactivity_timeout():
+    # 1.2s of wall time, but never more than 0.2s of silence
+    result = run_streaming(python('import time\nfor i in range(6):\n    print(i, flush=True)\n    time.sleep(0.2)'),
+                           echo=False, inactivity_timeout=0.6)
+    assert result.returncode == 0
+    assert result.stdout_tail == ['0', '1', '2', '3', '4', '5']
+
+
+def test_silent_command_is_killed_with_its_output_so_far():
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired) as error:
+        run_streaming(python('import time\nprint("started", flush=True)\ntime.sleep(30)'),
+                      echo=False, inactivity_timeout=0.3)
+    assert time.monotonic() - start < 10
+    assert error.value.output == 'started'
+
+
+def test_tails_keep_only_the_last_lines_per_stream():
+    result = run_streaming(python('import sys\nfor i in range(1000):\n    print(i)\n'
+                                  'print("boom", file=sys.stderr)\nsys.exit(3)'),
+                           echo=False, tail_lines=5)
+    assert result.returncode == 3
+    assert result.stdout_tail == ['995', '996', '997', '998', '999']
+    assert result.stderr_tail == ['boom']
+    assert result.output_bytes == sum(len(f"{i}\n") for i in range(1000)) + len('boom\n')
+
+
+def test_brew_progress_becomes_events_but_stays_out_of_the_tail():
+    seen = []
+    script = ('import sys\n'
+              'print("==> Downloading https://ghcr.io/v2/homebrew/core/git/blobs/sha256:abc")\n'
+              'sys.stdout.write("###  10.0%\\r#####  55.5%\\r######## 100.0%\\n")\n'
+              'print("==> Pouring git--2.45.0.arm64_sonoma.bottle.tar.gz")\n'
+              'print("Error: wget: failed to download", file=sys.stderr)')
+    result = run_streaming(python(script), echo=False, patterns=BREW_EVENT_PATTERNS, on_event=seen.append)
+
+    # stderr may be read before stdout, so only stdout's events have a fixed order
+    assert [e['event'] for e in result.events if e['event'] != 'error'] == \
+        ['download', 'progress', 'progress', 'progress', 'pour']
+    assert [e['percent'] for e in result.events_of('progress')] == ['10.0', '55.5', '100.0']
+    assert result.events_of('pour')[0] == {'event': 'pour', 'package': 'git', 'version': '2.45.0'}
+    assert result.events_of('error')[0]['message'] == 'wget: failed to download'
+    assert seen == result.events
+    assert not any('%' in line for line in result.stdout_tail)
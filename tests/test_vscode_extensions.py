@@ -0,0 +1,163 @@
+"""VS Code extension inventory, sync planning and VSIX caching against synthetic directories"""
+
+import json
+import zipfile
+
+from artifact_helper import ArtifactStore
+from vscode_helper import VSCodeUtil, run_for_editors
+
+
+def make_extension(extensions_dir, publisher, name, version):
+    folder = f"{publisher.lower()}.{name.lower()}-{version}"
+    (extensions_dir / folder).mkdir(parents=True)
+    (extensions_dir / folder / 'package.json').write_text(
+        json.dumps({'publisher': publisher, 'name': name, 'version': version}))
+    return folder
+
+
+def vscode(tmp_path, extensions_dir):
+    return VSCodeUtil(str(tmp_path / 'extensions.txt'), backup_dir=str(tmp_path / 'backups'),
+                      extensions_dir=str(extensions_dir))
+
+
+def test_index_skips_obsolete_and_keeps_the_highest_version(tmp_path):
+    extensions_dir = tmp_path / 'extensions'
+    index = []
+    for publisher, name, version in [('ms-python', 'python', '2024.8.0'), ('ms-python', 'python', '2024.10.1'),
+                                     ('GitHub', 'copilot', '1.200.0'), ('esbenp', 'prettier-vscode', '10.4.0')]:
+        folder = make_extension(extensions_dir, publisher, name, version)
+        index.append({'identifier': {'id': f"{publisher}.{name}".lower()}, 'version': version,
+                      'relativeLocation': folder})
+    (extensions_dir / 'extensions.json').write_text(json.dumps(index))
+    # Uninstalled but not yet cleaned up
+    (extensions_dir / '.obsolete').write_text(json.dumps({'esbenp.prettier-vscode-10.4.0': True}))
+
+    installed = vscode(tmp_path, extensions_dir).read_installed_from_disk()
+    # Ids keep the package.json casing the CLI prints; 2024.10.1 beats 2024.8.0 numerically
+    assert installed == {'ms-python.python': '2024.10.1', 'GitHub.copilot': '1.200.0'}
+
+
+def test_folders_are_scanned_without_an_index(tmp_path):
+    extensions_dir = tmp_path / 'extensions'
+    make_extension(extensions_dir, 'rust-lang', 'rust-analyzer', '0.3.1950')
+    obsolete = make_extension(extensions_dir, 'old', 'theme', '1.0.0')
+    (extensions_dir / '.obsolete').write_text(json.dumps({obsolete: True}))
+    (extensions_dir / 'not-an-extension').mkdir()
+
+    util = vscode(tmp_path, extensions_dir)
+    assert util.read_installed_from_disk() == {'rust-lang.rust-analyzer': '0.3.1950'}
+    assert util.list_extensions(show_versions=True) == ['rust-lang.rust-analyzer@0.3.1950']
+
+
+def test_unreadable_directory_returns_none(tmp_path):
+    assert vscode(tmp_path, tmp_path / 'missing').read_installed_from_disk() is None
+    (tmp_path / 'extensions').mkdir()
+    (tmp_path / 'extensions' / 'extensions.json').write_text('{not json')
+    assert vscode(tmp_path, tmp_path / 'extensions').read_installed_from_disk() is None
+
+
+def test_sync_plan_honours_version_pins_case_insensitively(tmp_path):
+    (tmp_path / 'extensions.txt').write_text(
+        '# pinned and unpinned\nms-python.python@2024.10.1\nGitHub.Copilot\n\nrust-lang.rust-analyzer@0.3.1950\n'
+        'esbenp.prettier-vscode@10.4.0\n')
+    util = vscode(tmp_path, tmp_path / 'extensions')
+    installed = {'ms-python.python': '2024.8.0', 'github.copilot': '1.200.0',
+                 'rust-lang.rust-analyzer': '0.3.1950', 'dbaeumer.vscode-eslint': '3.0.10'}
+
+    plan = util.plan_sync(util.read_configured_extensions(), installed)
+    assert plan['missing'] == [{'id': 'esbenp.prettier-vscode', 'version': '10.4.0'}]
+    assert plan['version_changed'] == [{'id': 'ms-python.python', 'installed': '2024.8.0', 'configured': '2024.10.1'}]
+    # An unpinned entry is in sync with whatever version is installed, whatever the id's casing
+    assert plan['in_sync'] == [{'id': 'GitHub.Copilot', 'version': '1.200.0'},
+                               {'id': 'rust-lang.rust-analyzer', 'version': '0.3.1950'}]
+    assert plan['extra'] == [{'id': 'dbaeumer.vscode-eslint', 'version': '3.0.10'}]
+    assert [util._install_spec(e) for e in plan['missing'] + plan['version_changed']] == \
+        ['esbenp.prettier-vscode@10.4.0', 'ms-python.python@2024.10.1']
+
+
+def test_sync_plan_is_empty_when_in_sync(tmp_path):
+    plan = VSCodeUtil.plan_sync({'a.b': '1.0.0', 'c.d': ''}, {'c.d': '2.0.0', 'A.B': '1.0.0'})
+    assert not (plan['missing'] or plan['extra'] or plan['version_changed'])
+    assert len(plan['in_sync']) == 2
+
+
+def make_vsix(path, publisher, name, version, target_platform=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    platform_attr = f' TargetPlatform="{target_platform}"' if target_platform else ''
+    with zipfile.ZipFile(path, 'w') as package:
+        package.writestr('extension/package.json', json.dumps({'publisher': publisher, 'name': name, 'version': version}))
+        package.writestr('extension.vsixmanifest', f'<PackageManifest><Metadata><Identity Id="{name}" '
+                                                   f'Version="{version}" Publisher="{publisher}"{platform_attr}/>'
+                                                   f'</Metadata></PackageManifest>')
+
+
+def test_vsix_cache_keys_platform_specific_packages_by_platform(tmp_path, monkeypatch):
+    gallery = tmp_path / 'gallery'
+    make_vsix(gallery / 'darwin-arm64' / 'rust-lang.rust-analyzer-0.3.1950.vsix', 'rust-lang', 'rust-analyzer',
+              '0.3.1950', 'darwin-arm64')
+    make_vsix(gallery / 'darwin-x64' / 'rust-lang.rust-analyzer-0.3.1950.vsix', 'rust-lang', 'rust-analyzer',
+              '0.3.1950', 'darwin-x64')
+    for target_platform in ('darwin-arm64', 'darwin-x64'):
+        make_vsix(gallery / target_platform / 'pub.theme-1.0.0.vsix', 'pub', 'theme', '1.0.0')
+    monkeypatch.setenv('DEVLAB_VSIX_URL', f"file://{gallery}/{{target_platform}}/{{publisher}}.{{name}}-{{version}}.vsix")
+    store = ArtifactStore(str(tmp_path / 'vsix'))
+    specs = ['rust-lang.rust-analyzer@0.3.1950', 'pub.theme@1.0.0']
+
+    monkeypatch.setenv('DEVLAB_VSIX_PLATFORM', 'darwin-arm64')
+    arm = VSCodeUtil(str(tmp_path / 'extensions.txt'), str(tmp_path / 'backups'), vsix_cache=store).cache_vsix(specs)
+    monkeypatch.setenv('DEVLAB_VSIX_PLATFORM', 'darwin-x64')
+    x64 = VSCodeUtil(str(tmp_path / 'extensions.txt'), str(tmp_path / 'backups'), vsix_cache=store).cache_vsix(specs)
+
+    # Each platform gets its own rust-analyzer build; the universal theme is cached once and shared
+    assert arm['rust-lang.rust-analyzer@0.3.1950'] != x64['rust-lang.rust-analyzer@0.3.1950']
+    assert arm['pub.theme@1.0.0'] == x64['pub.theme@1.0.0']
+    assert store.stats()['objects'] == 3
+
+
+def test_vsix_of_another_platform_is_not_cached(tmp_path, monkeypatch):
+    make_vsix(tmp_path / 'gallery' / 'pub.native-1.0.0.vsix', 'pub', 'native', '1.0.0', 'darwin-x64')
+    monkeypatch.setenv('DEVLAB_VSIX_URL', f"file://{tmp_path}/gallery/{{publisher}}.{{name}}-{{version}}.vsix")
+    monkeypatch.setenv('DEVLAB_VSIX_PLATFORM', 'darwin-arm64')
+    util = VSCodeUtil(str(tmp_path / 'extensions.txt'), str(tmp_path / 'backups'),
+                      vsix_cache=ArtifactStore(str(tmp_path / 'vsix')))
+    assert util.cache_vsix(['pub.native@1.0.0']) == {}
+
+
+def editor_utils(tmp_path, editors, vsix_cache=None):
+    return [VSCodeUtil(str(tmp_path / 'extensions.txt'), str(tmp_path / 'backups'),
+                       extensions_dir=str(tmp_path / editor), vsix_cache=vsix_cache, editor=editor)
+            for editor in editors]
+
+
+def test_run_for_editors_captures_once_and_keys_results_by_editor(tmp_path):
+    make_extension(tmp_path / 'code', 'ms-python', 'python', '2024.8.0')
+    make_extension(tmp_path / 'cursor', 'GitHub', 'copilot', '1.200.0')
+    utils = editor_utils(tmp_path, ['code', 'cursor'])
+
+    results = run_for_editors(utils, lambda util: (util.echo_output, util.read_configured_extensions()))
+    # extensions.txt is captured from the first editor before the others read it
+    assert results == {'code': (False, {'ms-python.python': '2024.8.0'}),
+                       'cursor': (False, {'ms-python.python': '2024.8.0'})}
+    # A single editor keeps echoing its CLI output
+    assert run_for_editors(editor_utils(tmp_path, ['code']), lambda util: util.echo_output) == {'code': True}
+
+
+def test_run_for_editors_downloads_each_pinned_package_once(tmp_path, monkeypatch):
+    make_vsix(tmp_path / 'gallery' / 'pub.theme-1.0.0.vsix', 'pub', 'theme', '1.0.0')
+    make_vsix(tmp_path / 'gallery' / 'pub.lint-2.0.0.vsix', 'pub', 'lint', '2.0.0')
+    monkeypatch.setenv('DEVLAB_VSIX_URL', f"file://{tmp_path}/gallery/{{publisher}}.{{name}}-{{version}}.vsix")
+    (tmp_path / 'extensions.txt').write_text('pub.theme@1.0.0\npub.lint@2.0.0\n')
+    make_extension(tmp_path / 'code', 'pub', 'theme', '1.0.0')
+    (tmp_path / 'cursor').mkdir()
+    store = ArtifactStore(str(tmp_path / 'vsix'))
+    downloads = []
+    original = VSCodeUtil._download_vsix
+    monkeypatch.setattr(VSCodeUtil, '_download_vsix',
+                        lambda self, spec, *args: downloads.append(spec) or original(self, spec, *args))
+
+    utils = editor_utils(tmp_path, ['code', 'cursor'], vsix_cache=store)
+    run_for_editors(utils, lambda util: None)
+    # Only cursor lacks the theme and both lack lint; each is fetched once, before the editors fan out
+    assert sorted(downloads) == ['pub.lint', 'pub.theme']
+    assert sorted(utils[1].cache_vsix(['pub.theme@1.0.0', 'pub.lint@2.0.0'])) == ['pub.lint@2.0.0', 'pub.theme@1.0.0']
+    assert len(downloads) == 2